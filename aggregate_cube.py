@@ -0,0 +1,220 @@
+import threading
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from data_access import DATUM_COLUMNS, data_version, load_data
+
+CUBE_KEYS = ['station_id', 'Year', 'Month']
+VALUE_COLUMNS = DATUM_COLUMNS + ['Inf']
+# Columns entering the correlation heatmap, in the order the app shows them
+MOMENT_COLUMNS = VALUE_COLUMNS + CUBE_KEYS
+
+# Fine histogram resolution (ft); charts re-bin these counts instead of raw rows
+BIN_WIDTH = 0.01
+MOMENT_CHUNK_ROWS = 8192
+
+
+def _cell_stats(frame):
+    grouped = frame[CUBE_KEYS + VALUE_COLUMNS].groupby(CUBE_KEYS, sort=True)
+    stats = grouped[VALUE_COLUMNS].agg(['count', 'sum', 'min', 'max'])
+    squares = frame[VALUE_COLUMNS].pow(2).groupby([frame[key] for key in CUBE_KEYS], sort=True).sum()
+    for column in VALUE_COLUMNS:
+        stats[(column, 'sumsq')] = squares[column]
+    stats[('rows', 'count')] = grouped.size()
+    return stats.sort_index(axis=1)
+
+
+def _cell_moments(frame, cells):
+    """Per-cell pairwise sums needed for a pairwise-complete correlation.
+
+    For every pair (i, j) of MOMENT_COLUMNS: n_ij, sum x_i, sum x_i^2 over the
+    rows where both are present, and sum x_i x_j.
+    """
+    width = len(MOMENT_COLUMNS)
+    moments = np.zeros((len(cells), 4, width, width))
+    codes = frame.groupby(CUBE_KEYS, sort=True).ngroup().to_numpy()
+    order = np.argsort(codes, kind='stable')
+    codes = codes[order]
+    values = frame[MOMENT_COLUMNS].to_numpy(dtype=np.float64)[order]
+
+    for start in range(0, len(values), MOMENT_CHUNK_ROWS):
+        chunk = values[start:start + MOMENT_CHUNK_ROWS]
+        chunk_codes = codes[start:start + MOMENT_CHUNK_ROWS]
+        present = ~np.isnan(chunk)
+        filled = np.where(present, chunk, 0.0)
+        weights = present.astype(np.float64)
+        products = np.stack([
+            np.einsum('ni,nj->nij', weights, weights),
+            np.einsum('ni,nj->nij', filled, weights),
+            np.einsum('ni,nj->nij', filled * filled, weights),
+            np.einsum('ni,nj->nij', filled, filled),
+        ], axis=1)
+        boundaries = np.flatnonzero(np.r_[True, chunk_codes[1:] != chunk_codes[:-1]])
+        np.add.at(moments, chunk_codes[boundaries], np.add.reduceat(products, boundaries, axis=0))
+    return moments
+
+
+def _checksums(frame):
+    # Per-station sum of row hashes (wrapping uint64): order-free, and additive across appends
+    hashes = pd.util.hash_pandas_object(frame[['station_id', 'Datetime'] + VALUE_COLUMNS], index=False)
+    return hashes.groupby(frame['station_id'].to_numpy()).sum()
+
+
+def _histograms(frame):
+    histograms = {}
+    for column in VALUE_COLUMNS:
+        values = frame[column].to_numpy(dtype=np.float64)
+        present = ~np.isnan(values)
+        bins = np.floor(values[present] / BIN_WIDTH).astype(np.int64)
+        keys = pd.MultiIndex.from_arrays([frame['station_id'].to_numpy()[present], bins], names=['station_id', 'bin'])
+        histograms[column] = pd.Series(1, index=keys, dtype=np.int64).groupby(level=[0, 1]).sum()
+    return histograms
+
+
+class AggregateCube:
+    """Materialized count/sum/min/max/sum-of-squares per station, year, month and column.
+
+    Every chart in the Data Visualizations section is answered from here, so
+    rendering cost scales with the number of cells and histogram bins, not rows.
+    Cubes are immutable: ``append`` returns a new cube sharing nothing mutable.
+    Each station's rows up to its watermark are summarized by a checksum, so
+    ``refresh`` can tell an append from an edit of history.
+    """
+
+    def __init__(self, cells, moments, histograms, watermarks, checksums):
+        self.cells = cells
+        self.moments = moments
+        self.histograms = histograms
+        self.watermarks = watermarks
+        self.checksums = checksums
+
+    @classmethod
+    def from_frame(cls, frame):
+        frame = frame.dropna(subset=CUBE_KEYS)
+        cells = _cell_stats(frame)
+        watermarks = frame.groupby('station_id')['Datetime'].max()
+        return cls(cells, _cell_moments(frame, cells), _histograms(frame), watermarks, _checksums(frame))
+
+    @property
+    def rows(self):
+        return int(self.cells[('rows', 'count')].sum())
+
+    def append(self, rows):
+        """Fold newly appended rows into a new cube in O(cells + new rows)."""
+        if rows.empty:
+            return self
+        other = AggregateCube.from_frame(rows)
+        index = self.cells.index.union(other.cells.index)
+        left = self.cells.reindex(index)
+        right = other.cells.reindex(index)
+
+        cells = left.copy()
+        for column in VALUE_COLUMNS:
+            for stat in ['count', 'sum', 'sumsq']:
+                cells[(column, stat)] = left[(column, stat)].fillna(0) + right[(column, stat)].fillna(0)
+            cells[(column, 'min')] = np.fmin(left[(column, 'min')], right[(column, 'min')])
+            cells[(column, 'max')] = np.fmax(left[(column, 'max')], right[(column, 'max')])
+        cells[('rows', 'count')] = left[('rows', 'count')].fillna(0) + right[('rows', 'count')].fillna(0)
+
+        moments = np.zeros((len(index),) + self.moments.shape[1:])
+        moments[index.get_indexer(self.cells.index)] += self.moments
+        moments[index.get_indexer(other.cells.index)] += other.moments
+
+        histograms = {
+            column: self.histograms[column].add(other.histograms[column], fill_value=0).astype(np.int64)
+            for column in VALUE_COLUMNS
+        }
+        watermarks = pd.concat([self.watermarks, other.watermarks]).groupby(level=0).max()
+        checksums = pd.concat([self.checksums, other.checksums]).groupby(level=0).sum()
+        return AggregateCube(cells, moments, histograms, watermarks, checksums)
+
+    def refresh(self, frame):
+        """Bring the cube up to date with ``frame``, appending when it only grew."""
+        frame = frame.dropna(subset=CUBE_KEYS)
+        watermark = frame['station_id'].map(self.watermarks)
+        new_rows = watermark.isna() | (frame['Datetime'] > watermark)
+        old = frame[~new_rows]
+        if len(old) != self.rows or not _checksums(old).reindex(self.checksums.index).equals(self.checksums):
+            # Historical rows were edited or removed: an append cannot express that
+            return AggregateCube.from_frame(frame)
+        return self.append(frame[new_rows])
+
+    # Queries -----------------------------------------------------------------
+
+    def _totals(self, column, by):
+        stats = self.cells[column][['count', 'sum']].groupby(level=by).sum()
+        return stats['sum'] / stats['count']
+
+    def monthly_mean(self, column):
+        # Equivalent to data.groupby(['Year', 'Month'])[column].mean()
+        return self._totals(column, ['Year', 'Month']).rename(column).reset_index()
+
+    def station_mean(self, column):
+        return self._totals(column, 'station_id').rename(column)
+
+    def station_counts(self):
+        counts = self.cells[('rows', 'count')].groupby(level='station_id').sum().astype(np.int64)
+        return counts.sort_values(ascending=False, kind='stable').rename('count')
+
+    def corr(self):
+        totals = self.moments.sum(axis=0)
+        n, sx, sxx, sxy = totals
+        sy, syy = sx.T, sxx.T
+        with np.errstate(invalid='ignore', divide='ignore'):
+            numerator = n * sxy - sx * sy
+            denominator = np.sqrt((n * sxx - sx ** 2) * (n * syy - sy ** 2))
+            matrix = numerator / denominator
+        return pd.DataFrame(matrix, index=MOMENT_COLUMNS, columns=MOMENT_COLUMNS)
+
+    def histogram(self, column, stations=None):
+        """Fine-grained histogram as (bin centers, counts), optionally for some stations."""
+        counts = self.histograms[column]
+        if stations is not None:
+            counts = counts[counts.index.get_level_values('station_id').isin(stations)]
+        counts = counts.groupby(level='bin').sum()
+        centers = (counts.index.to_numpy(dtype=np.float64) + 0.5) * BIN_WIDTH
+        return centers, counts.to_numpy()
+
+    def quantiles(self, column, q, stations=None):
+        centers, counts = self.histogram(column, stations)
+        # Interpolate linearly within bins: the cumulative count is reached at each bin's right edge
+        cumulative = np.r_[0, np.cumsum(counts)]
+        edges = np.r_[centers[0] - BIN_WIDTH / 2, centers + BIN_WIDTH / 2]
+        return np.interp(np.asarray(q) * cumulative[-1], cumulative, edges)
+
+    def box_stats(self, column):
+        """Per-station boxplot statistics for ``Axes.bxp`` (Tukey whiskers, binned fliers)."""
+        stats = []
+        for station_id in self.station_counts().sort_index().index:
+            centers, counts = self.histogram(column, [station_id])
+            if counts.sum() == 0:
+                continue
+            q1, median, q3 = self.quantiles(column, [0.25, 0.5, 0.75], [station_id])
+            low, high = q1 - 1.5 * (q3 - q1), q3 + 1.5 * (q3 - q1)
+            inside = centers[(centers >= low) & (centers <= high)]
+            stats.append({
+                'label': str(station_id), 'med': median, 'q1': q1, 'q3': q3,
+                'whislo': inside.min() if inside.size else q1, 'whishi': inside.max() if inside.size else q3,
+                'fliers': centers[(centers < low) | (centers > high)],
+            })
+        return stats
+
+
+@st.cache_resource(show_spinner=False)
+def _cube_holder():
+    return {'cube': None, 'version': None, 'lock': threading.Lock()}
+
+
+def load_cube(path=None):
+    """Process-wide cube for the current data version, refreshed incrementally on appends."""
+    holder = _cube_holder()
+    version = data_version(path)
+    with holder['lock']:
+        if holder['version'] != version:
+            frame = load_data(path)
+            cube = holder['cube']
+            holder['cube'] = AggregateCube.from_frame(frame) if cube is None else cube.refresh(frame)
+            holder['version'] = version
+        return holder['cube']
@@ -0,0 +1,193 @@
+import asyncio
+import json
+import os
+import platform
+import queue
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from prediction_api import HOST
+
+API_BENCHMARK_PATH = os.path.join("benchmarks", "prediction_api.json")
+CONCURRENCY = [1, 4, 16, 64]
+REQUESTS_PER_CLIENT = 50
+SEED = 0
+STARTUP_SECONDS = 120
+
+
+def sample_requests(count, seed=SEED, forecast_share=0.25):
+    """Seeded (station, month) request bodies: observed months, plus up to 24 months past each station's last."""
+    from data_access import load_data
+
+    frame = load_data()
+    rng = np.random.default_rng(seed)
+    rows = frame.iloc[rng.integers(0, len(frame), count)]
+    last = frame.groupby('station_id')['Datetime'].max()
+    bodies = []
+    for station_id, stamp in zip(rows['station_id'], rows['Datetime']):
+        if rng.random() < forecast_share:
+            stamp = last[station_id] + pd.DateOffset(months=int(rng.integers(1, 25)))
+        bodies.append(json.dumps({'station_id': int(station_id), 'date': f"{stamp:%Y-%m}"}).encode())
+    return bodies
+
+
+async def _call(reader, writer, method, path, body=b''):
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: {HOST}\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.strip().lower() == 'content-length':
+            length = int(value)
+    return status, await reader.readexactly(length)
+
+
+async def _client(host, port, target, bodies, latencies, statuses):
+    # One keep-alive connection sending its requests back to back, like a client library would
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for body in bodies:
+            started = time.perf_counter()
+            status, _ = await _call(reader, writer, 'POST', f"/predict/{target}", body)
+            latencies.append(time.perf_counter() - started)
+            statuses.append(status)
+    finally:
+        writer.close()
+
+
+async def _metrics(host, port):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        return json.loads((await _call(reader, writer, 'GET', '/metrics'))[1])
+    finally:
+        writer.close()
+
+
+async def _level(host, port, target, concurrency, bodies):
+    before = (await _metrics(host, port))[target]
+    latencies, statuses = [], []
+    chunks = np.array_split(np.arange(len(bodies)), concurrency)
+    started = time.perf_counter()
+    await asyncio.gather(*(_client(host, port, target, [bodies[i] for i in chunk], latencies, statuses) for chunk in chunks))
+    seconds = time.perf_counter() - started
+    after = (await _metrics(host, port))[target]
+    latencies = np.asarray(latencies) * 1000
+    batches = after['batches'] - before['batches']
+    histogram = {bucket: count - before['batch_sizes'].get(bucket, 0) for bucket, count in after['batch_sizes'].items()}
+    return {
+        'concurrency': concurrency, 'requests': len(bodies), 'ok': statuses.count(200), 'rejected': statuses.count(503),
+        'errors': len(statuses) - statuses.count(200) - statuses.count(503), 'seconds': seconds,
+        'requests_per_second': len(bodies) / seconds,
+        'p50_ms': float(np.percentile(latencies, 50)), 'p99_ms': float(np.percentile(latencies, 99)),
+        'batches': batches, 'mean_batch_size': (after['requests'] - before['requests']) / batches if batches else None,
+        'batch_sizes': {bucket: count for bucket, count in histogram.items() if count},
+        'max_queue_depth': after['max_queue_depth'],
+    }
+
+
+def _free_port():
+    with socket.socket() as probe:
+        probe.bind((HOST, 0))
+        return probe.getsockname()[1]
+
+
+def _forward_lines(stream, lines):
+    for line in stream:
+        lines.put(line)
+    lines.put(None)
+
+
+def _start_service(port, model_dir):
+    """``prediction_api.py`` in a child process, returned once it has printed its listening line."""
+    service = subprocess.Popen([sys.executable, "prediction_api.py", "--port", str(port), "--model-dir", model_dir],
+                               stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    # A reader thread drains stdout so a silent child cannot block past the deadline
+    lines = queue.Queue()
+    threading.Thread(target=_forward_lines, args=(service.stdout, lines), daemon=True).start()
+    deadline = time.monotonic() + STARTUP_SECONDS
+    while True:
+        try:
+            line = lines.get(timeout=max(deadline - time.monotonic(), 0))
+        except queue.Empty:
+            break
+        if line is None:
+            break
+        if line.startswith('{"listening"'):
+            return service
+    service.kill()
+    service.wait()
+    raise RuntimeError(f"prediction_api.py did not start within {STARTUP_SECONDS} s")
+
+
+def run(concurrency=CONCURRENCY, requests_per_client=REQUESTS_PER_CLIENT, target='highest', connect=None,
+        model_dir=None, seed=SEED, path=API_BENCHMARK_PATH):
+    """Throughput, latency and batch sizes of the prediction API at each concurrency level.
+
+    Each level opens ``concurrency`` keep-alive clients that send
+    ``requests_per_client`` single-request calls each, back to back, and
+    reads the service's batch-size histogram before and after to report the
+    batches that level produced. Without ``connect`` (``host:port``) a
+    service is started in a child process for the run.
+    """
+    from data_access import data_version
+    from tidal_models import MODEL_DIR
+
+    service = None
+    if connect:
+        host, port = connect.rsplit(':', 1)
+    else:
+        host, port = HOST, _free_port()
+        service = _start_service(port, model_dir or MODEL_DIR)
+    try:
+        rows = []
+        for level in concurrency:
+            bodies = sample_requests(level * requests_per_client, seed)
+            rows.append(asyncio.run(_level(host, int(port), target, level, bodies)))
+            print(f"{level} clients: {rows[-1]['requests_per_second']:.0f} requests/s", flush=True)
+    finally:
+        if service is not None:
+            service.terminate()
+            service.wait()
+    results = {
+        'created': pd.Timestamp.now(tz='UTC').isoformat(),
+        'data_version': data_version(),
+        'target': target,
+        'seed': seed,
+        'host': {'platform': platform.platform(), 'python': platform.python_version(), 'cpus': os.cpu_count()},
+        'results': rows,
+    }
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    staging = f"{path}.{os.getpid()}.tmp"
+    with open(staging, 'w') as handle:
+        json.dump(results, handle, indent=2)
+    os.replace(staging, path)
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Load-test the prediction API at increasing concurrency.")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=CONCURRENCY)
+    parser.add_argument("--requests", type=int, default=REQUESTS_PER_CLIENT, help="requests sent by each client")
+    parser.add_argument("--target", choices=['highest', 'msl'], default='highest')
+    parser.add_argument("--connect", help="host:port of a running service (default: start one)")
+    parser.add_argument("--model-dir")
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--output", default=API_BENCHMARK_PATH)
+    args = parser.parse_args()
+    table = pd.DataFrame(run(args.concurrency, args.requests, args.target, args.connect, args.model_dir, args.seed,
+                             args.output)['results'])
+    table['batch_sizes'] = table['batch_sizes'].map(lambda sizes: ' '.join(f"{bucket}:{count}" for bucket, count in sizes.items()))
+    print(table.drop(columns=['seconds']).to_string(index=False, float_format=lambda value: f"{value:.3g}"))
@@ -4,6 +4,11 @@ import pandas as pd
 import matplotlib.pyplot as plt 
 import seaborn as sns  # Import for seaborn visualizations
 import numpy as np
+from data_access import data_version, load_data
+from aggregate_cube import load_cube
+from render_cache import show_debug_panel, show_figure
+from downsampling import downsample_frame
+from density_plots import DENSITY_ROW_THRESHOLD, density_pairplot, density_scatter, use_density
 # st.write(f"Current working directory: {os.getcwd()}")
 # st.write(f"Files in the directory: {os.listdir(os.getcwd())}")
 # Set page config
@@ -253,15 +258,8 @@ By carefully splitting the data, the model evaluation process remains robust, al
     """)
 
 
-# Load your dataset
-data = pd.read_csv('combined_data_5_stations.csv', parse_dates=['Date', 'Time (GMT)'])
-
-# Ensure that 'Date' and 'Time (GMT)' columns exist and are properly formatted as strings
-data['Date'] = data['Date'].astype(str)
-data['Time (GMT)'] = data['Time (GMT)'].astype(str)
-
-# Combine 'Date' and 'Time (GMT)' into a new 'Datetime' column
-data['Datetime'] = pd.to_datetime(data['Date'] + ' ' + data['Time (GMT)'], errors='coerce')
+# Load your dataset (parsed once per file version and shared across sessions)
+data = load_data()
 
 # Create a new dataset with the combined 'Datetime' column and drop 'Date' and 'Time (GMT)'
 new_dataset = data.drop(columns=['Date', 'Time (GMT)'])
@@ -271,146 +269,183 @@ new_dataset = data.drop(columns=['Date', 'Time (GMT)'])
 if section == "Data Visualizations":
     st.header("Data Visualizations")
 
-    # Ensure date formatting and additional features
-    data['Date'] = pd.to_datetime(data['Date'], errors='coerce')
-    data['Month'] = data['Date'].dt.month
-    data['Year'] = data['Date'].dt.year
+    # Aggregates for every chart below come from the precomputed cube, not the raw rows
+    cube = load_cube()
+    # Rendered charts are cached per data version; matplotlib only runs on a miss
+    version = data_version()
 
     # Visualization 1: Time Series of Average Highest Water Levels by Month-Year
     st.subheader("Time Series of Average Highest Water Levels by Month-Year")
     st.write("""
     The time series visualization depicts the variation in average highest water levels over time, spanning from 1980 to 2025. The plot illustrates a general upward trend, indicating that the highest tide levels have progressively increased over the years, with noticeable fluctuations. Individual data points in the above plot have revealed both seasonal and irregular variations, reflecting periodic spikes and dips. This trend helps us in understanding potential long-term changes in water level patterns, which are likely influenced by environmental or climatic factors.
     """)
-    monthly_data = data.groupby(['Year', 'Month'])['Highest'].mean().reset_index()
-    monthly_data['Month-Year'] = pd.to_datetime(monthly_data[['Year', 'Month']].assign(Day=1))
-
-    fig1, ax1 = plt.subplots()
-    sns.lineplot(data=monthly_data, x='Month-Year', y='Highest', marker='o', label='Average Highest', ax=ax1)
-    ax1.set_title('Time Series of Average Highest Water Levels by Month-Year')
-    ax1.set_xlabel('Month-Year')
-    ax1.set_ylabel('Highest Water Levels (ft)')
-    plt.xticks(rotation=45)
-    plt.grid(True)
-    st.pyplot(fig1)
+    def render_highest_trend():
+        monthly_data = cube.monthly_mean('Highest')
+        monthly_data['Month-Year'] = pd.to_datetime(monthly_data[['Year', 'Month']].assign(Day=1))
+        # Long histories are reduced to about one point per pixel column, keeping peaks
+        monthly_data = downsample_frame(monthly_data, 'Month-Year', 'Highest')
+
+        fig1, ax1 = plt.subplots()
+        sns.lineplot(data=monthly_data, x='Month-Year', y='Highest', marker='o', label='Average Highest', ax=ax1)
+        ax1.set_title('Time Series of Average Highest Water Levels by Month-Year')
+        ax1.set_xlabel('Month-Year')
+        ax1.set_ylabel('Highest Water Levels (ft)')
+        plt.xticks(rotation=45)
+        plt.grid(True)
+        return fig1
+    show_figure('highest_trend', version, render_highest_trend)
 
     # New Visualization: Time Series of Average MTL (ft) by Month-Year
     st.subheader("Time Series of Average MTL (ft) by Month-Year")
     st.write("""
     The time series plot of Mean Tide Level (MTL) over time illustrates trends and variability in tidal behavior across years. From 1980 to 2025, the plot shows a gradual upward trend, indicating a steady increase in MTL (ft) over the decades. This suggests possible long-term environmental changes, such as rising sea levels. Additionally, the data points display significant variability within each month or year, reflecting natural fluctuations in tidal patterns. Periods of higher variability, particularly after 2010, may suggest more dynamic tidal activity in recent years. This visualization underscores the importance of incorporating temporal trends when building predictive models for tidal behavior.
     """)
-    monthly_mtl_data = data.groupby(['Year', 'Month'])['MTL (ft)'].mean().reset_index()
-    monthly_mtl_data['Month-Year'] = pd.to_datetime(monthly_mtl_data[['Year', 'Month']].assign(Day=1))
-
-    fig10, ax10 = plt.subplots()
-    sns.lineplot(data=monthly_mtl_data, x='Month-Year', y='MTL (ft)', marker='o', label='Average MTL', ax=ax10)
-    ax10.set_title('Time Series of Average MTL (ft) by Month-Year', fontsize=10)
-    ax10.set_xlabel('Month-Year', fontsize=12)
-    ax10.set_ylabel('MTL (ft)', fontsize=12)
-    plt.xticks(rotation=45)
-    plt.grid(True)
-    st.pyplot(fig10)
+    def render_mtl_trend():
+        monthly_mtl_data = cube.monthly_mean('MTL (ft)')
+        monthly_mtl_data['Month-Year'] = pd.to_datetime(monthly_mtl_data[['Year', 'Month']].assign(Day=1))
+        # Long histories are reduced to about one point per pixel column, keeping peaks
+        monthly_mtl_data = downsample_frame(monthly_mtl_data, 'Month-Year', 'MTL (ft)')
+
+        fig10, ax10 = plt.subplots()
+        sns.lineplot(data=monthly_mtl_data, x='Month-Year', y='MTL (ft)', marker='o', label='Average MTL', ax=ax10)
+        ax10.set_title('Time Series of Average MTL (ft) by Month-Year', fontsize=10)
+        ax10.set_xlabel('Month-Year', fontsize=12)
+        ax10.set_ylabel('MTL (ft)', fontsize=12)
+        plt.xticks(rotation=45)
+        plt.grid(True)
+        return fig10
+    show_figure('mtl_trend', version, render_mtl_trend)
 
     # Visualization 2: Histogram of Lowest Water Levels
     st.subheader("Histogram of Lowest Water Levels")
     st.write("""
     The histogram illustrates the distribution of the lowest water levels, forming a near-perfect bell-shaped curve indicative of a normal distribution. The majority of the data is concentrated around the mean, approximately -0.25 feet, with frequencies tapering off symmetrically on either side. This suggests that most low water levels fall within a narrow range, while extreme values are rare, reflecting a balanced and predictable pattern in the dataset's lower bounds.
     """)
-    fig2, ax2 = plt.subplots()
-    sns.histplot(data['Lowest (ft)'], kde=True, color='orange', bins=20, ax=ax2)
-    ax2.set_title('Distribution of Lowest Water Levels')
-    ax2.set_xlabel('Lowest (ft)')
-    ax2.set_ylabel('Frequency')
-    plt.tight_layout()
-    st.pyplot(fig2)
+    def render_lowest_histogram():
+        lowest_centers, lowest_counts = cube.histogram('Lowest (ft)')
+        fig2, ax2 = plt.subplots()
+        sns.histplot(x=lowest_centers, weights=lowest_counts, kde=True, color='orange', bins=20, ax=ax2)
+        ax2.set_title('Distribution of Lowest Water Levels')
+        ax2.set_xlabel('Lowest (ft)')
+        ax2.set_ylabel('Frequency')
+        plt.tight_layout()
+        return fig2
+    show_figure('lowest_histogram', version, render_lowest_histogram)
 
     # Visualization 3: Boxplot of Highest Levels by Station
     st.subheader("Boxplot of Highest Levels by Station")
     st.write("""
     The boxplot compares the highest water levels across five stations, illustrating variations in medians, interquartile ranges, and outliers. Each station shows distinct central tendencies, with station 1619910 exhibiting the highest variability and numerous outliers, suggesting significant fluctuations. Stations 1611400, 1612340, and 1612480 display relatively similar ranges and medians, whereas station 1617433 has a slightly elevated median but fewer outliers. This visualization highlights the differing water level behaviors among stations, indicating possible location-specific factors influencing water levels.
     """)
-    fig3, ax3 = plt.subplots()
-    sns.boxplot(x='station_id', y='Highest', data=data, palette='coolwarm', ax=ax3)
-    ax3.set_title('Boxplot of Highest Water Levels by Station')
-    ax3.set_xlabel('Station ID')
-    ax3.set_ylabel('Highest (ft)')
-    plt.tight_layout()
-    st.pyplot(fig3)
+    def render_highest_boxplot():
+        box_stats = cube.box_stats('Highest')
+        fig3, ax3 = plt.subplots()
+        boxes = ax3.bxp(box_stats, patch_artist=True, flierprops={'marker': 'd', 'markersize': 4})
+        for patch, color in zip(boxes['boxes'], sns.color_palette('coolwarm', len(box_stats))):
+            patch.set_facecolor(color)
+        ax3.set_title('Boxplot of Highest Water Levels by Station')
+        ax3.set_xlabel('Station ID')
+        ax3.set_ylabel('Highest (ft)')
+        plt.tight_layout()
+        return fig3
+    show_figure('highest_boxplot', version, render_highest_boxplot)
 
     # Visualization 4: Scatter Plot of MSL vs MHW
     st.subheader("Scatter Plot of MSL vs. MHW")
     st.write("""
     The scatter plot of MSL (Mean Sea Level) vs. MHW (Mean High Water) reveals a strong positive linear relationship, indicating that as MSL increases, MHW rises proportionally across all stations. The color-coded points highlight station-specific clusters, with stations like 1619910 showing lower ranges for both metrics and others like 1617433 exhibiting higher values. While some stations, such as 1611400 and 1612340, show overlapping patterns, subtle variations suggest distinct tidal behaviors. This strong correlation underscores the importance of both MSL and MHW as critical features for predicting tidal heights, and the distinct clustering emphasizes the need for station-specific encoding to capture these variations effectively in predictive models.
     """)
-    fig4, ax4 = plt.subplots()
-    sns.scatterplot(x='MSL (ft)', y='MHW (ft)', hue='station_id', palette='viridis', data=data, alpha=0.6, ax=ax4)
-    ax4.set_title('Scatter Plot of MSL vs. MHW')
-    ax4.set_xlabel('MSL (ft)')
-    ax4.set_ylabel('MHW (ft)')
-    plt.tight_layout()
-    st.pyplot(fig4)
+    # Above DENSITY_ROW_THRESHOLD rows, markers are replaced by a per-station density raster
+    density_mode = use_density(data, DENSITY_ROW_THRESHOLD)
+    def render_msl_mhw_scatter():
+        fig4, ax4 = plt.subplots()
+        if density_mode:
+            density_scatter(ax4, data['MSL (ft)'], data['MHW (ft)'], classes=data['station_id'], palette='viridis', legend_title='station_id')
+        else:
+            sns.scatterplot(x='MSL (ft)', y='MHW (ft)', hue='station_id', palette='viridis', data=data, alpha=0.6, ax=ax4)
+        ax4.set_title('Scatter Plot of MSL vs. MHW')
+        ax4.set_xlabel('MSL (ft)')
+        ax4.set_ylabel('MHW (ft)')
+        plt.tight_layout()
+        return fig4
+    show_figure('msl_mhw_scatter', version, render_msl_mhw_scatter, size='density' if density_mode else 'points')
 
     # Visualization 5: Pairplot of Selected Features
     st.subheader("Pairplot of Selected Features")
     st.write("""
     The pairplot for selected features—Highest, Lowest (ft), MHW (Mean High Water), and MSL (Mean Sea Level)—provides a comprehensive view of relationships between these variables. The diagonal plots represent the distribution of each feature, revealing that Highest and MHW exhibit slightly skewed distributions, while Lowest and MSL are more normally distributed. The off-diagonal scatter plots demonstrate strong positive correlations between MSL and MHW, and between Highest and MHW, indicating these features are highly interdependent. Meanwhile, the relationship between Lowest and other features is less pronounced, suggesting a weaker contribution to the target variable. This visualization highlights the critical features driving tidal predictions and suggests which variables are most relevant for inclusion in machine learning models.
     """)
-    selected_features = ['Highest', 'Lowest (ft)', 'MHW (ft)', 'MSL (ft)']
-    pairplot_fig = sns.pairplot(data[selected_features].dropna(), diag_kind='kde', plot_kws={'alpha': 0.6})
-    pairplot_fig.fig.suptitle('Pairplot for Selected Features', y=1.02)
-    st.pyplot(pairplot_fig)
+    def render_pairplot():
+        selected_features = ['Highest', 'Lowest (ft)', 'MHW (ft)', 'MSL (ft)']
+        if density_mode:
+            pairplot_fig = density_pairplot(data, selected_features)
+            pairplot_fig.suptitle('Pairplot for Selected Features', y=1.02)
+            return pairplot_fig
+        pairplot_fig = sns.pairplot(data[selected_features].dropna(), diag_kind='kde', plot_kws={'alpha': 0.6})
+        pairplot_fig.fig.suptitle('Pairplot for Selected Features', y=1.02)
+        return pairplot_fig.figure
+    show_figure('pairplot', version, render_pairplot, size='density' if density_mode else 'points')
 
     # Visualization 6: Heatmap of Correlations
     st.subheader("Heatmap of Correlations")
     st.write("""
     The heatmap of the correlation matrix highlights the relationships among the features in the dataset, with correlation values ranging from -1 (strong negative correlation) to +1 (strong positive correlation). Highest shows the strongest positive correlations with MHHW (ft) (0.90), MHW (ft) (0.83), and MSL (ft) (0.75), indicating these features are critical predictors of tidal heights. Similarly, MHW (ft) and MSL (ft) are highly correlated with each other (0.95), reflecting their interdependence in tidal dynamics. Features like Lowest (ft) and MLLW (ft) have weaker correlations with Highest (0.22 and 0.40, respectively), suggesting they contribute less directly to the target. Station-specific features (station_id) exhibit moderate negative correlations with Highest, while temporal features like Year (0.25) and Month (0.12) show relatively weak relationships. This heatmap provides valuable insights into feature selection, emphasizing the importance of tidal metrics for predicting tidal heights while also capturing potential redundancies due to multicollinearity.
     """)
-    numeric_features = data.select_dtypes(include=np.number).columns
-    correlation_matrix = data[numeric_features].corr()
-    fig6, ax6 = plt.subplots(figsize=(10, 6))
-    sns.heatmap(correlation_matrix, annot=True, fmt='.2f', cmap='coolwarm', cbar=True, ax=ax6)
-    ax6.set_title('Heatmap of Correlations')
-    plt.tight_layout()
-    st.pyplot(fig6)
+    def render_correlation_heatmap():
+        correlation_matrix = cube.corr()
+        fig6, ax6 = plt.subplots(figsize=(10, 6))
+        sns.heatmap(correlation_matrix, annot=True, fmt='.2f', cmap='coolwarm', cbar=True, ax=ax6)
+        ax6.set_title('Heatmap of Correlations')
+        plt.tight_layout()
+        return fig6
+    show_figure('correlation_heatmap', version, render_correlation_heatmap)
 
     # Visualization 7: Barplot for Observations per Station
     st.subheader("Barplot of Observations per Station")
     st.write("""
     The bar chart displays the count of observations for each station, illustrating the distribution of records across the dataset. Stations 1611400, 1612340, 1612480, and 1619910 each have similar observation counts, ranging between 522 and 537, indicating a relatively balanced dataset for these stations. However, 1617433 has significantly fewer records (399), which could introduce a slight imbalance in the dataset. This disparity might affect the model's ability to generalize well for 1617433, as fewer observations provide less information for learning station-specific patterns. Overall, the chart highlights the importance of considering data balance when training models, particularly in multi-station scenarios.
     """)
-    station_counts = data['station_id'].value_counts()
-    fig7, ax7 = plt.subplots()
-    sns.barplot(x=station_counts.index, y=station_counts.values, palette='magma', ax=ax7)
-    ax7.set_title('Count of Observations per Station')
-    ax7.set_xlabel('Station ID')
-    ax7.set_ylabel('Count')
-    plt.tight_layout()
-    st.pyplot(fig7)
+    def render_station_counts():
+        station_counts = cube.station_counts()
+        fig7, ax7 = plt.subplots()
+        sns.barplot(x=station_counts.index, y=station_counts.values, palette='magma', ax=ax7)
+        ax7.set_title('Count of Observations per Station')
+        ax7.set_xlabel('Station ID')
+        ax7.set_ylabel('Count')
+        plt.tight_layout()
+        return fig7
+    show_figure('station_counts', version, render_station_counts)
 
     # Visualization 8: KDE Plot for MLLW
     st.subheader("KDE Plot for MLLW")
     st.write("""
     The KDE (Kernel Density Estimation) plot of MLLW (Mean Lower Low Water) shows the distribution of this tidal metric across the dataset. The distribution is unimodal, with a peak around 0 ft, indicating that most of the MLLW values are concentrated near this central value. The density decreases symmetrically on either side of the peak, suggesting a relatively normal distribution with a slight right skew. This implies that higher MLLW values are slightly more common than lower ones, but extreme values in either direction are rare. The KDE plot provides valuable insights into the central tendency and spread of MLLW, helping to identify its variability and role as a feature in predictive models.
     """)
-    fig8, ax8 = plt.subplots()
-    sns.kdeplot(data['MLLW (ft)'], fill=True, color='purple', ax=ax8)
-    ax8.set_title('KDE Plot of MLLW (ft)')
-    ax8.set_xlabel('MLLW (ft)')
-    ax8.set_ylabel('Density')
-    plt.tight_layout()
-    st.pyplot(fig8)
+    def render_mllw_kde():
+        mllw_centers, mllw_counts = cube.histogram('MLLW (ft)')
+        fig8, ax8 = plt.subplots()
+        sns.kdeplot(x=mllw_centers, weights=mllw_counts, fill=True, color='purple', ax=ax8)
+        ax8.set_title('KDE Plot of MLLW (ft)')
+        ax8.set_xlabel('MLLW (ft)')
+        ax8.set_ylabel('Density')
+        plt.tight_layout()
+        return fig8
+    show_figure('mllw_kde', version, render_mllw_kde)
 
     # Visualization 9: Pie Chart of Proportions of Average MTL by Station
     st.subheader("Pie Chart of Proportions of Average MTL by Station")
     st.write("""
     The pie chart illustrates the proportion of the average Mean Tide Level (MTL) contributed by each station in the dataset. Station 1612480 accounts for the largest share, contributing 24.7% of the total MTL, while station 1619910 contributes the smallest share at 16.2%. Stations 1611400, 1612340, and 1617433 contribute relatively balanced proportions, ranging between 19.1% and 20.7%. This distribution reflects variations in tide behavior across stations, with some stations experiencing higher average tide levels than others. The visualization effectively highlights the station-specific differences in MTL, which are essential for understanding and modeling tidal dynamics at these locations.
     """)
-    mtl_means = data.groupby('station_id')['MTL (ft)'].mean()
-    fig9, ax9 = plt.subplots()
-    mtl_means.plot.pie(autopct='%1.1f%%', startangle=140, cmap='cool', explode=[0.05] * len(mtl_means), ax=ax9)
-    ax9.set_title('Proportion of Average Mean Tide Level by Station ID')
-    ax9.set_ylabel('')
-    plt.tight_layout()
-    st.pyplot(fig9)
+    def render_mtl_pie():
+        mtl_means = cube.station_mean('MTL (ft)')
+        fig9, ax9 = plt.subplots()
+        mtl_means.plot.pie(autopct='%1.1f%%', startangle=140, cmap='cool', explode=[0.05] * len(mtl_means), ax=ax9)
+        ax9.set_title('Proportion of Average Mean Tide Level by Station ID')
+        ax9.set_ylabel('')
+        plt.tight_layout()
+        return fig9
+    show_figure('mtl_pie', version, render_mtl_pie)
 
 elif section == "Models Implemented":
     # st.title("Models Implemented")
@@ -575,3 +610,7 @@ elif section == "Conclusion":
 
 
     # You can also include team roles or contribution
+
+# Debug panel: render cache hit rate and latency
+if st.sidebar.checkbox("Show debug panel", key="debug_panel"):
+    show_debug_panel()
@@ -0,0 +1,116 @@
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+DATA_PATH = "combined_data_5_stations.csv"
+STORE_DIR = "station_store"
+
+# Datum columns in the order they appear in the NOAA monthly extremes export
+DATUM_COLUMNS = ['Highest', 'MHHW (ft)', 'MHW (ft)', 'MSL (ft)', 'MTL (ft)', 'MLW (ft)', 'MLLW (ft)', 'Lowest (ft)']
+
+# Explicit dtypes so pandas never has to sniff the file
+CSV_DTYPES = {column: np.float64 for column in DATUM_COLUMNS}
+CSV_DTYPES.update({'Date': str, 'Time (GMT)': str, 'Inf': np.int16, 'station_id': np.int64})
+
+DATETIME_FORMAT = '%Y/%m/%d %H:%M'
+
+
+def parse_station_csv(path, station_id=None):
+    """Parse a station CSV into the typed frame used throughout the app.
+
+    Works for the combined file and for the legacy single-station exports
+    (fully quoted, no station_id column), in which case ``station_id`` must be given.
+    """
+    dtypes = dict(CSV_DTYPES)
+    if station_id is not None:
+        dtypes.pop('station_id')
+    frame = pd.read_csv(path, dtype=dtypes)
+    if station_id is not None:
+        frame['station_id'] = np.int64(station_id)
+
+    # Build Datetime in a single vectorized pass with a fixed format
+    frame['Datetime'] = pd.to_datetime(frame['Date'] + ' ' + frame['Time (GMT)'], format=DATETIME_FORMAT, errors='coerce')
+    frame['Date'] = frame['Datetime'].dt.normalize()
+    frame['Year'] = frame['Datetime'].dt.year.astype(np.int32)
+    frame['Month'] = frame['Datetime'].dt.month.astype(np.int32)
+    return frame
+
+
+def frame_from_store(table):
+    """Derive the CSV-era columns (Date, Time (GMT), Year, Month) for rows read from the station store."""
+    frame = table.copy()
+    frame['Date'] = frame['Datetime'].dt.normalize()
+    frame['Time (GMT)'] = frame['Datetime'].dt.strftime('%H:%M')
+    frame['Year'] = frame['Datetime'].dt.year.astype(np.int32)
+    frame['Month'] = frame['Datetime'].dt.month.astype(np.int32)
+    columns = ['Date', 'Time (GMT)'] + DATUM_COLUMNS + ['Inf', 'station_id', 'Datetime', 'Year', 'Month']
+    return frame[columns].sort_values(['station_id', 'Datetime'], ignore_index=True)
+
+
+def default_source():
+    # Prefer the columnar store once it has been built with `python station_store.py`
+    return STORE_DIR if os.path.isdir(STORE_DIR) else DATA_PATH
+
+
+def file_fingerprint(path):
+    # A stat call is enough to notice an edited file without reading it
+    if os.path.isdir(path):
+        from station_store import store_fingerprint
+        return store_fingerprint(path)
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def file_hash(path):
+    digest = hashlib.sha1()
+    paths = [path]
+    if os.path.isdir(path):
+        paths = sorted(os.path.join(root, name) for root, _, names in os.walk(path) for name in names)
+    for name in paths:
+        digest.update(os.path.relpath(name, path).encode())
+        with open(name, 'rb') as handle:
+            for block in iter(lambda: handle.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def _load_cached(path, fingerprint):
+    # Keyed on (path, mtime, size): shared by every session in the process and
+    # dropped as soon as the file on disk changes.
+    if os.path.isdir(path):
+        from station_store import read_store
+        frame = frame_from_store(read_store(path))
+    else:
+        frame = parse_station_csv(path)
+    return frame, file_hash(path)
+
+
+def load_data(path=None):
+    """Return the station data, parsing the source at most once per version.
+
+    ``path`` may be a CSV file or a station store directory; by default the
+    store is used when present. The cached frame is shared across sessions,
+    so callers get a shallow copy: adding columns to it never leaks into
+    other sessions. Editing values in place relies on pandas copy-on-write,
+    the only mode from pandas 3 on: the shallow copy's columns are copied on
+    their first write instead of writing through to the cached frame.
+    """
+    path = path or default_source()
+    frame, _ = _load_cached(path, file_fingerprint(path))
+    return frame.copy(deep=False)
+
+
+def data_version(path=None):
+    """Content hash of the loaded data, used as a cache key by downstream stages."""
+    path = path or default_source()
+    _, version = _load_cached(path, file_fingerprint(path))
+    return version
+
+
+def frame_version(frame):
+    """Content hash of an in-memory frame, for data handed to a stage instead of read by ``load_data()``."""
+    return hashlib.sha1(pd.util.hash_pandas_object(frame, index=False).to_numpy().tobytes()).hexdigest()[:16]
@@ -0,0 +1,129 @@
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+DECOMPOSITION_CACHE_DIR = ".decomposition_cache"
+METHODS = ['stl', 'classical']
+COMPONENTS = ['observed', 'trend', 'seasonal', 'resid']
+
+# Below this many uncached stations a process pool costs more than it saves
+MIN_PARALLEL_STATIONS = 3
+
+
+def station_series(frame, station_id, column='Highest'):
+    """Monthly series for one station, gap-filled the way the notebook did (ffill, then bfill)."""
+    rows = frame.loc[frame['station_id'] == station_id, ['Datetime', column]]
+    series = rows.set_index('Datetime')[column].sort_index().resample('MS').mean()
+    return series.ffill().bfill()
+
+
+def series_version(series):
+    # Hash of timestamps and values: changes only when this station's data does
+    digest = hashlib.sha1(series.index.asi8.tobytes())
+    digest.update(np.ascontiguousarray(series.to_numpy(dtype=np.float64)).tobytes())
+    return digest.hexdigest()[:16]
+
+
+def decompose(series, period=12, method='stl'):
+    """Trend/seasonal/residual components of ``series`` as a DataFrame."""
+    from statsmodels.tsa.seasonal import STL, seasonal_decompose
+
+    if method == 'stl':
+        result = STL(series, period=period, robust=True).fit()
+    elif method == 'classical':
+        result = seasonal_decompose(series, model='additive', period=period)
+    else:
+        raise ValueError(f"Unknown decomposition method {method!r}")
+    return pd.DataFrame({
+        'observed': result.observed, 'trend': result.trend,
+        'seasonal': result.seasonal, 'resid': result.resid,
+    }, index=series.index)
+
+
+def _decompose_job(station_id, series, period, method):
+    # Top-level so it can be pickled to worker processes
+    return station_id, decompose(series, period, method)
+
+
+class DecompositionCache:
+    """Persistent memo of components per (station, data version, period, method)."""
+
+    def __init__(self, directory=DECOMPOSITION_CACHE_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, station_id, version, period, method):
+        return os.path.join(self.directory, f"{int(station_id)}-{version}-{int(period)}-{method}.parquet")
+
+    def get(self, station_id, version, period, method):
+        path = self.path(station_id, version, period, method)
+        if not os.path.exists(path):
+            return None
+        return pd.read_parquet(path)
+
+    def put(self, station_id, version, period, method, components):
+        path = self.path(station_id, version, period, method)
+        temporary = f"{path}.{os.getpid()}.tmp"
+        components.to_parquet(temporary)
+        os.replace(temporary, path)
+
+
+def decompose_stations(frame, stations, period=12, method='stl', column='Highest', cache=None, max_workers=None):
+    """Components for every station in ``stations``, recomputing only stations whose data changed.
+
+    Cache misses run in parallel on a process pool; returns {station_id: (version, components)}.
+    """
+    cache = cache or DecompositionCache()
+    results, pending = {}, {}
+    for station_id in stations:
+        series = station_series(frame, station_id, column)
+        if len(series) < 2 * period:
+            continue
+        version = series_version(series)
+        components = cache.get(station_id, version, period, method)
+        if components is None:
+            pending[station_id] = (version, series)
+        else:
+            results[station_id] = (version, components)
+
+    if len(pending) >= MIN_PARALLEL_STATIONS:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            jobs = [pool.submit(_decompose_job, station_id, series, period, method) for station_id, (_, series) in pending.items()]
+            computed = [job.result() for job in jobs]
+    else:
+        computed = [_decompose_job(station_id, series, period, method) for station_id, (_, series) in pending.items()]
+
+    for station_id, components in computed:
+        version = pending[station_id][0]
+        cache.put(station_id, version, period, method, components)
+        results[station_id] = (version, components)
+    return results
+
+
+def plot_decomposition(components, station_id):
+    fig, axes = plt.subplots(len(COMPONENTS), 1, figsize=(10, 8), sharex=True)
+    for ax, name in zip(axes, COMPONENTS):
+        if name == 'resid':
+            ax.scatter(components.index, components[name], s=6)
+            ax.axhline(0, color='black', linewidth=0.8)
+        else:
+            ax.plot(components.index, components[name])
+        ax.set_ylabel(name.capitalize() if name != 'resid' else 'Resid')
+    fig.suptitle(f'Seasonal Decomposition for Station {station_id}', fontsize=16)
+    fig.tight_layout()
+    return fig
+
+
+if __name__ == "__main__":
+    # Warm the cache for every station in the current data source
+    from data_access import load_data
+
+    data = load_data()
+    all_stations = sorted(data['station_id'].unique())
+    for method in METHODS:
+        done = decompose_stations(data, all_stations, method=method)
+        print(f"{method}: {len(done)} stations decomposed or loaded from cache")
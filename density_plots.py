@@ -0,0 +1,94 @@
+import numpy as np
+import matplotlib.pyplot as plt
+import seaborn as sns
+from matplotlib.colors import to_rgb
+from matplotlib.patches import Patch
+
+# Above this many rows the scatter and pairplot switch from markers to a density raster
+DENSITY_ROW_THRESHOLD = 50_000
+DENSITY_BINS = 300
+
+
+def _bin_index(values, low, high, bins):
+    index = np.floor((values - low) / (high - low) * bins).astype(np.int64)
+    return np.clip(index, 0, bins - 1)
+
+
+def class_density(x, y, classes=None, bins=DENSITY_BINS, extent=None):
+    """Per-class 2D bin counts in one vectorized pass.
+
+    Returns (counts, labels, extent) with counts shaped (classes, bins_y, bins_x).
+    Cost is linear in points for binning and constant in points for drawing.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    keep = ~(np.isnan(x) | np.isnan(y))
+    x, y = x[keep], y[keep]
+    if classes is None:
+        labels, codes = np.array(['all']), np.zeros(len(x), dtype=np.int64)
+    else:
+        labels, codes = np.unique(np.asarray(classes)[keep], return_inverse=True)
+
+    if extent is None:
+        extent = (x.min(), x.max(), y.min(), y.max()) if len(x) else (0.0, 1.0, 0.0, 1.0)
+    x_low, x_high, y_low, y_high = extent
+    x_high = x_high if x_high > x_low else x_low + 1.0
+    y_high = y_high if y_high > y_low else y_low + 1.0
+    extent = (x_low, x_high, y_low, y_high)
+
+    flat = (codes * bins + _bin_index(y, y_low, y_high, bins)) * bins + _bin_index(x, x_low, x_high, bins)
+    counts = np.bincount(flat, minlength=len(labels) * bins * bins).reshape(len(labels), bins, bins)
+    return counts, labels, extent
+
+
+def density_image(counts, colors):
+    """Blend per-class counts into an RGBA raster: hue by class mix, opacity by log density."""
+    total = counts.sum(axis=0)
+    colors = np.asarray(colors, dtype=np.float64)[:, :3]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rgb = np.einsum('kyx,kc->yxc', counts, colors) / total[..., None]
+    alpha = np.log1p(total) / np.log1p(total.max()) if total.max() > 0 else np.zeros_like(total, dtype=np.float64)
+    return np.dstack([np.nan_to_num(rgb), alpha])
+
+
+def density_scatter(ax, x, y, classes=None, palette='viridis', bins=DENSITY_BINS, legend_title=None):
+    counts, labels, extent = class_density(x, y, classes, bins)
+    colors = sns.color_palette(palette, len(labels))
+    ax.imshow(density_image(counts, colors), origin='lower', extent=extent, aspect='auto', interpolation='nearest')
+    if classes is not None:
+        handles = [Patch(color=color, label=str(label)) for label, color in zip(labels, colors)]
+        ax.legend(handles=handles, title=legend_title)
+    return ax
+
+
+def density_pairplot(frame, columns, bins=DENSITY_BINS // 2, color='C0'):
+    """Pairplot equivalent whose off-diagonal panels are density rasters and diagonals binned histograms."""
+    values = {column: frame[column].to_numpy(dtype=np.float64) for column in columns}
+    ranges = {column: (np.nanmin(v), np.nanmax(v)) for column, v in values.items()}
+    size = len(columns)
+    fig, axes = plt.subplots(size, size, figsize=(2.5 * size, 2.5 * size), squeeze=False)
+    for row, y_column in enumerate(columns):
+        for col, x_column in enumerate(columns):
+            ax = axes[row][col]
+            if row == col:
+                data = values[x_column][~np.isnan(values[x_column])]
+                low, high = ranges[x_column]
+                high = high if high > low else low + 1.0
+                counts = np.bincount(_bin_index(data, low, high, bins), minlength=bins)
+                edges = np.linspace(low, high, bins + 1)
+                ax.stairs(counts, edges, fill=True, color=color, alpha=0.6)
+            else:
+                extent = ranges[x_column] + ranges[y_column]
+                counts, _, extent = class_density(values[x_column], values[y_column], bins=bins, extent=extent)
+                ax.imshow(density_image(counts, [to_rgb(color)]), origin='lower',
+                          extent=extent, aspect='auto', interpolation='nearest')
+            if row == size - 1:
+                ax.set_xlabel(x_column)
+            if col == 0:
+                ax.set_ylabel(y_column)
+    fig.tight_layout()
+    return fig
+
+
+def use_density(frame, threshold=DENSITY_ROW_THRESHOLD):
+    return len(frame) > threshold
@@ -0,0 +1,273 @@
+import json
+import os
+import shutil
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from render_cache import show_figure
+from tidal_models import MODEL_DIR
+
+# Inside the registry root, so evaluations sit beside the versions they describe
+EVALUATION_DIR = "evaluations"
+SUMMARY_NAME = "summary.json"
+HISTORY_FILE = "history.parquet"
+PREDICTIONS_FILE = "predictions.parquet"
+RESIDUAL_BINS = 30
+# Cells per axis of the actual-vs-predicted grid
+DENSITY_BINS = 40
+# Residual percentiles kept as the quantile sketch; any other quantile is interpolated between them
+SKETCH_QUANTILES = np.linspace(0, 1, 101)
+REPORT_QUANTILES = [0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99]
+
+
+def evaluation_path(name, version, model_dir=MODEL_DIR):
+    return os.path.join(model_dir, EVALUATION_DIR, f"model={name}", f"version={int(version):04d}")
+
+
+def versions(name, model_dir=MODEL_DIR):
+    directory = os.path.join(model_dir, EVALUATION_DIR, f"model={name}")
+    if not os.path.isdir(directory):
+        return []
+    return sorted(int(entry.split('=', 1)[1]) for entry in os.listdir(directory)
+                  if entry.startswith('version=') and os.path.exists(os.path.join(directory, entry, SUMMARY_NAME)))
+
+
+def summarize(actual, predicted, history=None):
+    """Everything the pages draw from one evaluation, small enough to keep as JSON.
+
+    Residuals become a fixed-bin histogram and a sketch of their
+    percentiles, actual against predicted a 2-D count grid, and the training
+    history its last and best epochs; none of it grows with the test set.
+    With no scored rows the metrics are None and there is nothing to bin.
+    """
+    summary = {'rows': int(len(actual)), 'metrics': dict.fromkeys(['mse', 'mae', 'r2', 'bias'])}
+    if history:
+        losses = history.get('val_loss') or history.get('loss')
+        summary['history'] = {'epochs': len(history.get('loss', [])), 'final': {key: float(values[-1]) for key, values in history.items()},
+                              'best_epoch': int(np.argmin(losses)) + 1 if losses else None}
+    if not len(actual):
+        return summary
+    residuals = actual - predicted
+    counts, edges = np.histogram(residuals, bins=RESIDUAL_BINS)
+    low, high = float(min(actual.min(), predicted.min())), float(max(actual.max(), predicted.max()))
+    grid, actual_edges, predicted_edges = np.histogram2d(actual, predicted, bins=DENSITY_BINS, range=[[low, high], [low, high]])
+    total = np.sum((actual - actual.mean()) ** 2)
+    summary.update({
+        'metrics': {'mse': float(np.mean(residuals ** 2)), 'mae': float(np.mean(np.abs(residuals))),
+                    'r2': float(1 - np.sum(residuals ** 2) / total) if total > 0 else None,
+                    'bias': float(np.mean(residuals))},
+        'residual_histogram': {'edges': edges.tolist(), 'counts': counts.tolist()},
+        'residual_sketch': {'quantiles': SKETCH_QUANTILES.tolist(), 'values': np.quantile(residuals, SKETCH_QUANTILES).tolist()},
+        'density': {'actual_edges': actual_edges.tolist(), 'predicted_edges': predicted_edges.tolist(),
+                    'counts': grid.astype(int).tolist()},
+    })
+    return summary
+
+
+def record(name, version, model, frame, target, features=None, model_dir=MODEL_DIR, data_hash=None):
+    """Write the test-set evaluation and training history of a registered model version to the store.
+
+    The test rows are the model's own held-out rows of ``frame``; rows
+    without an observed target are skipped. Predictions and residuals go to
+    a float32 Parquet file, the per-epoch history (Keras models) to another,
+    and the pre-binned summary to JSON, all staged and moved into place together.
+    ``data_hash`` is the version of ``frame`` (default: the loaded data's).
+    """
+    from data_access import data_version
+    from model_refresh import held_out_rows
+
+    frame = frame.reset_index(drop=True)
+    rows = held_out_rows(model, frame)
+    actual = frame[target].to_numpy(dtype=np.float64)[rows]
+    predicted = np.asarray(model.predict(frame, features), dtype=np.float64)[rows]
+    scored = ~np.isnan(actual) & ~np.isnan(predicted)
+    rows, actual, predicted = rows[scored], actual[scored], predicted[scored]
+    history = {key: [float(value) for value in values] for key, values in (getattr(model, 'history', None) or {}).items()}
+
+    final = evaluation_path(name, version, model_dir)
+    staging = f"{final}.{os.getpid()}.tmp"
+    os.makedirs(staging)
+    try:
+        pd.DataFrame({
+            'station_id': frame['station_id'].to_numpy()[rows], 'Datetime': frame['Datetime'].to_numpy()[rows],
+            'actual': actual.astype(np.float32), 'predicted': predicted.astype(np.float32),
+            'residual': (actual - predicted).astype(np.float32),
+        }).to_parquet(os.path.join(staging, PREDICTIONS_FILE), index=False, compression='zstd')
+        if history:
+            table = pd.DataFrame(history)
+            table.insert(0, 'epoch', np.arange(1, len(table) + 1))
+            table.astype({key: np.float32 for key in history}).to_parquet(os.path.join(staging, HISTORY_FILE), index=False)
+        summary = {'model': name, 'version': int(version), 'target': target, 'data_version': data_hash or data_version(),
+                   'created': pd.Timestamp.now(tz='UTC').isoformat(), **summarize(actual, predicted, history)}
+        with open(os.path.join(staging, SUMMARY_NAME), 'w') as handle:
+            json.dump(summary, handle)
+        shutil.rmtree(final, ignore_errors=True)
+        os.replace(staging, final)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    return summary
+
+
+def backfill(names=None, model_dir=MODEL_DIR):
+    """Record the latest registered version of every model that has no evaluation yet; returns {name: outcome}."""
+    from data_access import load_data
+    from model_registry import ModelRegistry
+    from model_common import model_labels, model_module
+
+    registry = ModelRegistry(model_dir)
+    outcomes = {}
+    for name in names or list(model_labels()):
+        version = registry.latest(name)
+        if version is None:
+            outcomes[name] = "not trained"
+        elif version in versions(name, model_dir):
+            outcomes[name] = f"version {version} already recorded"
+        else:
+            try:
+                model = registry.load(name, version, mmap=True)
+            except ImportError as error:
+                outcomes[name] = f"skipped: {error}"
+                continue
+            record(name, version, model, load_data(), model_module(name).TARGET, model_dir=model_dir)
+            outcomes[name] = f"version {version} recorded"
+    return outcomes
+
+
+@st.cache_resource(show_spinner=False, max_entries=64)
+def _summary_cached(model_dir, name, version):
+    with open(os.path.join(evaluation_path(name, version, model_dir), SUMMARY_NAME)) as handle:
+        return json.load(handle)
+
+
+def latest_summaries(names, model_dir=MODEL_DIR):
+    """{name: summary} of the newest recorded version of each of ``names`` that has one; no prediction arrays are read."""
+    summaries = {}
+    for name in names:
+        recorded = versions(name, model_dir)
+        if recorded:
+            summaries[name] = _summary_cached(model_dir, name, recorded[-1])
+    return summaries
+
+
+@st.cache_resource(show_spinner=False, max_entries=16)
+def _history_cached(model_dir, name, version):
+    path = os.path.join(evaluation_path(name, version, model_dir), HISTORY_FILE)
+    return pd.read_parquet(path) if os.path.exists(path) else None
+
+
+def quantile(summary, q):
+    """Residual quantile ``q`` interpolated from the stored sketch."""
+    sketch = summary['residual_sketch']
+    return float(np.interp(q, sketch['quantiles'], sketch['values']))
+
+
+def metrics_table(summaries, labels):
+    return pd.DataFrame([{
+        'Model': labels.get(name, name), 'Version': summary['version'], 'Test rows': summary['rows'],
+        'MSE': summary['metrics']['mse'], 'MAE': summary['metrics']['mae'], 'R² Score': summary['metrics']['r2'],
+    } for name, summary in summaries.items()])
+
+
+def quantile_table(summaries, labels, quantiles=REPORT_QUANTILES):
+    return pd.DataFrame([{'Model': labels.get(name, name), **{f"p{round(q * 100)}": quantile(summary, q) for q in quantiles}}
+                         for name, summary in summaries.items()])
+
+
+def plot_residual_histograms(summaries, labels):
+    fig, ax = plt.subplots(figsize=(8, 6))
+    for name, summary in summaries.items():
+        histogram = summary['residual_histogram']
+        ax.stairs(histogram['counts'], histogram['edges'], fill=True, alpha=0.5, label=labels.get(name, name))
+    ax.axvline(0, color='red', linestyle='--')
+    ax.set_title("Residual Distribution (Test Set)")
+    ax.set_xlabel("Residuals")
+    ax.set_ylabel("Frequency")
+    ax.legend()
+    return fig
+
+
+def plot_densities(summaries, labels):
+    """Actual against predicted as a count grid per model, with the ideal-fit diagonal."""
+    fig, axes = plt.subplots(1, len(summaries), figsize=(6 * len(summaries), 5), squeeze=False)
+    for ax, (name, summary) in zip(axes[0], summaries.items()):
+        density = summary['density']
+        actual_edges, predicted_edges = np.asarray(density['actual_edges']), np.asarray(density['predicted_edges'])
+        counts = np.ma.masked_equal(np.asarray(density['counts']), 0)
+        mesh = ax.pcolormesh(actual_edges, predicted_edges, counts.T, cmap='viridis')
+        ax.plot(actual_edges[[0, -1]], predicted_edges[[0, -1]], linestyle='--', color='red', label="Ideal Fit")
+        ax.set_title(labels.get(name, name))
+        ax.set_xlabel("Actual")
+        ax.set_ylabel("Predicted")
+        ax.legend()
+        fig.colorbar(mesh, ax=ax, label="Rows")
+    fig.tight_layout()
+    return fig
+
+
+def plot_histories(histories, labels):
+    fig, ax = plt.subplots(figsize=(8, 5))
+    for name, history in histories.items():
+        label = labels.get(name, name)
+        ax.plot(history['epoch'], history['loss'], marker='o', markersize=3, label=f"{label} training")
+        if 'val_loss' in history:
+            ax.plot(history['epoch'], history['val_loss'], linestyle='--', marker='x', markersize=3, label=f"{label} validation")
+    ax.set_title("Training and Validation Loss")
+    ax.set_xlabel("Epochs")
+    ax.set_ylabel("Loss")
+    ax.legend()
+    return fig
+
+
+def _missing(chart):
+    st.info(f"No recorded {chart} yet. Train the models, or run `python evaluation_store.py` to record already registered ones.")
+
+
+def show_history(names, chart_id, model_dir=MODEL_DIR):
+    """Render the recorded per-epoch loss of ``names`` (Keras models), or how to produce it."""
+    from model_common import model_labels
+
+    recorded = {name: versions(name, model_dir)[-1] for name in names if versions(name, model_dir)}
+    histories = {name: _history_cached(model_dir, name, version) for name, version in recorded.items()}
+    histories = {name: history for name, history in histories.items() if history is not None}
+    if not histories:
+        _missing("training history")
+        return
+    version = '-'.join(f"{name}.{recorded[name]}" for name in histories)
+    show_figure(chart_id, version, lambda: plot_histories(histories, model_labels()))
+
+
+def show_diagnostics(names, chart_id, model_dir=MODEL_DIR):
+    """Render test-set metrics, residual quantiles, residual histograms and actual-vs-predicted grids for ``names``."""
+    from model_common import model_labels
+
+    summaries = latest_summaries(names, model_dir)
+    if not summaries:
+        _missing("evaluations")
+        return
+    labels = model_labels()
+    st.table(metrics_table(summaries, labels))
+    # A version whose held-out rows all lacked a target has metrics of None and no residuals to draw
+    summaries = {name: summary for name, summary in summaries.items() if summary['rows']}
+    if not summaries:
+        st.info("No held-out row of these models has an observed target, so there are no residuals to show.")
+        return
+    st.write("Residual percentiles (actual minus predicted, in feet):")
+    st.table(quantile_table(summaries, labels))
+    version = '-'.join(f"{name}.{summary['version']}" for name, summary in summaries.items())
+    show_figure(f"{chart_id}-residuals", version, lambda: plot_residual_histograms(summaries, labels))
+    show_figure(f"{chart_id}-density", version, lambda: plot_densities(summaries, labels))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Record test-set evaluations of registered models that have none yet.")
+    parser.add_argument("models", nargs="*", help="models to record (default: all six)")
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    args = parser.parse_args()
+    for model_name, outcome in backfill(args.models or None, args.model_dir).items():
+        print(f"{model_name}: {outcome}")
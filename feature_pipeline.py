@@ -0,0 +1,142 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+import streamlit as st
+
+from data_access import DATUM_COLUMNS, data_version, load_data
+
+FEATURE_CACHE_DIR = ".feature_cache"
+PIPELINE_NAME = "pipeline.json"
+
+# Mean-imputed measurements, then the calendar columns derived from Datetime
+NUMERIC_COLUMNS = DATUM_COLUMNS + ['Inf']
+CALENDAR_COLUMNS = ['Year', 'Month', 'Day', 'Hour', 'Sin_Hour', 'Cos_Hour']
+INPUT_COLUMNS = NUMERIC_COLUMNS + ['station_id', 'Datetime']
+
+
+class FeaturePipeline:
+    """The notebooks' preprocessing as one fitted transform with a frozen output schema.
+
+    ``fit`` learns the column means used for imputation and the sorted
+    training stations; from then on ``transform`` returns the same float64
+    columns in the same order for any rows shaped like ``load_data()``:
+    imputed datums and Inf, Year/Month/Day/Hour, the cyclic hour, the raw
+    station id and one dummy per training station (unseen stations encode as
+    all zeros). Models select the columns they were built on by name, so
+    training, serving and the dashboard all featurize identically.
+    """
+
+    def __init__(self, means=None, stations=None):
+        self.means = None if means is None else {column: float(means[column]) for column in NUMERIC_COLUMNS}
+        self.stations = None if stations is None else np.asarray(stations, dtype=np.int64)
+
+    def fit(self, frame):
+        self.means = {column: float(value) for column, value in frame[NUMERIC_COLUMNS].astype(np.float64).mean().items()}
+        self.stations = np.sort(frame['station_id'].unique()).astype(np.int64)
+        return self
+
+    @property
+    def station_columns(self):
+        return [f"station_id_{station_id}" for station_id in self.stations]
+
+    @property
+    def columns(self):
+        return NUMERIC_COLUMNS + CALENDAR_COLUMNS + ['station_id'] + self.station_columns
+
+    def dummy_columns(self, drop_first):
+        # pd.get_dummies(drop_first=True) on the training stations drops the lowest id
+        return self.station_columns[1:] if drop_first else self.station_columns
+
+    def indices(self, columns):
+        positions = {column: position for position, column in enumerate(self.columns)}
+        unknown = [column for column in columns if column not in positions]
+        if unknown:
+            raise KeyError(f"Columns not produced by this pipeline: {', '.join(unknown)}")
+        return [positions[column] for column in columns]
+
+    def mean(self, column):
+        return self.means[column]
+
+    def transform(self, frame):
+        """Every output column for ``frame`` in one pass, as a float64 array of shape (rows, len(columns))."""
+        if self.means is None:
+            raise ValueError("FeaturePipeline must be fitted before transform")
+        missing = [column for column in INPUT_COLUMNS if column not in frame.columns]
+        if missing:
+            raise ValueError(f"Rows are missing input columns: {', '.join(missing)}")
+        features = np.empty((len(frame), len(self.columns)), dtype=np.float64)
+        numeric = len(NUMERIC_COLUMNS)
+        values = frame[NUMERIC_COLUMNS].to_numpy(dtype=np.float64)
+        means = np.array([self.means[column] for column in NUMERIC_COLUMNS])
+        features[:, :numeric] = np.where(np.isnan(values), means, values)
+
+        # Calendar fields straight from the datetime64 values instead of one .dt accessor per column
+        stamps = frame['Datetime'].to_numpy(dtype='datetime64[us]')
+        months = stamps.astype('datetime64[M]')
+        days = stamps.astype('datetime64[D]')
+        calendar = features[:, numeric:numeric + len(CALENDAR_COLUMNS)]
+        calendar[:, 0] = months.astype(np.int64) // 12 + 1970
+        calendar[:, 1] = months.astype(np.int64) % 12 + 1
+        calendar[:, 2] = (days - months.astype('datetime64[D]')).astype(np.int64) + 1
+        calendar[:, 3] = (stamps.astype('datetime64[h]') - days.astype('datetime64[h]')).astype(np.int64)
+        calendar[np.isnat(stamps), :4] = np.nan
+        calendar[:, 4] = np.sin(2 * np.pi * calendar[:, 3] / 24)
+        calendar[:, 5] = np.cos(2 * np.pi * calendar[:, 3] / 24)
+
+        station_ids = frame['station_id'].to_numpy(dtype=np.int64)
+        features[:, numeric + len(CALENDAR_COLUMNS)] = station_ids
+        features[:, numeric + len(CALENDAR_COLUMNS) + 1:] = station_ids[:, None] == self.stations[None, :]
+        return features
+
+    def schema(self, columns=None, dtype='float64'):
+        return [{'name': column, 'dtype': dtype} for column in (self.columns if columns is None else columns)]
+
+    def to_dict(self):
+        return {'means': self.means, 'stations': self.stations.tolist(), 'columns': self.columns}
+
+    @classmethod
+    def from_dict(cls, state):
+        pipeline = cls(state['means'], state['stations'])
+        if pipeline.columns != state['columns']:
+            raise ValueError("Stored pipeline schema does not match the columns this code produces")
+        return pipeline
+
+    @property
+    def fingerprint(self):
+        # Identical for any two pipelines fitted on the same data, so cached matrices are shared
+        return hashlib.sha1(json.dumps(self.to_dict(), sort_keys=True).encode()).hexdigest()[:16]
+
+    def save(self, directory):
+        with open(os.path.join(directory, PIPELINE_NAME), 'w') as handle:
+            json.dump(self.to_dict(), handle, indent=2)
+
+    @classmethod
+    def load(cls, directory):
+        with open(os.path.join(directory, PIPELINE_NAME)) as handle:
+            return cls.from_dict(json.load(handle))
+
+
+def fit_pipeline(frame):
+    return FeaturePipeline().fit(frame)
+
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def _features_cached(fingerprint, version, path, _pipeline):
+    # Keyed on (pipeline, data version); the .npy copy lets training runs in other processes skip the transform
+    cache_path = os.path.join(FEATURE_CACHE_DIR, f"{version}-{fingerprint}.npy")
+    if os.path.exists(cache_path):
+        return np.load(cache_path, mmap_mode='r')
+    features = _pipeline.transform(load_data(path))
+    os.makedirs(FEATURE_CACHE_DIR, exist_ok=True)
+    staging = f"{cache_path}.{os.getpid()}.tmp"
+    with open(staging, 'wb') as handle:
+        np.save(handle, features)
+    os.replace(staging, cache_path)
+    return np.load(cache_path, mmap_mode='r')
+
+
+def data_features(pipeline, path=None):
+    """``pipeline.transform(load_data(path))``, computed once per data version and shared read-only."""
+    return _features_cached(pipeline.fingerprint, data_version(path), path, pipeline)
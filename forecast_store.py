@@ -0,0 +1,273 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from feature_pipeline import NUMERIC_COLUMNS
+from render_cache import show_figure
+from station_forecasts import MIN_PARALLEL_STATIONS
+from tidal_models import MODEL_DIR
+
+FORECAST_STORE_DIR = "forecast_store"
+MANIFEST_NAME = "manifest.json"
+FORECAST_FILE = "forecasts.parquet"
+# Months ahead the job forecasts and the pages offer; every month up to the longest is stored
+HORIZONS = [6, 12, 24]
+STORE_COLUMNS = ['model', 'model_version', 'target', 'Datetime', 'months_ahead', 'predicted']
+
+# Registered models each worker process has loaded, by name
+_MODELS = {}
+
+
+def station_version(history):
+    """Hash of one station's input rows: changes only when that station's data does."""
+    columns = ['Datetime'] + NUMERIC_COLUMNS
+    return hashlib.sha1(pd.util.hash_pandas_object(history[columns], index=False).to_numpy().tobytes()).hexdigest()[:16]
+
+
+def future_rows(history, horizon):
+    """Input rows for the ``horizon`` months after a station's last observation.
+
+    Measurements are not known ahead of time, so each future month carries
+    the station's average for that calendar month (its overall average where
+    the month was never observed) and the most common Inf flag; only the
+    date advances. Shaped like ``load_data()`` so any model can predict them.
+    """
+    last = history['Datetime'].max()
+    stamps = pd.date_range(last + pd.DateOffset(months=1), periods=horizon, freq='MS') + (last - last.normalize())
+    climate = history.groupby('Month')[NUMERIC_COLUMNS].mean().reindex(stamps.month)
+    rows = climate.fillna(history[NUMERIC_COLUMNS].mean()).reset_index(drop=True)
+    rows['Inf'] = history['Inf'].mode().iloc[0] if history['Inf'].notna().any() else 0
+    rows['station_id'] = history['station_id'].iloc[0]
+    rows['Datetime'] = stamps
+    rows['Date'] = rows['Datetime'].dt.normalize()
+    rows['Time (GMT)'] = rows['Datetime'].dt.strftime('%H:%M')
+    rows['Year'] = rows['Datetime'].dt.year.astype(np.int32)
+    rows['Month'] = rows['Datetime'].dt.month.astype(np.int32)
+    return rows[history.columns]
+
+
+def _load_models(model_dir, versions):
+    # Worker initializer: every model is loaded once per process, not once per station
+    from model_registry import ModelRegistry
+    from tcn_lstm_inference import SERVING_RUNTIME, use_runtime
+
+    registry = ModelRegistry(model_dir)
+    _MODELS.clear()
+    for name, version in versions.items():
+        try:
+            _MODELS[name] = (version, registry.load(name, version, mmap=True))
+        except ImportError:
+            # A model whose library is not installed here is left out of the store, as the server does
+            continue
+        if name == 'tcn_lstm':
+            try:
+                use_runtime(_MODELS[name][1], SERVING_RUNTIME, registry, version)
+            except Exception:
+                # Forecasts stay correct on Keras, only slower
+                pass
+
+
+def _forecast_job(station_id, history, horizon):
+    # Top-level so it can be pickled to worker processes; models come from the initializer
+    from model_common import model_module
+
+    history = history.sort_values('Datetime', ignore_index=True)
+    future = future_rows(history, horizon)
+    parts = []
+    for name, (version, model) in _MODELS.items():
+        # Sequence models need their look-back window of real rows before the first future month
+        context = history.tail(model.context_rows)
+        rows = pd.concat([context, future], ignore_index=True)
+        predicted = np.asarray(model.predict(rows), dtype=np.float64).ravel()[len(context):]
+        parts.append(pd.DataFrame({
+            'model': name, 'model_version': version, 'target': model_module(name).TARGET,
+            'Datetime': future['Datetime'], 'months_ahead': np.arange(1, horizon + 1, dtype=np.int32),
+            'predicted': predicted,
+        }))
+    return station_id, pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=STORE_COLUMNS)
+
+
+def station_path(station_id, store_dir=FORECAST_STORE_DIR):
+    return os.path.join(store_dir, f"station_id={int(station_id)}", FORECAST_FILE)
+
+
+def read_manifest(store_dir=FORECAST_STORE_DIR):
+    path = os.path.join(store_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return None
+    with open(path) as handle:
+        return json.load(handle)
+
+
+def registered_versions(model_dir=MODEL_DIR, names=None):
+    """Latest registered version of every model in ``names`` (default: all six) that has been trained."""
+    from model_registry import ModelRegistry
+    from model_common import model_labels
+
+    registry = ModelRegistry(model_dir)
+    versions = {name: registry.latest(name) for name in names or list(model_labels())}
+    return {name: version for name, version in versions.items() if version is not None}
+
+
+def precompute(frame=None, horizons=HORIZONS, model_dir=MODEL_DIR, names=None, store_dir=FORECAST_STORE_DIR,
+               max_workers=None):
+    """Forecast every station with every registered model and write the results to the forecast store.
+
+    One Parquet file per station holds every model's forecast for each
+    month up to the longest horizon. A station is recomputed only when its
+    input rows, the model versions or the horizon differ from what the store
+    recorded for it; the rest are kept as they are. Stations are forecast in
+    parallel on a process pool that loads each model once per worker. The
+    manifest is written last, so its version stamp changes only once every
+    station file is in place.
+    """
+    from data_access import data_version, frame_version, load_data
+
+    data_hash = data_version() if frame is None else frame_version(frame)
+    frame = load_data() if frame is None else frame
+    versions = registered_versions(model_dir, names)
+    horizon = max(horizons)
+    previous = read_manifest(store_dir) or {'stations': {}}
+    stations, pending = {}, {}
+    for station_id, history in frame.groupby('station_id', sort=True):
+        entry = {'inputs': station_version(history), 'models': versions, 'horizon': horizon}
+        stations[str(int(station_id))] = entry
+        if previous['stations'].get(str(int(station_id))) != entry or not os.path.exists(station_path(station_id, store_dir)):
+            pending[int(station_id)] = history
+
+    started = time.perf_counter()
+    if versions and len(pending) >= MIN_PARALLEL_STATIONS and max_workers != 1:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_load_models, initargs=(model_dir, versions)) as pool:
+            jobs = [pool.submit(_forecast_job, station_id, history, horizon) for station_id, history in pending.items()]
+            forecasts = [job.result() for job in jobs]
+    elif versions:
+        _load_models(model_dir, versions)
+        forecasts = [_forecast_job(station_id, history, horizon) for station_id, history in pending.items()]
+    else:
+        forecasts = []
+    for station_id, forecast in forecasts:
+        path = station_path(station_id, store_dir)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        staging = f"{path}.{os.getpid()}.tmp"
+        forecast[STORE_COLUMNS].to_parquet(staging, index=False)
+        os.replace(staging, path)
+    # Stations no longer in the data have nothing current to show
+    for station_id in set(previous['stations']) - set(stations):
+        shutil.rmtree(os.path.dirname(station_path(station_id, store_dir)), ignore_errors=True)
+
+    stamp = json.dumps({'stations': stations, 'horizons': sorted(horizons)}, sort_keys=True)
+    manifest = {
+        'version': hashlib.sha1(stamp.encode()).hexdigest()[:16],
+        'created': pd.Timestamp.now(tz='UTC').isoformat(),
+        'data_version': data_hash,
+        'horizons': sorted(horizons),
+        'models': versions,
+        'stations': stations,
+    }
+    os.makedirs(store_dir, exist_ok=True)
+    path = os.path.join(store_dir, MANIFEST_NAME)
+    staging = f"{path}.{os.getpid()}.tmp"
+    with open(staging, 'w') as handle:
+        json.dump(manifest, handle, indent=2)
+    os.replace(staging, path)
+    return {'version': manifest['version'], 'stations': len(stations), 'recomputed': sorted(pending) if versions else [],
+            'models': versions, 'seconds': round(time.perf_counter() - started, 2)}
+
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def _store_cached(store_dir, version):
+    # Keyed on the manifest's version stamp: read once per precompute run, then every slice is a dict lookup
+    manifest = read_manifest(store_dir)
+    slices = {}
+    for station_id in manifest['stations']:
+        path = station_path(station_id, store_dir)
+        if not os.path.exists(path):
+            continue
+        for name, rows in pd.read_parquet(path).groupby('model', sort=False):
+            slices[(name, int(station_id))] = rows.sort_values('months_ahead', ignore_index=True)
+    return manifest, slices
+
+
+def load_store(store_dir=FORECAST_STORE_DIR):
+    """(manifest, {(model, station_id): forecast rows}) of the current store, or None before the first run."""
+    manifest = read_manifest(store_dir)
+    return None if manifest is None else _store_cached(store_dir, manifest['version'])
+
+
+def forecast_slice(slices, station_id, models, horizon):
+    """Stored forecasts of ``models`` for one station, up to ``horizon`` months ahead."""
+    parts = [slices[(name, station_id)] for name in models if (name, station_id) in slices]
+    if not parts:
+        return pd.DataFrame(columns=STORE_COLUMNS)
+    rows = pd.concat(parts, ignore_index=True)
+    return rows[rows['months_ahead'] <= horizon]
+
+
+def plot_forecasts(history, forecasts, target, labels, years=10):
+    """The station's last ``years`` of ``target`` followed by each model's forecast."""
+    fig, ax = plt.subplots(figsize=(12, 5))
+    recent = history[history['Datetime'] > history['Datetime'].max() - pd.DateOffset(years=years)]
+    ax.plot(recent['Datetime'], recent[target], color='black', label="Observed")
+    for name, rows in forecasts.groupby('model', sort=False):
+        ax.plot(rows['Datetime'], rows['predicted'], marker='.', label=labels.get(name, name))
+    ax.set_title(f"{target} Forecast")
+    ax.set_xlabel("Date")
+    ax.set_ylabel(target)
+    ax.legend()
+    fig.tight_layout()
+    return fig
+
+
+def show_forecasts(models, target, chart_id):
+    """Render the precomputed forecasts of ``models`` for one chosen station, or how to produce them."""
+    from data_access import data_version, load_data
+    from model_common import model_labels
+
+    stored = load_store()
+    if stored is None:
+        st.info("No precomputed forecasts yet. Run `python forecast_store.py` to forecast every station with the trained models.")
+        return
+    manifest, slices = stored
+    available = [name for name in models if any(key[0] == name for key in slices)]
+    if not available:
+        st.info("None of these models were trained when the forecasts were computed. Train them, then rerun `python forecast_store.py`.")
+        return
+    stations = [int(station_id) for station_id in manifest['stations']]
+    station_id = st.selectbox("Station", stations, key=f"{chart_id}-station")
+    horizon = st.select_slider("Months ahead", manifest['horizons'], value=manifest['horizons'][-1], key=f"{chart_id}-horizon")
+    forecasts = forecast_slice(slices, station_id, available, horizon)
+    labels = model_labels()
+    table = forecasts.pivot(index='Datetime', columns='model', values='predicted').rename(columns=labels).rename_axis(columns=None)
+    st.table(table.set_index(table.index.strftime('%Y-%m')))
+    data = load_data()
+    history = data[data['station_id'] == station_id]
+    show_figure(f"{chart_id}-{station_id}-{horizon}", manifest['version'],
+                lambda: plot_forecasts(history, forecasts, target, labels))
+    models_used = ", ".join(f"{labels[name]} v{manifest['models'][name]}" for name in available)
+    stale = " The data has changed since; rerun the job to refresh them." if manifest['data_version'] != data_version() else ""
+    st.caption(f"Precomputed {manifest['created'][:19]} UTC (store version {manifest['version']}) with {models_used}.{stale}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Precompute every station's forecasts with every registered model.")
+    parser.add_argument("models", nargs="*", help="models to forecast with (default: every registered model)")
+    parser.add_argument("--horizons", type=int, nargs="+", default=HORIZONS, help="months ahead offered to the pages")
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    parser.add_argument("--store-dir", default=FORECAST_STORE_DIR)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+    # Run through the imported module so worker processes unpickle forecast_store.*, not __main__.*
+    import forecast_store
+
+    print(json.dumps(forecast_store.precompute(None, args.horizons, args.model_dir, args.models or None, args.store_dir,
+                                               args.workers)))
@@ -3,6 +3,93 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
 
+from data_access import data_version, load_data
+from evaluation_store import show_diagnostics, show_history
+from forecast_store import show_forecasts
+from model_benchmark import show_costs
+from model_serving import evaluation_frame, get_model_server, score
+from render_cache import show_figure
+from tidal_models import MODEL_LABELS
+from time_series_cv import show_cv
+
+
+def plot_residuals(evaluation):
+    fig, ax = plt.subplots(figsize=(8, 6))
+    for name, part in evaluation.groupby('model', sort=False):
+        ax.hist(part['residual'], bins=30, alpha=0.5, label=MODEL_LABELS[name])
+    ax.axvline(0, color='red', linestyle='--')
+    ax.set_title("Residual Distribution")
+    ax.set_xlabel("Residuals")
+    ax.set_ylabel("Frequency")
+    ax.legend()
+    return fig
+
+
+def plot_actual_vs_predicted(evaluation):
+    fig, ax = plt.subplots(figsize=(8, 6))
+    for name, part in evaluation.groupby('model', sort=False):
+        ax.scatter(part['actual'], part['predicted'], alpha=0.5, label=MODEL_LABELS[name])
+    low, high = evaluation['actual'].min(), evaluation['actual'].max()
+    ax.plot([low, high], [low, high], linestyle="--", color="red", label="Ideal Fit")
+    ax.set_title("Actual vs Predicted Values")
+    ax.set_xlabel("Actual")
+    ax.set_ylabel("Predicted")
+    ax.legend()
+    return fig
+
+
+def live_predictions():
+    server = get_model_server()
+    for name, reason in server.unavailable.items():
+        st.caption(f"{MODEL_LABELS[name]}: {reason}")
+    if not server.models:
+        st.info("No trained models found. Run `python tidal_models.py` to train and persist them.")
+        return
+
+    data = load_data()
+    stations = sorted(int(station_id) for station_id in data['station_id'].unique())
+    selected = st.multiselect("Stations", stations, default=stations, key="highest_stations")
+    first, last = int(data['Year'].min()), int(data['Year'].max())
+    start, end = st.slider("Years", first, last, (first, last), key="highest_years")
+    held_out = st.checkbox("Held-out test rows only", value=True, key="highest_held_out")
+    rows = data[data['station_id'].isin(selected) & data['Year'].between(start, end)]
+    if held_out:
+        rows = rows[server.held_out(rows)]
+    if rows.empty:
+        st.write("No rows match the selected stations and years.")
+        return
+
+    # One batched call per model over every selected row
+    evaluation = evaluation_frame(rows, server.predict(rows, data_rows=True))
+    performance = score(evaluation).merge(server.latency()[['Model', 'p50 (ms)', 'p99 (ms)']], on='Model')
+    st.write("**Live Model Performance**")
+    st.table(performance)
+    st.write("""
+    Metrics are computed from predictions served by the persisted models for the rows selected above. 
+    Latency is the wall time of one prediction batch, aggregated over every request this process has served.
+    """)
+    st.write("**Model Artifacts**")
+    st.table(server.artifacts(current_data=data_version()))
+    st.write("""
+    Each model is loaded once per process from the versioned registry. Tree ensembles are memory-mapped read-only, 
+    so their node arrays show up as mapped rather than resident memory and are shared by every worker on the host.
+    """)
+
+    version = f"{data_version()}-{server.version}"
+    selection = f"{'-'.join(map(str, selected))}-{start}-{end}-{held_out}"
+    st.write("**Residual Distribution**")
+    st.write("""
+    The histogram shows the distribution of residuals (actual minus predicted) for each model. 
+    Residuals centred on zero with a narrow spread indicate unbiased, accurate predictions.
+    """)
+    show_figure(f"highest-residuals-{selection}", version, lambda: plot_residuals(evaluation))
+    st.write("**Actual vs Predicted Values**")
+    st.write("""
+    Points close to the dashed diagonal are accurate predictions; points far from it are the largest errors.
+    """)
+    show_figure(f"highest-actual-vs-predicted-{selection}", version, lambda: plot_actual_vs_predicted(evaluation))
+
+
 def display():
     st.title("Highest Tidal Level Prediction")
     st.write("""
@@ -167,6 +254,8 @@ def display():
         st.write("""
     1. **Initial Forecast with Prophet:**  
        Prophet was used to model the temporal trends and seasonality in the tidal data. It provided baseline predictions (**yhat**) for the highest tidal levels. 
+       The notebook fitted one Prophet model to all five stations together; the served model fits one per station, in parallel, and reuses a 
+       station's cached forecast until its data changes. 
        However, Prophet's limitations in capturing complex nonlinear relationships resulted in residual errors.
     2. **Residual Correction with XGBoost:**  
        These residual errors (actual - yhat) were then modeled using XGBoost. By leveraging features such as tidal attributes (e.g., MHHW, MHW), temporal features 
@@ -328,60 +417,51 @@ def display():
         ax.set_xticklabels(models, rotation=45)
         ax.legend()
         st.pyplot(fig)
+
+        st.write("**Training Time, Prediction Latency and Memory**")
+        st.write("""
+        Each model is trained and timed in a fresh process by the benchmark suite, on the real data and on synthetic copies 
+        of it at larger scales. The table reports fit wall and CPU time, peak resident memory and median prediction latency 
+        per batch size on the real data; the charts show how training time grows with rows and latency with batch size.
+        """)
+        show_costs(list(MODEL_LABELS), "highest-benchmark")
+
+        st.write("**Time-Ordered Cross-Validation**")
+        st.write("""
+        The scores above come from a random 80/20 split, which lets a model train on months that come after the ones it is 
+        tested on. Here every station is split by date instead: each fold trains on earlier months only and tests on the 
+        next two years, either with all earlier history (expanding) or the last ten years (sliding). Scores are averaged 
+        over folds; the second table breaks the expanding-window MSE down by station.
+        """)
+        show_cv(list(MODEL_LABELS), "highest-time-series-cv")
     
         # Training and Validation Loss for LSTM
         st.write("**Training and Validation Loss (LSTM)**")
         st.write("""
-        This line plot tracks the training and validation loss over 50 epochs for the LSTM model. The training loss steadily decreases, 
-        indicating that the model is learning patterns in the data. Validation loss, while slightly higher due to unseen data, closely follows 
-        the training loss curve, suggesting the model generalizes well without overfitting. This visualization highlights the effectiveness 
-        of the model architecture and training process in achieving robust predictions.
+        This line plot tracks the training and validation loss of the registered LSTM, epoch by epoch, as recorded during its training run. 
+        A steadily decreasing training loss shows the model learning patterns in the data; a validation loss that closely follows it 
+        suggests the model generalizes without overfitting.
         """)
-        epochs = np.arange(1, 51)
-        training_loss = np.exp(-epochs / 20) + np.random.normal(0, 0.01, len(epochs))
-        validation_loss = training_loss + np.random.normal(0, 0.02, len(epochs))
-        fig2, ax2 = plt.subplots()
-        ax2.plot(epochs, training_loss, label="Training Loss", marker="o")
-        ax2.plot(epochs, validation_loss, label="Validation Loss", linestyle="--", marker="x")
-        ax2.set_title("Training and Validation Loss")
-        ax2.set_xlabel("Epochs")
-        ax2.set_ylabel("Loss")
-        ax2.legend()
-        st.pyplot(fig2)
-    
-        # Residual Distribution
-        st.write("**Residual Distribution (Random Forest)**")
+        show_history(['lstm'], "highest-lstm-loss")
+
+        st.write("**Test-Set Diagnostics**")
         st.write("""
-        The histogram shows the distribution of residuals (errors) for the Random Forest model, with most residuals centered around zero. 
-        This symmetric, bell-shaped distribution implies minimal bias in the predictions and that errors are randomly distributed. 
-        The narrow spread of residuals demonstrates the model’s accuracy, as most predictions are close to the actual values. 
-        This visualization confirms the reliability of the Random Forest model for predicting tidal levels.
+        Recorded when each model was trained, from its predictions on its own held-out test rows. The tables give the scores 
+        and the spread of the residuals; the charts show the residual distribution and where actual and predicted values fall 
+        against the ideal diagonal. They are drawn from stored histograms, so no model is loaded to show them.
         """)
-        residuals = np.random.normal(0, 0.1, 100)
-        fig3, ax3 = plt.subplots()
-        ax3.hist(residuals, bins=20, color="green", edgecolor="black")
-        ax3.set_title("Residual Distribution")
-        ax3.set_xlabel("Residuals")
-        ax3.set_ylabel("Frequency")
-        st.pyplot(fig3)
+        show_diagnostics(list(MODEL_LABELS), "highest-test-diagnostics")
     
-        # Actual vs Predicted Scatter Plot
-        st.write("**Actual vs Predicted Values (LSTM)**")
+        # Residuals and actual-vs-predicted from the persisted models, for the rows picked here
+        live_predictions()
+
+        st.write("**Forecasts**")
         st.write("""
-        The scatter plot compares actual and predicted values for the LSTM model, with most points clustering near the diagonal line representing perfect predictions. 
-        The close alignment of points with the ideal fit line shows the model's accuracy in forecasting tidal levels. 
-        Outliers are rare, reflecting the LSTM model's ability to generalize well. This visualization underscores the model’s strong predictive capability for sequential tidal data.
+        Forecasts of the highest tidal level for the months after each station's last observation. They are computed ahead of time 
+        by `python forecast_store.py`, not while the page loads. Future months use the station's average datums for 
+        that calendar month as inputs. A station is forecast again only when its data or a model version changes.
         """)
-        actual = np.random.normal(5, 0.5, 100)
-        predicted = actual + np.random.normal(0, 0.1, 100)
-        fig4, ax4 = plt.subplots()
-        ax4.scatter(actual, predicted, alpha=0.7, label="Predicted vs Actual")
-        ax4.plot([4, 6], [4, 6], linestyle="--", color="red", label="Ideal Fit")
-        ax4.set_title("Actual vs Predicted Values")
-        ax4.set_xlabel("Actual")
-        ax4.set_ylabel("Predicted")
-        ax4.legend()
-        st.pyplot(fig4)
+        show_forecasts(list(MODEL_LABELS), 'Highest', "highest-forecasts")
 
     # Conclusion Section
     st.subheader("Conclusion")
@@ -0,0 +1,329 @@
+import hashlib
+import itertools
+import json
+import math
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+import pandas as pd
+
+from model_common import SHARED, SharedArrays, attach_shared
+from tidal_models import RANDOM_STATE
+
+SEARCH_DIR = "searches"
+CV_FOLDS = 3
+ETA = 3
+# Smallest per-fold training set a rung may use; the grids' min_samples_split goes up to 10
+MIN_RESOURCE = 60
+
+# The notebooks' GridSearchCV grids
+SEARCH_SPACES = {
+    'decision_tree': {
+        'max_depth': [5, 10, 15, None],
+        'min_samples_split': [2, 5, 10],
+        'min_samples_leaf': [1, 2, 5],
+    },
+    'random_forest': {
+        'n_estimators': [50, 100, 200],
+        'max_depth': [5, 10, 15, None],
+        'min_samples_split': [2, 5, 10],
+        'min_samples_leaf': [1, 2, 5],
+    },
+    'prophet_xgboost': {
+        'n_estimators': [100, 200, 300],
+        'max_depth': [3, 5, 7],
+        'learning_rate': [0.01, 0.1, 0.2],
+        'subsample': [0.6, 0.8, 1.0],
+        'colsample_bytree': [0.6, 0.8, 1.0],
+        'min_child_weight': [1, 5, 10],
+    },
+}
+
+# What the grid searches picked, as hard-coded in tidal_models
+NOTEBOOK_PARAMS = {
+    'decision_tree': {'max_depth': 5, 'min_samples_split': 2, 'min_samples_leaf': 5},
+    'random_forest': {'n_estimators': 200, 'max_depth': 10, 'min_samples_split': 2, 'min_samples_leaf': 1},
+    'prophet_xgboost': {'n_estimators': 200, 'max_depth': 3, 'learning_rate': 0.1, 'subsample': 0.6,
+                        'colsample_bytree': 0.6, 'min_child_weight': 1},
+}
+
+
+def build_estimator(name, params):
+    # One thread per trial: the process pool is what spreads work over the cores
+    if name == 'decision_tree':
+        from sklearn.tree import DecisionTreeRegressor
+        return DecisionTreeRegressor(random_state=RANDOM_STATE, **params)
+    if name == 'random_forest':
+        from sklearn.ensemble import RandomForestRegressor
+        return RandomForestRegressor(random_state=RANDOM_STATE, n_jobs=1, **params)
+    if name == 'prophet_xgboost':
+        from xgboost import XGBRegressor
+        return XGBRegressor(random_state=RANDOM_STATE, n_jobs=1, **params)
+    raise ValueError(f"Unknown model {name!r}")
+
+
+def search_data(name, frame=None):
+    """Training rows and target exactly as ``tidal_models.train_model`` fits them; the test split is never searched."""
+    from data_access import load_data
+    from feature_pipeline import data_features, fit_pipeline
+    from tidal_models import TARGET, TREE_FEATURES, TreeModel, split_rows
+
+    loaded = frame is None
+    frame = (load_data() if loaded else frame).reset_index(drop=True)
+    pipeline = fit_pipeline(frame)
+    features = data_features(pipeline) if loaded else pipeline.transform(frame)
+    target = frame[TARGET].fillna(pipeline.mean(TARGET)).to_numpy(dtype=np.float64)
+    train_rows, _ = split_rows(len(frame))
+    if name == 'prophet_xgboost':
+        from station_forecasts import forecast_stations, forecast_values
+
+        # The corrector is tuned on the per-station Prophet residuals the model is trained on
+        results = forecast_stations(frame[['station_id', 'Datetime']].assign(y=target), column='y')
+        target = target - forecast_values(results, frame)
+    matrix = TreeModel(name, None, pipeline).matrix(frame, TREE_FEATURES, features)
+    return matrix[train_rows], target[train_rows]
+
+
+def candidates(space):
+    """Every combination of ``space`` in ParameterGrid order."""
+    keys = sorted(space)
+    return [dict(zip(keys, values)) for values in itertools.product(*(space[key] for key in keys))]
+
+
+def fold_rows(n, folds=CV_FOLDS, seed=RANDOM_STATE):
+    """KFold(folds) splits as GridSearchCV(cv=folds) draws them, training rows shuffled once per fold.
+
+    A rung with budget ``r`` trains on the first ``r`` shuffled rows, so every
+    candidate at a rung sees the same subsample, larger rungs extend it and
+    the full budget is exactly the KFold training fold.
+    """
+    from sklearn.model_selection import KFold
+
+    rng = np.random.default_rng(seed)
+    return [(rng.permutation(train), valid) for train, valid in KFold(folds).split(np.arange(n))]
+
+
+def _evaluate(name, params, resource):
+    # Top-level so it can be pickled to worker processes; only the parameters travel
+    X, y = SHARED['X'][1], SHARED['y'][1]
+    started, errors = time.process_time(), []
+    for fold in range(sum(key.startswith('train_') for key in SHARED)):
+        # Original row order, so a full-budget trial fits exactly what GridSearchCV fits
+        train = np.sort(SHARED[f"train_{fold}"][1][:resource])
+        valid = SHARED[f"valid_{fold}"][1]
+        predicted = build_estimator(name, params).fit(X[train], y[train]).predict(X[valid])
+        errors.append(float(np.mean((y[valid] - predicted) ** 2)))
+    return {'params': params, 'resource': int(resource), 'fold_mse': errors,
+            'mse': float(np.mean(errors)), 'cpu_seconds': time.process_time() - started}
+
+
+def _key(params, resource):
+    return json.dumps(params, sort_keys=True, default=str) + f"@{resource}"
+
+
+class SearchLog:
+    """Append-only JSON-lines record of finished trials, keyed by parameters and budget.
+
+    The file name carries a hash of the search data, so results are reused
+    only for the same rows and folds. Trials are appended as they finish;
+    rerunning an interrupted search replays the same rungs and only fits
+    what the log is missing.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.trials = {}
+        if os.path.exists(path):
+            with open(path) as handle:
+                for line in handle:
+                    # A crash mid-write leaves at most one truncated last line
+                    try:
+                        trial = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    self.trials[_key(trial['params'], trial['resource'])] = trial
+
+    def get(self, params, resource):
+        return self.trials.get(_key(params, resource))
+
+    def add(self, trial):
+        self.trials[_key(trial['params'], trial['resource'])] = trial
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path, 'a') as handle:
+            handle.write(json.dumps(trial, default=str) + "\n")
+
+
+class Search:
+    """Successive-halving / Hyperband search over one model's grid, run on a process pool.
+
+    The budget is the number of training rows per fold: each rung scores its
+    candidates with 3-fold CV on that many rows, keeps the best 1/``eta``
+    and multiplies the budget by ``eta`` until the full fold is reached.
+    Hyperband runs several such brackets, from many cheap candidates to a
+    few at full budget. X, y and the folds live in shared memory for the
+    life of the pool. ``budget_seconds`` stops launching trials once
+    exceeded; the log keeps everything finished, so the next run resumes.
+    """
+
+    def __init__(self, name, X, y, method='halving', eta=ETA, min_resource=MIN_RESOURCE,
+                 max_workers=None, budget_seconds=None, log_dir=SEARCH_DIR, seed=RANDOM_STATE):
+        if method not in ('halving', 'hyperband'):
+            raise ValueError(f"Unknown search method {method!r}")
+        self.name, self.method, self.eta, self.seed = name, method, eta, seed
+        self.X, self.y = np.asarray(X, dtype=np.float64), np.asarray(y, dtype=np.float64)
+        self.folds = fold_rows(len(self.y), seed=seed)
+        # Slicing past a shorter fold takes all of it, so the full budget is every training row
+        self.max_resource = max(len(train) for train, _ in self.folds)
+        self.min_resource = min(min_resource, self.max_resource)
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.budget_seconds = budget_seconds
+        digest = hashlib.sha1(self.X.tobytes())
+        digest.update(self.y.tobytes())
+        self.log = SearchLog(os.path.join(log_dir, f"{name}-{digest.hexdigest()[:12]}.jsonl"))
+        self.fitted = 0
+
+    def _run_rung(self, pool, configs, resource, deadline):
+        results, pending = {}, {}
+        for index, params in enumerate(configs):
+            cached = self.log.get(params, resource)
+            if cached is not None:
+                results[index] = cached
+            elif deadline is None or time.perf_counter() < deadline:
+                pending[pool.submit(_evaluate, self.name, params, resource)] = index
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                trial = future.result()
+                self.log.add(trial)
+                self.fitted += 1
+                results[pending.pop(future)] = trial
+            if deadline is not None and time.perf_counter() >= deadline:
+                for future in pending:
+                    future.cancel()
+                break
+        return [results.get(index) for index in range(len(configs))]
+
+    def _halving(self, pool, configs, resource, deadline):
+        """Run one bracket from ``resource`` rows; returns False if the time budget cut it short."""
+        while True:
+            trials = self._run_rung(pool, configs, resource, deadline)
+            if any(trial is None for trial in trials):
+                return False
+            if resource >= self.max_resource or len(configs) == 1:
+                return True
+            # Stable sort: ties go to the earlier grid point, as in GridSearchCV
+            order = np.argsort([trial['mse'] for trial in trials], kind='stable')
+            configs = [configs[index] for index in order[:max(1, math.ceil(len(configs) / self.eta))]]
+            resource *= self.eta
+            # Round the last partial step up to the full fold rather than adding a near-duplicate rung
+            if resource * self.eta > self.max_resource:
+                resource = self.max_resource
+
+    def brackets(self):
+        """(candidates, starting rows) per bracket; a single full-grid bracket for plain halving."""
+        grid = candidates(SEARCH_SPACES[self.name])
+        if self.method == 'halving':
+            # Start small enough that the grid shrinks to a handful by the full budget
+            rungs = min(math.ceil(math.log(len(grid), self.eta)),
+                        int(math.log(self.max_resource / self.min_resource, self.eta)))
+            return [(grid, max(self.min_resource, self.max_resource // self.eta ** rungs))]
+        rng = np.random.default_rng(self.seed)
+        s_max = int(math.log(self.max_resource / self.min_resource, self.eta))
+        brackets = []
+        for s in range(s_max, -1, -1):
+            count = min(len(grid), math.ceil((s_max + 1) / (s + 1) * self.eta ** s))
+            chosen = sorted(rng.choice(len(grid), count, replace=False))
+            brackets.append(([grid[index] for index in chosen], max(self.min_resource, self.max_resource // self.eta ** s)))
+        return brackets
+
+    def run(self):
+        """Run (or resume) the search; returns a summary with the best full-budget configuration."""
+        started = time.perf_counter()
+        deadline = None if self.budget_seconds is None else started + self.budget_seconds
+        complete = True
+        with SharedArrays(self._arrays()) as shared, \
+                ProcessPoolExecutor(self.max_workers, initializer=attach_shared, initargs=(shared.spec,)) as pool:
+            for configs, resource in self.brackets():
+                complete = self._halving(pool, configs, resource, deadline) and complete
+        final = [trial for trial in self.log.trials.values() if trial['resource'] == self.max_resource]
+        best = min(final, key=lambda trial: trial['mse']) if final else None
+        return {
+            'model': self.name, 'method': self.method, 'complete': complete,
+            'best_params': best and best['params'], 'best_mse': best and best['mse'],
+            'trials_fitted': self.fitted, 'trials_logged': len(self.log.trials),
+            'cpu_seconds': sum(trial['cpu_seconds'] for trial in self.log.trials.values()),
+            'seconds': time.perf_counter() - started,
+        }
+
+    def _arrays(self):
+        arrays = {'X': self.X, 'y': self.y}
+        for fold, (train, valid) in enumerate(self.folds):
+            arrays[f"train_{fold}"], arrays[f"valid_{fold}"] = train, valid
+        return arrays
+
+    def score(self, params):
+        """Full-budget CV MSE of ``params`` on the same folds, e.g. for the notebook's choice."""
+        with SharedArrays(self._arrays()) as shared, \
+                ProcessPoolExecutor(1, initializer=attach_shared, initargs=(shared.spec,)) as pool:
+            trial = self.log.get(params, self.max_resource) or pool.submit(_evaluate, self.name, params, self.max_resource).result()
+        return trial['mse']
+
+
+def benchmark(name, method='halving', log_dir=None, frame=None):
+    """Wall time and CV MSE of the search against the notebook's exhaustive GridSearchCV(cv=3, n_jobs=-1).
+
+    Runs in a fresh log directory unless one is given, so nothing is resumed.
+    """
+    import tempfile
+
+    from sklearn.model_selection import GridSearchCV, KFold
+
+    X, y = search_data(name, frame)
+    with tempfile.TemporaryDirectory() as scratch:
+        search = Search(name, X, y, method=method, log_dir=log_dir or scratch)
+        result = search.run()
+        notebook_mse = search.score(NOTEBOOK_PARAMS[name])
+        started = time.perf_counter()
+        grid = GridSearchCV(build_estimator(name, {}), SEARCH_SPACES[name], cv=KFold(CV_FOLDS),
+                            scoring='neg_mean_squared_error', n_jobs=-1).fit(X, y)
+        grid_seconds = time.perf_counter() - started
+    grid_fits = len(candidates(SEARCH_SPACES[name])) * CV_FOLDS
+    return pd.DataFrame([
+        {'search': f"GridSearchCV ({grid_fits} fits)", 'seconds': grid_seconds,
+         'cv_mse': -grid.best_score_, 'params': grid.best_params_},
+        {'search': f"{method} ({result['trials_fitted'] * CV_FOLDS} fits)", 'seconds': result['seconds'],
+         'cv_mse': result['best_mse'], 'params': result['best_params']},
+        {'search': 'notebook choice', 'seconds': np.nan, 'cv_mse': notebook_mse, 'params': NOTEBOOK_PARAMS[name]},
+    ])
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Search the Highest models' hyperparameters by successive halving.")
+    parser.add_argument("models", nargs="*", help=f"models to tune, any of {', '.join(SEARCH_SPACES)} (default: all)")
+    parser.add_argument("--method", choices=['halving', 'hyperband'], default='halving')
+    parser.add_argument("--eta", type=int, default=ETA)
+    parser.add_argument("--workers", type=int, default=None, help="process pool size (default: all cores)")
+    parser.add_argument("--budget", type=float, default=None, help="seconds after which no new trials start")
+    parser.add_argument("--log-dir", default=SEARCH_DIR)
+    parser.add_argument("--benchmark", action="store_true", help="also time the exhaustive GridSearchCV")
+    args = parser.parse_args()
+    unknown = sorted(set(args.models) - set(SEARCH_SPACES))
+    if unknown:
+        parser.error(f"unknown models: {', '.join(unknown)}")
+
+    for model_name in args.models or list(SEARCH_SPACES):
+        try:
+            if args.benchmark:
+                print(f"{model_name}:")
+                print(benchmark(model_name, args.method).to_string(index=False))
+                continue
+            outcome = Search(model_name, *search_data(model_name), method=args.method, eta=args.eta,
+                             max_workers=args.workers, budget_seconds=args.budget, log_dir=args.log_dir).run()
+        except ImportError as error:
+            print(f"{model_name}: skipped: {error}")
+            continue
+        print(json.dumps(outcome, default=str))
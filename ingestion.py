@@ -0,0 +1,163 @@
+import abc
+import argparse
+import io
+import os
+import random
+import time
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from data_access import DATUM_COLUMNS, parse_station_csv
+import station_store
+
+CATALOG_PATH = "sea_level_station_products.csv"
+
+
+class StationNotFound(LookupError):
+    """The source has no data for a station; never retried."""
+
+
+def read_catalog(path=CATALOG_PATH):
+    """Station ids listed in the first column of the products catalog."""
+    catalog = pd.read_csv(path, usecols=['station_id'], dtype={'station_id': str})
+    ids = catalog['station_id'].str.strip()
+    return [int(station_id) for station_id in ids[ids.str.isdigit()].drop_duplicates()]
+
+
+class StationSource(abc.ABC):
+    """Interface for anything that can supply monthly extremes/datums for a station.
+
+    ``fetch`` returns a frame with at least Datetime, the datum columns and Inf,
+    containing only rows strictly newer than ``since`` when it is given.
+    """
+
+    @abc.abstractmethod
+    def fetch(self, station_id, since=None):
+        """Rows of ``station_id`` newer than ``since``; raises StationNotFound when there are none to have."""
+
+
+class LocalDirectorySource(StationSource):
+    """Per-station CSVs shaped like 'station 1611400dataaset.csv' in a directory."""
+
+    def __init__(self, directory, pattern="station {station_id}dataaset.csv"):
+        self.directory = directory
+        self.pattern = pattern
+
+    def fetch(self, station_id, since=None):
+        path = os.path.join(self.directory, self.pattern.format(station_id=station_id))
+        if not os.path.exists(path):
+            raise StationNotFound(station_id)
+        rows = parse_station_csv(path, station_id=station_id)
+        if since is not None:
+            rows = rows[rows['Datetime'] > since]
+        return rows
+
+
+class NoaaApiSource(StationSource):
+    """Monthly means from the NOAA CO-OPS data API, the service the dataset was scraped from."""
+
+    URL = "https://api.tidesandcurrents.noaa.gov/api/prod/datagetter"
+    FIRST_YEAR = 1900
+
+    def __init__(self, timeout=30):
+        self.timeout = timeout
+
+    def fetch(self, station_id, since=None):
+        begin = (since + pd.DateOffset(months=1)) if since is not None else pd.Timestamp(self.FIRST_YEAR, 1, 1)
+        end = pd.Timestamp.today().normalize()
+        if begin > end:
+            return pd.DataFrame(columns=['Datetime'] + DATUM_COLUMNS + ['Inf'])
+        query = urllib.parse.urlencode({
+            'product': 'monthly_mean', 'datum': 'STND', 'units': 'english', 'time_zone': 'gmt',
+            'format': 'csv', 'application': 'sea_level_rise', 'station': station_id,
+            'begin_date': begin.strftime('%Y%m%d'), 'end_date': end.strftime('%Y%m%d'),
+        })
+        with urllib.request.urlopen(f"{self.URL}?{query}", timeout=self.timeout) as response:
+            body = response.read().decode('utf-8')
+        if body.lstrip().startswith('Error') or 'No data was found' in body:
+            raise StationNotFound(station_id)
+        return self._parse(body, since)
+
+    @staticmethod
+    def _parse(body, since):
+        raw = pd.read_csv(io.StringIO(body))
+        raw.columns = [column.strip() for column in raw.columns]
+        rows = pd.DataFrame({'Datetime': pd.to_datetime(dict(year=raw['Year'], month=raw['Month'], day=1))})
+        for column in DATUM_COLUMNS:
+            name = column.replace(' (ft)', '')
+            rows[column] = pd.to_numeric(raw.get(name), errors='coerce').astype(np.float64)
+        flags = raw['Inf'] if 'Inf' in raw else pd.Series(0, index=raw.index)
+        rows['Inf'] = pd.to_numeric(flags, errors='coerce').fillna(0).astype(np.int16)
+        if since is not None:
+            rows = rows[rows['Datetime'] > since]
+        return rows
+
+
+def fetch_with_retry(source, station_id, since, retries=3, backoff=0.5):
+    """Call ``source.fetch`` retrying I/O errors with jittered exponential backoff."""
+    for attempt in range(retries + 1):
+        try:
+            return source.fetch(station_id, since), attempt + 1
+        except StationNotFound:
+            raise
+        except OSError:
+            if attempt == retries:
+                raise
+            time.sleep(backoff * (2 ** attempt) * (1 + random.random()))
+
+
+def ingest_station(source, station_id, store_dir=station_store.STORE_DIR, retries=3, backoff=0.5):
+    # Only months newer than the last stored record are fetched and appended
+    since = station_store.last_timestamp(station_id, store_dir)
+    result = {'station_id': station_id, 'since': since, 'rows': 0, 'attempts': 0, 'status': 'up-to-date', 'error': None}
+    try:
+        rows, result['attempts'] = fetch_with_retry(source, station_id, since, retries, backoff)
+    except StationNotFound:
+        result['status'] = 'not-found'
+        return result
+    except Exception as error:
+        result.update(status='failed', error=repr(error))
+        return result
+
+    rows = rows.dropna(subset=['Datetime'])
+    if since is not None:
+        rows = rows[rows['Datetime'] > since]
+    rows = rows.drop_duplicates(subset=['Datetime'], keep='last')
+    if not rows.empty:
+        station_store.write_station(rows, station_id, store_dir)
+        result.update(status='appended', rows=len(rows))
+    return result
+
+
+def ingest_catalog(source, stations=None, store_dir=station_store.STORE_DIR, max_workers=8, retries=3, backoff=0.5):
+    """Ingest every catalog station concurrently on a bounded thread pool.
+
+    Stations write to separate partitions, so workers never contend on files.
+    Returns one summary row per station.
+    """
+    stations = read_catalog() if stations is None else stations
+    results = []
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(ingest_station, source, station_id, store_dir, retries, backoff) for station_id in stations]
+        for future in as_completed(futures):
+            results.append(future.result())
+    return pd.DataFrame(results).sort_values('station_id', ignore_index=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest the station catalog into the station store.")
+    parser.add_argument('--directory', help="read per-station CSVs from this directory instead of the NOAA API")
+    parser.add_argument('--catalog', default=CATALOG_PATH)
+    parser.add_argument('--store', default=station_store.STORE_DIR)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--retries', type=int, default=3)
+    args = parser.parse_args()
+
+    source = LocalDirectorySource(args.directory) if args.directory else NoaaApiSource()
+    summary = ingest_catalog(source, read_catalog(args.catalog), args.store, args.workers, args.retries)
+    print(summary.to_string(index=False))
+    print(summary['status'].value_counts().to_string())
@@ -1,7 +1,12 @@
 import streamlit as st
 import pandas as pd
 import matplotlib.pyplot as plt
-import numpy as np
+
+from evaluation_store import latest_summaries, show_diagnostics, show_history
+from forecast_store import show_forecasts
+from model_benchmark import fit_summary, load_results, show_costs
+from tcn_lstm_inference import show_inference
+from time_series_cv import show_cv
 
 def display():
     st.title("Mean Sea Level Prediction")
@@ -195,24 +200,67 @@ def display():
 
         # Comparison Table
         st.write("**Comparison Table:**")
+        benchmark = load_results()
         model_comparison = pd.DataFrame({
             "Criteria": ["Objective", "Architecture", "MSE", "MAE", "R² Score", "Training Duration", "Model Complexity", "Overfitting Risk", "Strengths", "Limitations"],
             "TCN Model": [
-                "Predict MSL", "Temporal Convolutional Network", "0.0230", "0.1333", "0.650+", "Relatively Fast", "Moderate", "Low to Moderate",
+                "Predict MSL", "Temporal Convolutional Network", "0.0230", "0.1333", "0.650+", fit_summary(benchmark, 'tcn', "Relatively Fast"), "Moderate", "Low to Moderate",
                 "Stable and interpretable for time-series", "Limited ability to model long-term dependencies"
             ],
             "Hybrid (TCN+LSTM)": [
-                "Predict MSL", "Combination of TCN and LSTM", "0.0042", "0.0254", "0.9799", "Longer due to complexity", "High", "Moderate, mitigated with regularization",
+                "Predict MSL", "Combination of TCN and LSTM", "0.0042", "0.0254", "0.9799", fit_summary(benchmark, 'tcn_lstm', "Longer due to complexity"), "High", "Moderate, mitigated with regularization",
                 "Captures both temporal and sequential patterns", "Risk of overfitting due to model complexity"
             ]
         }).set_index("Criteria")
         st.table(model_comparison)
 
+        st.write("**Measured Training Time, Prediction Latency and Memory**")
+        st.write("""
+        Training duration above is the measured fit time when benchmark results are available. The table and charts below 
+        come from the benchmark suite: fit wall and CPU time, peak resident memory and median prediction latency per batch size.
+        """)
+        show_costs(['tcn', 'tcn_lstm'], "mean-sea-level-benchmark")
+
+        st.write("**CPU Inference for the Hybrid TCN-LSTM**")
+        st.write("""
+        For CPU-only serving the Hybrid TCN-LSTM is exported once per registered version: as a graph traced with a fixed 
+        input signature, and as TFLite models with float32, float16 or int8 weights. Every station's forecast is made in a single 
+        batched call. The table compares throughput for a 300-station catalog, and accuracy on the held-out rows, 
+        against Keras predicting one station per call.
+        """)
+        show_inference()
+
+        st.write("**Time-Ordered Cross-Validation**")
+        st.write("""
+        Each station is split by date rather than at random: every fold trains on earlier months and tests on the next two 
+        years, so no future month leaks into training. The tables give the mean and spread of the scores over folds and 
+        the mean squared error per station.
+        """)
+        show_cv(['tcn', 'tcn_lstm'], "mean-sea-level-time-series-cv")
+
+        st.write("**Mean Sea Level Forecasts**")
+        st.write("""
+        Forecasts of the Mean Sea Level for the months after each station's last observation. They come from the precomputed forecast 
+        store that `python forecast_store.py` fills. Choose a station and a horizon to see both models next to the recent observations.
+        """)
+        show_forecasts(['tcn', 'tcn_lstm'], 'MSL (ft)', "mean-sea-level-forecasts")
+
+        # Measured test-set scores when the models have been trained here, the notebook's otherwise
+        models = ["TCN", "Hybrid (TCN+LSTM)"]
+        recorded = latest_summaries(['tcn', 'tcn_lstm'])
+        # A metric is None when a version had no scored test rows (or a constant target, for R²)
+        measured = len(recorded) == 2 and all(summary['metrics'][metric] is not None
+                                              for summary in recorded.values() for metric in ['mse', 'r2'])
+        if measured:
+            mse_values = [round(recorded[name]['metrics']['mse'], 4) for name in ['tcn', 'tcn_lstm']]
+            r2_scores = [round(recorded[name]['metrics']['r2'], 4) for name in ['tcn', 'tcn_lstm']]
+        else:
+            mse_values = [0.0230, 0.0042]
+            r2_scores = [0.650, 0.9799]
+
         # Visualization 1: MSE Comparison
         st.write("**Mean Squared Error (MSE) Comparison**")
         fig1, ax1 = plt.subplots()
-        models = ["TCN", "Hybrid (TCN+LSTM)"]
-        mse_values = [0.0230, 0.0042]
         ax1.bar(models, mse_values, color=['skyblue', 'orange'])
         ax1.set_title("MSE Comparison")
         st.write("This bar chart illustrates the Mean Squared Error (MSE) for the TCN and Hybrid TCN-LSTM models. The MSE is a critical metric that measures the average squared difference between predicted and actual values. A lower MSE indicates higher model accuracy. The chart highlights that the Hybrid TCN-LSTM significantly outperforms the TCN model, with a much lower MSE, demonstrating its ability to make more precise predictions.")
@@ -226,24 +274,22 @@ def display():
         st.write("**R² Score Comparison**")
         st.write("The bar chart showcases the R² Score, which indicates how well the model explains the variance in the data. A higher R² Score reflects better predictive performance. The Hybrid TCN-LSTM model achieves an impressive R² of 0.9799, compared to 0.650 for the TCN model, underscoring its ability to capture both short-term and long-term dependencies effectively.")
         fig2, ax2 = plt.subplots()
-        r2_scores = [0.650, 0.9799]
         ax2.bar(models, r2_scores, color=['green', 'purple'])
         ax2.set_title("R² Score Comparison")
         ax2.set_ylabel("R² Score")
         for i, v in enumerate(r2_scores):
             ax2.text(i, v + 0.01, str(v), ha='center')
         st.pyplot(fig2)
-
-        # Visualization 3: Residual Histogram for Hybrid Model
-        st.write("**Residual Distribution for Hybrid Model (TCN-LSTM):**")
-        st.write("The histogram visualizes the residuals (differences between actual and predicted values) for the Hybrid TCN-LSTM model. A symmetric distribution centered around zero suggests that the model has minimal prediction bias. Most residuals are close to zero, indicating that the model provides highly accurate predictions with small and balanced errors.")
-        residuals = np.random.normal(0, 0.05, 100)  # Simulated residuals
-        fig3, ax3 = plt.subplots()
-        ax3.hist(residuals, bins=15, color='blue', alpha=0.7, edgecolor='black')
-        ax3.set_title("Residual Distribution")
-        ax3.set_xlabel("Residuals")
-        ax3.set_ylabel("Frequency")
-        st.pyplot(fig3)
+        st.caption("Scores of the registered models on their held-out test rows." if measured
+                   else "Scores as reported in the modelling notebook; train both models to show measured ones.")
+
+        # Visualization 3: Residuals and loss curves recorded when the models were trained
+        st.write("**Residual Distribution and Test-Set Diagnostics:**")
+        st.write("The histogram visualizes the residuals (differences between actual and predicted values) of each model on its held-out test rows. A symmetric distribution centered around zero suggests that the model has minimal prediction bias; the percentiles show how wide the errors spread, and the grids show where actual and predicted values fall against the ideal diagonal.")
+        show_diagnostics(['tcn', 'tcn_lstm'], "mean-sea-level-test-diagnostics")
+        st.write("**Training and Validation Loss:**")
+        st.write("The loss per epoch recorded while training each network. Early stopping restores the Hybrid TCN-LSTM's best epoch, so its curve ends shortly after the validation loss stops improving.")
+        show_history(['tcn', 'tcn_lstm'], "mean-sea-level-loss")
 
     # Back Button
     if st.button("Back to Models Implemented"):
@@ -0,0 +1,199 @@
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from model_common import model_labels
+from render_cache import show_figure
+
+BENCHMARK_PATH = os.path.join("benchmarks", "models.json")
+BATCH_SIZES = [1, 32, 1024]
+SCALES = [1, 4, 16]
+REPEATS = 20
+SEED = 0
+
+
+def scaled_dataset(frame, scale, seed=SEED):
+    """``frame`` plus synthetic stations learned from it, ``scale`` times as many stations in all."""
+    from synthetic_data import SyntheticStations, fit_profiles
+
+    if scale == 1:
+        return frame
+    profiles = fit_profiles(frame)
+    synthetic = SyntheticStations(profiles, (scale - 1) * len(profiles), seed=seed).frame()
+    return pd.concat([frame, synthetic], ignore_index=True)
+
+
+def _peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _run(name, scale, batch_sizes, repeats, seed):
+    """Train and time one model in this (fresh) process; top-level so it can run in a spawned worker."""
+    import sea_level_models
+    import tidal_models
+    from data_access import load_data
+
+    module = sea_level_models if name in sea_level_models.MODEL_LABELS else tidal_models
+    frame = scaled_dataset(load_data(), scale, seed)
+    row = {'model': name, 'target': module.TARGET, 'scale': scale, 'rows': len(frame), 'baseline_rss_mb': _peak_rss_mb()}
+    started = time.perf_counter()
+    try:
+        model = module.train_model(name, frame)
+    except ImportError as error:
+        return {**row, 'status': f"skipped: {error}"}
+    row.update({
+        'status': 'ok',
+        # Fit alone; train_seconds adds preprocessing and scoring the test split
+        'fit_seconds': model.metrics['fit_seconds'],
+        'cpu_seconds': model.metrics['fit_cpu_seconds'],
+        'train_seconds': time.perf_counter() - started,
+        'mse': model.metrics['mse'], 'mae': model.metrics['mae'], 'r2': model.metrics['r2'],
+        'latency': [],
+    })
+    rng = np.random.default_rng(seed)
+    for batch_rows in batch_sizes:
+        timings = []
+        for _ in range(repeats):
+            start = int(rng.integers(0, max(1, len(frame) - batch_rows - model.context_rows)))
+            batch = frame.iloc[start:start + batch_rows + model.context_rows]
+            started = time.perf_counter()
+            model.predict(batch)
+            timings.append(1000 * (time.perf_counter() - started))
+        row['latency'].append({'batch_rows': batch_rows, 'p50_ms': float(np.percentile(timings, 50)),
+                               'p99_ms': float(np.percentile(timings, 99))})
+    row['peak_rss_mb'] = _peak_rss_mb()
+    return row
+
+
+def run(models=None, scales=SCALES, batch_sizes=BATCH_SIZES, repeats=REPEATS, seed=SEED, path=BENCHMARK_PATH):
+    """Benchmark every (model, scale) in its own spawned process and write the results to ``path``.
+
+    A fresh interpreter per run keeps peak RSS attributable to one model and
+    one dataset; scale 1 is the real data as is, larger scales add seeded
+    synthetic stations from ``synthetic_data``.
+    """
+    from data_access import data_version
+
+    context = multiprocessing.get_context('spawn')
+    rows = []
+    for name in models or list(model_labels()):
+        for scale in scales:
+            with ProcessPoolExecutor(1, mp_context=context) as pool:
+                rows.append(pool.submit(_run, name, scale, list(batch_sizes), repeats, seed).result())
+            print(f"{name} x{scale}: {rows[-1]['status']}", flush=True)
+    results = {
+        'created': pd.Timestamp.now(tz='UTC').isoformat(),
+        'data_version': data_version(),
+        'seed': seed,
+        'host': {'platform': platform.platform(), 'python': platform.python_version(), 'cpus': os.cpu_count(),
+                 'numpy': np.__version__, 'pandas': pd.__version__},
+        'results': rows,
+    }
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    staging = f"{path}.{os.getpid()}.tmp"
+    with open(staging, 'w') as handle:
+        json.dump(results, handle, indent=2)
+    os.replace(staging, path)
+    return results
+
+
+def load_results(path=BENCHMARK_PATH):
+    if not os.path.exists(path):
+        return None
+    with open(path) as handle:
+        return json.load(handle)
+
+
+def cost_table(results, models, scale=1):
+    """One display row per model at ``scale``: fit time, CPU time, peak memory, latency and accuracy."""
+    labels = model_labels()
+    rows = []
+    for row in results['results']:
+        if row['model'] not in models or row['scale'] != scale:
+            continue
+        entry = {'Model': labels.get(row['model'], row['model']), 'Rows': row['rows']}
+        if row['status'] != 'ok':
+            rows.append({**entry, 'Status': row['status']})
+            continue
+        entry.update({'Status': 'ok', 'Fit (s)': row['fit_seconds'], 'CPU (s)': row['cpu_seconds'],
+                      'Peak RSS (MB)': row['peak_rss_mb']})
+        for latency in row['latency']:
+            entry[f"p50 @{latency['batch_rows']} rows (ms)"] = latency['p50_ms']
+        entry.update({'MSE': row['mse'], 'R² Score': row['r2']})
+        rows.append(entry)
+    return pd.DataFrame(rows)
+
+
+def plot_costs(results, models):
+    """Fit time against dataset size and prediction latency against batch size, one line per model."""
+    labels = model_labels()
+    measured = [row for row in results['results'] if row['model'] in models and row['status'] == 'ok']
+    fig, (fit_ax, latency_ax) = plt.subplots(1, 2, figsize=(12, 5))
+    for name in models:
+        runs = sorted((row for row in measured if row['model'] == name), key=lambda row: row['rows'])
+        if not runs:
+            continue
+        fit_ax.plot([row['rows'] for row in runs], [row['fit_seconds'] for row in runs], marker='o', label=labels[name])
+        smallest = runs[0]['latency']
+        latency_ax.plot([entry['batch_rows'] for entry in smallest], [entry['p50_ms'] for entry in smallest],
+                        marker='o', label=labels[name])
+    for ax, title, xlabel, ylabel in [(fit_ax, "Training Time", "Training rows", "Fit time (s)"),
+                                      (latency_ax, "Prediction Latency (p50)", "Batch rows", "Latency (ms)")]:
+        ax.set_xscale('log')
+        ax.set_yscale('log')
+        ax.set_title(title)
+        ax.set_xlabel(xlabel)
+        ax.set_ylabel(ylabel)
+        if ax.get_lines():
+            ax.legend()
+    fig.tight_layout()
+    return fig
+
+
+def fit_summary(results, name, default):
+    """Measured fit time of ``name`` on the real data for comparison tables; ``default`` when not measured."""
+    for row in (results or {}).get('results', []):
+        if row['model'] == name and row['scale'] == 1 and row['status'] == 'ok':
+            return f"{row['fit_seconds']:.2f} s ({row['cpu_seconds']:.2f} s CPU)"
+    return default
+
+
+def show_costs(models, chart_id):
+    """Render the measured cost table and chart for ``models``, or how to produce them."""
+    results = load_results()
+    if results is None:
+        st.info("No benchmark results yet. Run `python model_benchmark.py` to measure training time, latency and memory.")
+        return
+    st.table(cost_table(results, models))
+    st.caption(f"Measured {results['created'][:19]} UTC on {results['host']['cpus']} CPU(s), {results['host']['platform']}.")
+    show_figure(chart_id, results['created'], lambda: plot_costs(results, models))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Time training, prediction and peak memory of every model.")
+    parser.add_argument("models", nargs="*", help="models to benchmark (default: all six)")
+    parser.add_argument("--scales", type=int, nargs="+", default=SCALES, help="dataset sizes as multiples of the real data")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=BATCH_SIZES)
+    parser.add_argument("--repeats", type=int, default=REPEATS)
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--output", default=BENCHMARK_PATH)
+    args = parser.parse_args()
+    unknown = sorted(set(args.models) - set(model_labels()))
+    if unknown:
+        parser.error(f"unknown models: {', '.join(unknown)}")
+
+    outcome = run(args.models or None, args.scales, args.batch_sizes, args.repeats, args.seed, args.output)
+    print(cost_table(outcome, [row['model'] for row in outcome['results']]).to_string(index=False))
+    print(f"Wrote {args.output}")
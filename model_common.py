@@ -0,0 +1,66 @@
+import importlib.util
+from multiprocessing import shared_memory
+
+import numpy as np
+
+
+def model_module(name):
+    """The module (tidal_models or sea_level_models) that trains and registers model ``name``."""
+    import sea_level_models
+    import tidal_models
+
+    if name in sea_level_models.MODEL_LABELS:
+        return sea_level_models
+    if name in tidal_models.MODEL_LABELS:
+        return tidal_models
+    raise ValueError(f"Unknown model {name!r}")
+
+
+def model_labels():
+    """{name: display label} of all six models, Highest first."""
+    from sea_level_models import MODEL_LABELS as SEA_LEVEL_LABELS
+    from tidal_models import MODEL_LABELS as TIDAL_LABELS
+
+    return {**TIDAL_LABELS, **SEA_LEVEL_LABELS}
+
+
+def missing_libraries(name):
+    """Optional libraries model ``name`` needs that are not installed here."""
+    return [library for library in model_module(name).MODEL_LIBRARIES.get(name, [])
+            if importlib.util.find_spec(library) is None]
+
+
+class SharedArrays:
+    """Named arrays copied once into shared memory; workers map them instead of unpickling copies."""
+
+    def __init__(self, arrays):
+        self.blocks, self.spec = [], {}
+        for name, values in arrays.items():
+            values = np.ascontiguousarray(values)
+            block = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+            np.ndarray(values.shape, values.dtype, buffer=block.buf)[...] = values
+            self.blocks.append(block)
+            self.spec[name] = (block.name, values.shape, values.dtype.str)
+
+    def close(self):
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# Per-worker views of the shared arrays, {name: (block, array)}, set by attach_shared
+SHARED = {}
+
+
+def attach_shared(spec):
+    """Pool initializer: map the blocks of a ``SharedArrays.spec`` into ``SHARED``."""
+    for name, (block_name, shape, dtype) in spec.items():
+        block = shared_memory.SharedMemory(name=block_name)
+        SHARED[name] = (block, np.ndarray(shape, np.dtype(dtype), buffer=block.buf))
@@ -0,0 +1,151 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+from model_registry import ModelRegistry
+from tidal_models import MODEL_DIR
+
+# Full retrain when the current model's MSE on the new rows exceeds its held-out MSE by this factor
+DRIFT_FACTOR = 1.5
+# ...or when refreshing makes the held-out MSE this much worse
+DEGRADATION = 0.1
+
+
+def new_rows(model, frame):
+    """Positions of rows later than the last timestamp the model was trained on for their station."""
+    last = frame['station_id'].map(model.seen_through)
+    return np.flatnonzero(last.isna().to_numpy() | (frame['Datetime'] > last).to_numpy())
+
+
+def held_out_rows(model, frame):
+    keys = pd.MultiIndex.from_frame(frame[['station_id', 'Datetime']])
+    return np.flatnonzero(keys.isin(pd.MultiIndex.from_frame(model.test_keys)))
+
+
+def _mse(actual, predicted):
+    scored = ~np.isnan(actual) & ~np.isnan(predicted)
+    return float(np.mean((actual[scored] - predicted[scored]) ** 2)) if scored.any() else np.nan
+
+
+def _metrics(actual, predicted):
+    from sklearn.metrics import mean_absolute_error, r2_score
+
+    scored = ~np.isnan(actual) & ~np.isnan(predicted)
+    return {'mse': _mse(actual, predicted), 'mae': float(mean_absolute_error(actual[scored], predicted[scored])),
+            'r2': float(r2_score(actual[scored], predicted[scored]))}
+
+
+def refresh_model(name, frame=None, registry=None, drift_factor=DRIFT_FACTOR, degradation=DEGRADATION, compare=False):
+    """Bring the latest registered ``name`` up to date with ``frame``, incrementally unless accuracy says otherwise.
+
+    The held-out rows of the registered model stay held out, so metrics
+    before and after are comparable; every other row, the new ones
+    included, is training data. A model whose error on the new rows has
+    drifted, that meets a station its pipeline has never seen, or whose
+    refreshed held-out error is worse by more than ``degradation`` is
+    retrained from scratch instead. Returns one report row; the refreshed
+    or retrained model is registered as a new version.
+    """
+    from data_access import data_version, frame_version, load_data
+    from evaluation_store import record
+    from model_common import model_module
+
+    registry = registry or ModelRegistry(MODEL_DIR)
+    version = data_version() if frame is None else frame_version(frame)
+    frame = (load_data() if frame is None else frame).reset_index(drop=True)
+    module = model_module(name)
+    manifest = registry.manifest(name)
+    model = registry.load(name, manifest['version'], mmap=False)
+    previous = manifest['metrics']
+    actual = frame[module.TARGET].to_numpy(dtype=np.float64)
+    features = model.pipeline.transform(frame)
+    # The manifest MSE was scored on mean-imputed targets; rescore the held-out rows as every later check does
+    held_out = held_out_rows(model, frame)
+    before = _mse(actual[held_out], model.predict(frame, features)[held_out])
+    report = {'model': name, 'from_version': manifest['version'], 'test_mse_before': before,
+              'full_fit_seconds': previous.get('full_fit_seconds', previous['fit_seconds'])}
+
+    fresh = new_rows(model, frame) if getattr(model, 'seen_through', None) else np.arange(len(frame))
+    if len(fresh) == 0:
+        return {**report, 'mode': 'up to date', 'new_rows': 0}
+    reason = None
+    if not getattr(model, 'seen_through', None):
+        reason = "no record of its training rows"
+    elif not np.isin(frame['station_id'].unique(), model.pipeline.stations).all():
+        reason = "new station"
+    else:
+        new_mse = _mse(actual[fresh], model.predict(frame, features)[fresh])
+        report['new_rows_mse'] = new_mse
+        if new_mse > drift_factor * before:
+            reason = f"drift: new-row MSE {new_mse:.4f} > {drift_factor} x {before:.4f}"
+
+    if reason is None:
+        train = np.setdiff1d(model.sample_rows(frame), held_out)
+        target = np.where(np.isnan(actual), model.pipeline.mean(module.TARGET), actual)
+        started = time.perf_counter()
+        try:
+            model.refresh(frame, target, train, fresh, features)
+        except NotImplementedError:
+            reason = "no incremental update for this model"
+        else:
+            seconds = time.perf_counter() - started
+            metrics = _metrics(actual[held_out], model.predict(frame, features)[held_out])
+            if metrics['mse'] > (1 + degradation) * before:
+                reason = f"refresh degraded held-out MSE to {metrics['mse']:.4f}"
+    if reason is None:
+        mode = 'refresh'
+        model.seen_through = {**model.seen_through, **module.seen_through(frame)}
+        model.trained_at = pd.Timestamp.now(tz='UTC').isoformat()
+        model.metrics = {**metrics, 'fit_seconds': seconds, 'fit_cpu_seconds': None,
+                         'full_fit_seconds': report['full_fit_seconds'], 'refreshed_from': manifest['version']}
+        after = metrics['mse']
+        if compare:
+            report['full_fit_seconds'] = module.train_model(name, frame).metrics['fit_seconds']
+    else:
+        mode = 'full retrain'
+        model = module.train_model(name, frame)
+        seconds = model.metrics['fit_seconds']
+        model.metrics['full_fit_seconds'] = seconds
+        report['full_fit_seconds'] = seconds
+        rows = held_out_rows(model, frame)
+        after = _mse(actual[rows], model.predict(frame)[rows])
+    registered = registry.register(name, model, model.schema(), model.metrics, version, model.params())
+    record(name, registered['version'], model, frame, module.TARGET, None if mode == 'full retrain' else features,
+           registry.root, version)
+    return {**report, 'mode': mode, 'reason': reason, 'new_rows': len(fresh), 'seconds': seconds,
+            'test_mse_after': after, 'to_version': registered['version']}
+
+
+def refresh_models(names=None, frame=None, model_dir=MODEL_DIR, drift_factor=DRIFT_FACTOR, degradation=DEGRADATION,
+                   compare=False):
+    """Refresh every registered model in ``names`` (default: all) and return the report as a DataFrame."""
+    from model_common import model_labels
+
+    registry = ModelRegistry(model_dir)
+    rows = []
+    for name in names or list(model_labels()):
+        if registry.latest(name) is None:
+            rows.append({'model': name, 'mode': 'not trained'})
+            continue
+        try:
+            rows.append(refresh_model(name, frame, registry, drift_factor, degradation, compare))
+        except ImportError as error:
+            rows.append({'model': name, 'mode': f"skipped: {error}"})
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Update registered models with newly arrived rows instead of retraining.")
+    parser.add_argument("models", nargs="*", help="models to refresh (default: every registered model)")
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    parser.add_argument("--drift-factor", type=float, default=DRIFT_FACTOR)
+    parser.add_argument("--degradation", type=float, default=DEGRADATION)
+    parser.add_argument("--compare", action="store_true", help="also time a full retrain on the same rows (not registered)")
+    args = parser.parse_args()
+    table = refresh_models(args.models or None, None, args.model_dir, args.drift_factor, args.degradation, args.compare)
+    columns = [column for column in ['model', 'mode', 'new_rows', 'new_rows_mse', 'test_mse_before', 'test_mse_after',
+                                     'seconds', 'full_fit_seconds', 'reason'] if column in table]
+    print(table[columns].to_string(index=False, float_format=lambda value: f"{value:.4g}"))
@@ -0,0 +1,172 @@
+import copy
+import functools
+import gc
+import json
+import os
+import shutil
+import threading
+import time
+
+import joblib
+import pandas as pd
+
+from feature_pipeline import PIPELINE_NAME, FeaturePipeline
+from tree_ensemble import PackedEnsemble, packable
+
+REGISTRY_DIR = "models"
+MANIFEST_NAME = "manifest.json"
+
+
+def resident_bytes():
+    """Resident set size of this process; psutil when installed, /proc otherwise."""
+    try:
+        import psutil
+    except ImportError:
+        with open("/proc/self/statm") as handle:
+            return int(handle.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    return psutil.Process().memory_info().rss
+
+
+def _packed_attributes(model):
+    return [name for name in getattr(model, 'packed_attributes', ()) if packable(getattr(model, name, None))]
+
+
+class ModelRegistry:
+    """Versioned on-disk store of trained models.
+
+    Each version lives in ``<root>/<name>/<version>/`` with a manifest holding
+    the feature schema, training-data hash, metrics, parameters and timestamp.
+    Tree ensembles named in the model's ``packed_attributes`` are also written
+    as flat node arrays; loading with ``mmap=True`` maps those read-only
+    instead of unpickling the sklearn or XGBoost estimator, so every process
+    serving the model shares one copy in the page cache. A model's feature
+    pipeline is stored as ``pipeline.json`` beside the artifact and restored
+    from it on load, so the schema a version was trained with is readable
+    without unpickling anything. Every load is timed and its resident-memory growth recorded.
+    """
+
+    def __init__(self, root=REGISTRY_DIR):
+        self.root = root
+        self.loads = []
+        self.lock = threading.Lock()
+
+    def versions(self, name):
+        directory = os.path.join(self.root, name)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(int(entry) for entry in os.listdir(directory)
+                      if entry.isdigit() and os.path.exists(os.path.join(directory, entry, MANIFEST_NAME)))
+
+    def latest(self, name):
+        versions = self.versions(name)
+        return versions[-1] if versions else None
+
+    def path(self, name, version):
+        return os.path.join(self.root, name, f"{version:04d}")
+
+    def register(self, name, model, schema, metrics, data_hash, params=None):
+        """Persist ``model`` as the next version of ``name`` and return its manifest."""
+        version = (self.latest(name) or 0) + 1
+        final = self.path(name, version)
+        staging = f"{final}.{os.getpid()}.tmp"
+        os.makedirs(staging)
+        try:
+            packed = _packed_attributes(model)
+            pipeline = getattr(model, 'pipeline', None)
+            if packed or pipeline is not None:
+                model = copy.copy(model)
+            if pipeline is not None:
+                pipeline.save(staging)
+                model.pipeline = None
+            for attribute in packed:
+                # Each ensemble is stored twice: pickled for the library's own predict, packed for mapping
+                estimator = getattr(model, attribute)
+                PackedEnsemble.from_estimator(estimator).save(os.path.join(staging, "trees", attribute))
+                joblib.dump(estimator, os.path.join(staging, f"{attribute}.joblib"))
+                setattr(model, attribute, None)
+            # Uncompressed so numpy arrays inside the artifact can be memory-mapped too
+            joblib.dump(model, os.path.join(staging, "artifact.joblib"))
+            manifest = {
+                'name': name,
+                'version': version,
+                'created': pd.Timestamp.now(tz='UTC').isoformat(),
+                'data_hash': data_hash,
+                'schema': schema,
+                'metrics': metrics,
+                'params': params or {},
+                'pipeline': None if pipeline is None else pipeline.fingerprint,
+                'files': {entry: os.path.getsize(os.path.join(dirpath, entry))
+                          for dirpath, _, entries in os.walk(staging) for entry in entries},
+            }
+            with open(os.path.join(staging, MANIFEST_NAME), 'w') as handle:
+                json.dump(manifest, handle, indent=2, default=str)
+            os.replace(staging, final)
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        return manifest
+
+    def manifest(self, name, version=None):
+        version = self.latest(name) if version is None else version
+        if version is None:
+            raise FileNotFoundError(f"No registered versions of {name!r} in {self.root}")
+        with open(os.path.join(self.path(name, version), MANIFEST_NAME)) as handle:
+            return json.load(handle)
+
+    def load(self, name, version=None, mmap=True):
+        """Load a registered model, memory-mapping its arrays when ``mmap`` is set."""
+        version = self.latest(name) if version is None else version
+        if version is None:
+            raise FileNotFoundError(f"No registered versions of {name!r} in {self.root}")
+        directory = self.path(name, version)
+        gc.collect()
+        resident, started = resident_bytes(), time.perf_counter()
+
+        model = joblib.load(os.path.join(directory, "artifact.joblib"), mmap_mode='r' if mmap else None)
+        trees = os.path.join(directory, "trees")
+        mapped = 0
+        for attribute in sorted(os.listdir(trees)) if os.path.isdir(trees) else []:
+            if mmap:
+                # Large batches run faster on the library estimator, unpickled only once one arrives
+                native = functools.partial(joblib.load, os.path.join(directory, f"{attribute}.joblib"))
+                ensemble = PackedEnsemble.load(os.path.join(trees, attribute), mmap=True, native=native)
+                mapped += ensemble.nbytes
+            else:
+                ensemble = joblib.load(os.path.join(directory, f"{attribute}.joblib"))
+            setattr(model, attribute, ensemble)
+        if os.path.exists(os.path.join(directory, PIPELINE_NAME)):
+            model.pipeline = FeaturePipeline.load(directory)
+
+        seconds = time.perf_counter() - started
+        with self.lock:
+            self.loads.append({
+                'name': name, 'version': version, 'mmap': mmap, 'load_ms': 1000 * seconds,
+                'rss_mb': (resident_bytes() - resident) / 2 ** 20, 'mapped_mb': mapped / 2 ** 20,
+            })
+        return model
+
+    def report(self):
+        """Cold-start time and resident-memory growth of every load so far."""
+        with self.lock:
+            return pd.DataFrame(self.loads, columns=['name', 'version', 'mmap', 'load_ms', 'rss_mb', 'mapped_mb'])
+
+    def catalog(self):
+        """Latest manifest of every registered model."""
+        if not os.path.isdir(self.root):
+            return []
+        return [self.manifest(name) for name in sorted(os.listdir(self.root)) if self.latest(name) is not None]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="List registered models and measure their cold-start cost.")
+    parser.add_argument("--root", default=REGISTRY_DIR)
+    parser.add_argument("--no-mmap", action="store_true", help="unpickle every array instead of mapping it")
+    args = parser.parse_args()
+
+    registry = ModelRegistry(args.root)
+    for entry in registry.catalog():
+        registry.load(entry['name'], entry['version'], mmap=not args.no_mmap)
+        print(f"{entry['name']} v{entry['version']}: created {entry['created']}, data {entry['data_hash']}, metrics {entry['metrics']}")
+    print(registry.report().to_string(index=False, float_format=lambda value: f"{value:.2f}"))
@@ -0,0 +1,176 @@
+import threading
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from feature_pipeline import data_features
+from model_registry import ModelRegistry
+from tcn_lstm_inference import SERVING_RUNTIME, use_runtime
+from tidal_models import MODEL_DIR, MODEL_LABELS, TARGET
+from model_common import missing_libraries, model_module
+
+# Batch latencies kept per model for the percentile report
+LATENCY_WINDOW = 1000
+BATCH_ROWS = 4096
+
+
+class ModelServer:
+    """Every persisted Highest model, loaded once and shared by all sessions.
+
+    Models are loaded from the registry, memory-mapped where the artifact
+    allows. Models never trained or whose library is not installed are listed
+    in ``unavailable`` with the reason instead of failing the page.
+    Predictions run in row batches; each batch's wall time is recorded so the
+    page can report p50/p99 latency per model. Models fitted on the same data
+    share a feature pipeline, and its transform runs once per request rather
+    than once per model. The TCN-LSTM runs on its exported ``runtime``
+    (see ``tcn_lstm_inference``); if that cannot be built it stays on Keras
+    and ``runtimes`` says why.
+    """
+
+    def __init__(self, model_dir=MODEL_DIR, names=None, mmap=True, runtime=SERVING_RUNTIME):
+        self.registry = ModelRegistry(model_dir)
+        self.models, self.manifests, self.unavailable, self.runtimes = {}, {}, {}, {}
+        for name in names or list(MODEL_LABELS):
+            missing = missing_libraries(name)
+            if self.registry.latest(name) is None:
+                # Training skips a model whose library is missing, so rerunning it would not help
+                self.unavailable[name] = (f"needs {', '.join(missing)}, which is not installed" if missing
+                                          else f"not trained yet (run `python {model_module(name).__name__}.py`)")
+                continue
+            try:
+                self.manifests[name] = self.registry.manifest(name)
+                self.models[name] = self.registry.load(name, self.manifests[name]['version'], mmap)
+            except ImportError as error:
+                self.unavailable[name] = f"cannot load: {error}"
+                continue
+            if name == 'tcn_lstm':
+                self.runtimes[name] = self.use_runtime(name, runtime)
+        self.latencies = {name: deque(maxlen=LATENCY_WINDOW) for name in self.models}
+        self.rows = {name: 0 for name in self.models}
+        self.lock = threading.Lock()
+
+    def use_runtime(self, name, runtime):
+        try:
+            use_runtime(self.models[name], runtime, self.registry, self.manifests[name]['version'])
+        except Exception as error:
+            return f"keras ({runtime} failed: {error})"
+        return runtime
+
+    @property
+    def version(self):
+        # Changes whenever a model is retrained, so cached charts of its predictions go stale
+        return '-'.join(f"{name}.{manifest['version']}" for name, manifest in sorted(self.manifests.items()))
+
+    def artifacts(self, current_data=None):
+        """Registry details and cold-start cost of each loaded model, for display."""
+        loads = self.registry.report().drop_duplicates('name', keep='last').set_index('name')
+        rows = []
+        for name, manifest in self.manifests.items():
+            if name not in self.models:
+                continue
+            rows.append({
+                'Model': MODEL_LABELS[name], 'Version': manifest['version'], 'Trained': manifest['created'][:19],
+                'Data': manifest['data_hash'] if current_data is None else ('current' if manifest['data_hash'] == current_data else 'stale'),
+                'Load (ms)': loads.loc[name, 'load_ms'], 'RSS (MB)': loads.loc[name, 'rss_mb'],
+                'Mapped (MB)': loads.loc[name, 'mapped_mb'], 'Runtime': self.runtimes.get(name, '-'),
+            })
+        return pd.DataFrame(rows)
+
+    def held_out(self, frame):
+        """Mask of rows that every loaded model kept out of training."""
+        keys = pd.MultiIndex.from_frame(frame[['station_id', 'Datetime']])
+        mask = np.ones(len(frame), dtype=bool)
+        for model in self.models.values():
+            mask &= keys.isin(pd.MultiIndex.from_frame(model.test_keys))
+        return mask
+
+    def features(self, frame, pipeline, data_rows=False):
+        if data_rows:
+            # Rows of load_data() keep its positional index: slice the per-data-version matrix
+            return np.asarray(data_features(pipeline)[frame.index.to_numpy()])
+        return pipeline.transform(frame)
+
+    def predict(self, frame, names=None, batch_rows=BATCH_ROWS, data_rows=False):
+        """Predictions for every row of ``frame`` as a DataFrame with one column per model.
+
+        Set ``data_rows`` when ``frame`` is a selection of ``load_data()`` rows
+        with their original index, so features come from the shared cache.
+        """
+        predictions = {}
+        features = {}
+        for name in names or list(self.models):
+            model = self.models[name]
+            key = model.pipeline.fingerprint
+            if key not in features:
+                features[key] = self.features(frame, model.pipeline, data_rows)
+            outputs = []
+            for start in range(0, len(frame), batch_rows):
+                batch = frame.iloc[start:start + batch_rows]
+                started = time.perf_counter()
+                outputs.append(np.asarray(model.predict(batch, features[key][start:start + batch_rows]), dtype=np.float64).ravel())
+                elapsed = time.perf_counter() - started
+                with self.lock:
+                    self.latencies[name].append(elapsed)
+                    self.rows[name] += len(batch)
+            predictions[name] = np.concatenate(outputs) if outputs else np.empty(0)
+        return pd.DataFrame(predictions, index=frame.index)
+
+    def latency(self):
+        """p50/p99 batch latency in milliseconds and rows served, per model."""
+        rows = []
+        with self.lock:
+            for name, samples in self.latencies.items():
+                samples = np.asarray(samples) * 1000
+                rows.append({
+                    'Model': MODEL_LABELS[name], 'Batches': len(samples), 'Rows': self.rows[name],
+                    'p50 (ms)': float(np.percentile(samples, 50)) if len(samples) else np.nan,
+                    'p99 (ms)': float(np.percentile(samples, 99)) if len(samples) else np.nan,
+                })
+        return pd.DataFrame(rows)
+
+
+@st.cache_resource(show_spinner="Loading models...", max_entries=2)
+def _server_cached(model_dir, versions):
+    # Keyed on the latest registered version of every model: registering one builds a fresh server
+    return ModelServer(model_dir, mmap=True)
+
+
+def get_model_server(model_dir=MODEL_DIR):
+    """The server shared by all sessions, reloaded once any model has a newer registered version."""
+    registry = ModelRegistry(model_dir)
+    return _server_cached(model_dir, tuple(registry.latest(name) for name in MODEL_LABELS))
+
+
+def evaluation_frame(frame, predictions):
+    """Long-form actual/predicted/residual rows for the models in ``predictions``, skipping missing targets."""
+    observed = frame[TARGET].notna()
+    parts = []
+    for name in predictions.columns:
+        part = pd.DataFrame({
+            'model': name,
+            'station_id': frame.loc[observed, 'station_id'],
+            'actual': frame.loc[observed, TARGET],
+            'predicted': predictions.loc[observed, name],
+        })
+        part['residual'] = part['actual'] - part['predicted']
+        parts.append(part)
+    return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=['model', 'station_id', 'actual', 'predicted', 'residual'])
+
+
+def score(evaluation):
+    """MSE, MAE and R² per model from an ``evaluation_frame``."""
+    rows = []
+    for name, part in evaluation.groupby('model', sort=False):
+        error = part['residual'].to_numpy()
+        actual = part['actual'].to_numpy()
+        total = np.sum((actual - actual.mean()) ** 2)
+        rows.append({
+            'Model': MODEL_LABELS[name], 'Rows': len(part),
+            'MSE': float(np.mean(error ** 2)), 'MAE': float(np.mean(np.abs(error))),
+            'R² Score': float(1 - np.sum(error ** 2) / total) if total > 0 else np.nan,
+        })
+    return pd.DataFrame(rows)
@@ -0,0 +1,83 @@
+import glob
+import tempfile
+import time
+
+import pandas as pd
+from PIL import Image
+
+import render_cache
+from render_cache import RenderCache
+
+# The ten images the seasonal page used to open and send on every rerun
+LEGACY_IMAGES = ["seasonald*.png", "rolling_mean*.png"]
+PAGE_SCRIPT = """
+import seasonal_temporal_analysis
+
+seasonal_temporal_analysis.display()
+"""
+
+
+def _legacy():
+    started = time.perf_counter()
+    paths = sorted(path for pattern in LEGACY_IMAGES for path in glob.glob(pattern))
+    weight = 0
+    for path in paths:
+        with Image.open(path) as image:
+            image.load()
+        with open(path, 'rb') as handle:
+            weight += len(handle.read())
+    seconds = time.perf_counter() - started
+    return {'scenario': 'legacy static PNGs', 'images': len(paths), 'page_kb': weight / 1024,
+            'first_image_ms': None, 'run_ms': 1000 * seconds}
+
+
+def _run_page(cache, expand_all):
+    from streamlit.testing.v1 import AppTest
+
+    # Time to first paint is approximated by when the first image bytes are ready to send
+    served, started = [], time.perf_counter()
+    get_or_render = cache.get_or_render
+
+    def timed(*args, **kwargs):
+        image = get_or_render(*args, **kwargs)
+        served.append((time.perf_counter() - started, len(image)))
+        return image
+
+    cache.get_or_render = timed
+    try:
+        app = AppTest.from_string(PAGE_SCRIPT, default_timeout=600)
+        app.session_state["expand_all_stations"] = expand_all
+        started = time.perf_counter()
+        app.run()
+        seconds = time.perf_counter() - started
+    finally:
+        del cache.get_or_render
+    if app.exception:
+        raise RuntimeError(app.exception[0].value)
+    return {'images': len(served), 'page_kb': sum(size for _, size in served) / 1024,
+            'first_image_ms': 1000 * served[0][0] if served else None, 'run_ms': 1000 * seconds}
+
+
+def benchmark():
+    """Page weight and time to first image of the seasonal page, before and after tiered delivery.
+
+    "eager" shows every station's full-size charts and no gallery, as the page did before;
+    "lazy" sends thumbnails plus the full-size charts of the first station only.
+    Cold runs start from an empty render cache, warm runs reuse it.
+    """
+    rows = [_legacy()]
+    get_render_cache = render_cache.get_render_cache
+    try:
+        for expand_all, label in [(True, 'eager'), (False, 'lazy')]:
+            with tempfile.TemporaryDirectory() as directory:
+                cache = RenderCache(directory)
+                render_cache.get_render_cache = lambda: cache
+                for state in ['cold', 'warm']:
+                    rows.append({'scenario': f"{label} {state}", **_run_page(cache, expand_all)})
+    finally:
+        render_cache.get_render_cache = get_render_cache
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    print(benchmark().to_string(index=False, float_format=lambda value: f"{value:.1f}"))
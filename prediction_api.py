@@ -0,0 +1,375 @@
+import asyncio
+import json
+import time
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from forecast_store import HORIZONS, future_rows
+from model_serving import LATENCY_WINDOW, ModelServer
+from tcn_lstm_inference import RUNTIMES, SERVING_RUNTIME
+from tidal_models import MODEL_DIR
+
+HOST = "127.0.0.1"
+# One above Streamlit's default, so both run side by side
+PORT = 8502
+# A batch is sent to the models when it reaches MAX_BATCH requests or its first request has waited MAX_WAIT_MS
+MAX_BATCH = 256
+MAX_WAIT_MS = 5
+# Requests waiting beyond this are refused with 503 instead of queueing without bound
+MAX_QUEUE = 1024
+MAX_BODY_BYTES = 1 << 20
+
+
+def engine_models():
+    from sea_level_models import MODEL_LABELS as SEA_LEVEL_LABELS
+    from tidal_models import MODEL_LABELS as TIDAL_LABELS
+
+    return {'highest': list(TIDAL_LABELS), 'msl': list(SEA_LEVEL_LABELS)}
+
+
+class RequestError(Exception):
+    """A request that cannot be answered, with the HTTP status to answer it with."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class Overloaded(Exception):
+    """The batch queue is full; the client should retry later."""
+
+
+def parse_request(item):
+    """(station_id, month start) from a JSON request such as ``{"station_id": 1611400, "date": "2025-03"}``."""
+    if not isinstance(item, dict) or 'station_id' not in item or 'date' not in item:
+        raise RequestError(400, "Each request needs 'station_id' and 'date'")
+    if not isinstance(item['date'], str):
+        # pd.Timestamp would read a number as epoch nanoseconds and null as NaT
+        raise RequestError(400, "'date' must be a string such as \"2025-03\"")
+    try:
+        station_id = int(item['station_id'])
+        stamp = pd.Timestamp(item['date'])
+    except (TypeError, ValueError) as error:
+        raise RequestError(400, f"Invalid request: {error}") from None
+    if pd.isna(stamp):
+        raise RequestError(400, f"Invalid request: no date in {item['date']!r}")
+    return station_id, stamp.to_period('M').to_timestamp()
+
+
+class PredictionEngine:
+    """The registered models of one target behind a batched ``predict`` over (station, month) requests.
+
+    A month the station has observed is predicted from its observed inputs;
+    a month after its last observation, up to ``max_ahead`` months, from the
+    same calendar-month averages the forecast store uses. Sequence models
+    get their look-back rows in front of every request, so one call scores
+    a whole batch of requests from any mix of stations.
+    """
+
+    def __init__(self, target, model_dir=MODEL_DIR, frame=None, max_ahead=max(HORIZONS), runtime=SERVING_RUNTIME):
+        from data_access import load_data
+
+        self.target = target
+        self.server = ModelServer(model_dir, engine_models()[target], mmap=True, runtime=runtime)
+        frame = load_data() if frame is None else frame
+        self.histories = {int(station_id): rows.sort_values('Datetime', ignore_index=True)
+                          for station_id, rows in frame.groupby('station_id')}
+        self.context = max([model.context_rows for model in self.server.models.values()], default=0)
+        self.max_ahead = max_ahead
+        self.futures = {}
+
+    def inputs(self, station_id, month):
+        """Rows ending with the requested month, after up to ``context`` rows before it, and whether it was observed."""
+        history = self.histories.get(station_id)
+        if history is None:
+            raise RequestError(404, f"Unknown station {station_id}")
+        stamps = history['Datetime']
+        position = int(stamps.searchsorted(month))
+        if position < len(history) and stamps.iloc[position] == month:
+            return history.iloc[max(position - self.context, 0):position + 1], 'observed'
+        if position < len(history):
+            raise RequestError(404, f"Station {station_id} has no observation for {month:%Y-%m}")
+        last = stamps.iloc[-1]
+        ahead = (month.year - last.year) * 12 + month.month - last.month
+        if ahead > self.max_ahead:
+            raise RequestError(422, f"{month:%Y-%m} is more than {self.max_ahead} months after the last observation")
+        if station_id not in self.futures:
+            self.futures[station_id] = future_rows(history, self.max_ahead)
+        rows = pd.concat([history.tail(self.context), self.futures[station_id].iloc[:ahead]], ignore_index=True)
+        return rows.tail(self.context + 1), 'forecast'
+
+    def predict(self, requests):
+        """One result per (station_id, month) request: a dict of predictions per model, or the RequestError."""
+        results, parts = [None] * len(requests), []
+        for position, (station_id, month) in enumerate(requests):
+            try:
+                rows, kind = self.inputs(station_id, month)
+            except RequestError as error:
+                results[position] = error
+                continue
+            parts.append((position, kind, rows))
+        if not parts:
+            return results
+        frame = pd.concat([rows for _, _, rows in parts], ignore_index=True)
+        predictions = self.server.predict(frame, batch_rows=len(frame))
+        ends = np.cumsum([len(rows) for _, _, rows in parts]) - 1
+        for (position, kind, rows), end in zip(parts, ends):
+            station_id, month = requests[position]
+            values = {}
+            for name, value in predictions.iloc[end].items():
+                # Too little history for this model's window: its prediction would borrow another request's rows
+                short = self.server.models[name].context_rows >= len(rows)
+                values[name] = None if short or np.isnan(value) else float(value)
+            results[position] = {'station_id': station_id, 'date': f"{month:%Y-%m}", 'kind': kind,
+                                 'target': self.target, 'predictions': values}
+        return results
+
+
+def size_bucket(size):
+    # Power-of-two buckets: 1, 2, 3-4, 5-8, ...
+    upper = 1 << max(size - 1, 0).bit_length()
+    return str(upper) if upper <= 2 else f"{upper // 2 + 1}-{upper}"
+
+
+class MicroBatcher:
+    """Coalesces concurrent requests into one ``engine.predict`` call per batch.
+
+    The first request of a batch waits at most ``max_wait`` seconds for
+    others to join, up to ``max_batch`` requests; while the models score one
+    batch, the next one fills. The queue holds at most ``max_queue``
+    requests and refuses the rest with ``Overloaded``, so load beyond what
+    the models sustain turns into fast 503s rather than unbounded latency.
+    Model calls run on one worker thread, off the event loop.
+    """
+
+    def __init__(self, engine, max_batch=MAX_BATCH, max_wait=MAX_WAIT_MS / 1000, max_queue=MAX_QUEUE):
+        self.engine = engine
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.queue = asyncio.Queue(max_queue)
+        self.executor = ThreadPoolExecutor(1)
+        self.batch_sizes = Counter()
+        self.requests = self.rejected = self.batches = self.max_depth = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.batch_seconds = deque(maxlen=LATENCY_WINDOW)
+
+    async def submit(self, request):
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self.queue.put_nowait((request, future, time.perf_counter()))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise Overloaded() from None
+        self.requests += 1
+        self.max_depth = max(self.max_depth, self.queue.qsize())
+        return await future
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        batch = [await self.queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch:
+            if not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+                continue
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            started = time.perf_counter()
+            try:
+                results = await loop.run_in_executor(self.executor, self.engine.predict, [request for request, _, _ in batch])
+            except Exception as error:
+                results = [error] * len(batch)
+            finished = time.perf_counter()
+            self.batches += 1
+            self.batch_sizes[len(batch)] += 1
+            self.batch_seconds.append(finished - started)
+            for (_, future, queued), result in zip(batch, results):
+                self.latencies.append(finished - queued)
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+    def metrics(self):
+        """Queue depth, batch-size histogram and latency percentiles since the service started."""
+        latencies = np.asarray(self.latencies) * 1000
+        histogram = Counter()
+        for size, count in sorted(self.batch_sizes.items()):
+            histogram[size_bucket(size)] += count
+        return {
+            'models': list(self.engine.server.models), 'unavailable': self.engine.server.unavailable,
+            'runtimes': self.engine.server.runtimes,
+            'queue_depth': self.queue.qsize(), 'max_queue_depth': self.max_depth, 'queue_capacity': self.queue.maxsize,
+            'requests': self.requests, 'rejected': self.rejected, 'batches': self.batches,
+            'mean_batch_size': sum(size * count for size, count in self.batch_sizes.items()) / self.batches if self.batches else None,
+            'batch_sizes': dict(histogram),
+            'latency_ms': {'p50': float(np.percentile(latencies, 50)) if len(latencies) else None,
+                           'p99': float(np.percentile(latencies, 99)) if len(latencies) else None},
+            'batch_ms_p50': float(np.median(self.batch_seconds) * 1000) if self.batch_seconds else None,
+        }
+
+
+async def read_request(reader):
+    """(method, path, headers, body) of the next HTTP/1.1 request on the connection, or None once the client closes it."""
+    line = await reader.readline()
+    if not line.strip():
+        return None
+    try:
+        method, path, _ = line.decode('latin-1').split(' ', 2)
+    except ValueError:
+        raise RequestError(400, "Malformed request line") from None
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get('content-length') or 0)
+    if length > MAX_BODY_BYTES:
+        raise RequestError(413, f"Request body over {MAX_BODY_BYTES} bytes")
+    body = await reader.readexactly(length) if length else b''
+    return method.upper(), path.split('?', 1)[0], headers, body
+
+
+def write_response(writer, status, payload, keep_alive=True, headers=None):
+    reasons = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large",
+               422: "Unprocessable Entity", 500: "Internal Server Error", 503: "Service Unavailable"}
+    body = json.dumps(payload).encode()
+    lines = [f"HTTP/1.1 {status} {reasons.get(status, '')}", "Content-Type: application/json",
+             f"Content-Length: {len(body)}", f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+    lines += [f"{name}: {value}" for name, value in (headers or {}).items()]
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode('latin-1') + body)
+
+
+class PredictionService:
+    """HTTP routes over one ``MicroBatcher`` per target.
+
+    ``POST /predict/highest`` and ``POST /predict/msl`` take one request
+    object or a list of them; ``GET /metrics`` reports every batcher's
+    queue and batch statistics and ``GET /health`` the loaded models.
+    Connections are kept alive between requests.
+    """
+
+    def __init__(self, engines, max_batch=MAX_BATCH, max_wait=MAX_WAIT_MS / 1000, max_queue=MAX_QUEUE):
+        self.batchers = {target: MicroBatcher(engine, max_batch, max_wait, max_queue) for target, engine in engines.items()}
+
+    async def predict(self, target, body):
+        batcher = self.batchers.get(target)
+        if batcher is None:
+            raise RequestError(404, f"Unknown target {target!r}; use one of {', '.join(self.batchers)}")
+        if not batcher.engine.server.models:
+            raise RequestError(503, f"No trained models for {target}: {batcher.engine.server.unavailable}")
+        try:
+            payload = json.loads(body or b'null')
+        except json.JSONDecodeError as error:
+            raise RequestError(400, f"Invalid JSON: {error}") from None
+        items = payload if isinstance(payload, list) else [payload]
+        requests = [parse_request(item) for item in items]
+        results = await asyncio.gather(*(batcher.submit(request) for request in requests), return_exceptions=True)
+        single = not isinstance(payload, list)
+        for result in results:
+            # A list answers per item; a full queue or a failed batch fails the whole call
+            if isinstance(result, Exception) and (single or not isinstance(result, RequestError)):
+                raise result
+        answers = [{'error': str(result)} if isinstance(result, RequestError) else result for result in results]
+        return answers if isinstance(payload, list) else answers[0]
+
+    async def route(self, method, path, body):
+        if path == '/health' and method == 'GET':
+            return 200, {'status': 'ok', 'models': {target: list(batcher.engine.server.models)
+                                                    for target, batcher in self.batchers.items()}}
+        if path == '/metrics' and method == 'GET':
+            return 200, {target: batcher.metrics() for target, batcher in self.batchers.items()}
+        if path.startswith('/predict/'):
+            if method != 'POST':
+                return 405, {'error': "Use POST"}
+            return 200, await self.predict(path[len('/predict/'):], body)
+        return 404, {'error': f"No route for {method} {path}"}
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                # Kept outside the try so error replies honour the client's Connection header too
+                headers = {}
+                try:
+                    request = await read_request(reader)
+                    if request is None:
+                        break
+                    method, path, headers, body = request
+                    status, payload = await self.route(method, path, body)
+                    keep_alive = headers.get('connection', '').lower() != 'close'
+                    write_response(writer, status, payload, keep_alive)
+                except Overloaded:
+                    keep_alive = headers.get('connection', '').lower() != 'close'
+                    write_response(writer, 503, {'error': "Queue full, retry shortly"}, keep_alive, {'Retry-After': 1})
+                except RequestError as error:
+                    keep_alive = (error.status < 500 and error.status != 413
+                                  and headers.get('connection', '').lower() != 'close')
+                    write_response(writer, error.status, {'error': str(error)}, keep_alive)
+                except Exception as error:
+                    keep_alive = False
+                    write_response(writer, 500, {'error': f"{type(error).__name__}: {error}"}, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(host=HOST, port=PORT, model_dir=MODEL_DIR, max_batch=MAX_BATCH, max_wait=MAX_WAIT_MS / 1000,
+                max_queue=MAX_QUEUE, ready=None, runtime=SERVING_RUNTIME):
+    """Load both engines and serve until cancelled; ``ready`` (an asyncio.Event) is set once the port is open."""
+    service = PredictionService({target: PredictionEngine(target, model_dir, runtime=runtime) for target in engine_models()},
+                                max_batch, max_wait, max_queue)
+    workers = [asyncio.create_task(batcher.run()) for batcher in service.batchers.values()]
+    server = await asyncio.start_server(service.handle, host, port)
+    print(json.dumps({'listening': f"http://{host}:{port}",
+                      'models': {target: list(batcher.engine.server.models) for target, batcher in service.batchers.items()}}),
+          flush=True)
+    if ready is not None:
+        ready.set()
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        for worker in workers:
+            worker.cancel()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve Highest and MSL predictions over HTTP with micro-batching.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH)
+    parser.add_argument("--max-wait-ms", type=float, default=MAX_WAIT_MS)
+    parser.add_argument("--max-queue", type=int, default=MAX_QUEUE)
+    parser.add_argument("--runtime", choices=['keras'] + RUNTIMES, default=SERVING_RUNTIME,
+                        help="what the TCN-LSTM runs on")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.model_dir, args.max_batch, args.max_wait_ms / 1000, args.max_queue,
+                          runtime=args.runtime))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,193 @@
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import matplotlib
+import matplotlib.pyplot as plt
+import streamlit as st
+from PIL import Image
+
+RENDER_CACHE_DIR = ".render_cache"
+RENDER_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# Width of the downscaled copies shown in galleries
+THUMBNAIL_WIDTH_PX = 320
+GALLERY_COLUMNS = 5
+
+
+def thumbnail(image, width_px=THUMBNAIL_WIDTH_PX):
+    """Downscale PNG bytes to ``width_px`` wide; resampling is far cheaper than a second draw."""
+    with Image.open(io.BytesIO(image)) as source:
+        height_px = max(1, round(source.height * width_px / source.width))
+        # A 128-colour palette keeps line art legible at roughly a third of the RGB size
+        small = source.convert('RGB').resize((width_px, height_px), Image.LANCZOS).quantize(128)
+    buffer = io.BytesIO()
+    small.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+class RenderCache:
+    """Bounded on-disk LRU of rendered chart images.
+
+    Entries are keyed on (chart id, data version, theme, size, variant); a hit
+    returns the stored PNG/SVG bytes without touching matplotlib. On a miss the
+    figure is rendered, serialized and explicitly closed so pyplot's registry
+    stays empty. Thumbnails are downscaled from the full-size entry, rendering
+    it first when it is missing.
+    """
+
+    def __init__(self, directory=RENDER_CACHE_DIR, max_bytes=RENDER_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.counters = {'hits': 0, 'misses': 0, 'hit_seconds': 0.0, 'miss_seconds': 0.0, 'evictions': 0, 'served_bytes': 0}
+        os.makedirs(directory, exist_ok=True)
+        self._scan()
+
+    def _scan(self):
+        # Rebuild the LRU order from disk, least recently used first
+        files = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.png') or name.endswith('.svg'):
+                stat = os.stat(os.path.join(self.directory, name))
+                files.append((stat.st_atime_ns, name, stat.st_size))
+        for _, name, size in sorted(files):
+            self.entries[name] = size
+
+    @staticmethod
+    def key(chart_id, data_version, theme=None, size=None, fmt='png', variant='full'):
+        parts = [chart_id, data_version, theme, size] + ([] if variant == 'full' else [variant])
+        payload = json.dumps(parts, sort_keys=True, default=str)
+        return f"{hashlib.sha1(payload.encode()).hexdigest()[:20]}.{fmt}"
+
+    def _evict(self):
+        total = sum(self.entries.values())
+        while total > self.max_bytes and len(self.entries) > 1:
+            name, size = self.entries.popitem(last=False)
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+            total -= size
+            self.counters['evictions'] += 1
+
+    def _read(self, name):
+        with self.lock:
+            cached = name in self.entries
+            if cached:
+                self.entries.move_to_end(name)
+        if not cached:
+            return None
+        path = os.path.join(self.directory, name)
+        try:
+            with open(path, 'rb') as handle:
+                image = handle.read()
+            os.utime(path)
+            return image
+        except FileNotFoundError:
+            # Evicted by another process sharing the directory; the caller re-renders
+            with self.lock:
+                self.entries.pop(name, None)
+            return None
+
+    def _write(self, name, image):
+        path = os.path.join(self.directory, name)
+        temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporary, 'wb') as handle:
+            handle.write(image)
+        os.replace(temporary, path)
+        with self.lock:
+            self.entries[name] = len(image)
+            self.entries.move_to_end(name)
+
+    def get_or_render(self, chart_id, data_version, render, theme=None, size=None, fmt='png', dpi=100, variant='full'):
+        """Return image bytes for a chart, calling ``render()`` -> Figure only on a miss."""
+        started = time.perf_counter()
+        image = self._read(self.key(chart_id, data_version, theme, size, fmt, variant))
+        if image is not None:
+            with self.lock:
+                self.counters['hits'] += 1
+                self.counters['hit_seconds'] += time.perf_counter() - started
+                self.counters['served_bytes'] += len(image)
+            return image
+
+        full = self._read(self.key(chart_id, data_version, theme, size, fmt)) if variant == 'thumbnail' else None
+        if full is None:
+            figure = render()
+            try:
+                buffer = io.BytesIO()
+                figure.savefig(buffer, format=fmt, dpi=dpi, bbox_inches='tight')
+            finally:
+                plt.close(figure)
+            full = buffer.getvalue()
+            self._write(self.key(chart_id, data_version, theme, size, fmt), full)
+        image = full
+        if variant == 'thumbnail':
+            # Derived from the full-size render, so opening the section later is a hit
+            image = thumbnail(full) if fmt == 'png' else full
+            self._write(self.key(chart_id, data_version, theme, size, fmt, variant), image)
+        with self.lock:
+            self._evict()
+            self.counters['misses'] += 1
+            self.counters['miss_seconds'] += time.perf_counter() - started
+            self.counters['served_bytes'] += len(image)
+        return image
+
+    def stats(self):
+        with self.lock:
+            counters = dict(self.counters)
+            entries, total = len(self.entries), sum(self.entries.values())
+        lookups = counters['hits'] + counters['misses']
+        return {
+            'hits': counters['hits'],
+            'misses': counters['misses'],
+            'hit_rate': counters['hits'] / lookups if lookups else 0.0,
+            'mean_hit_ms': 1000 * counters['hit_seconds'] / counters['hits'] if counters['hits'] else 0.0,
+            'mean_miss_ms': 1000 * counters['miss_seconds'] / counters['misses'] if counters['misses'] else 0.0,
+            'evictions': counters['evictions'],
+            'served_bytes': counters['served_bytes'],
+            'entries': entries,
+            'bytes': total,
+        }
+
+
+@st.cache_resource(show_spinner=False)
+def get_render_cache():
+    return RenderCache()
+
+
+def theme_key():
+    # Anything in rcParams that changes pixels belongs in the cache key
+    params = matplotlib.rcParams
+    return [params['figure.facecolor'], params['axes.facecolor'], params['font.family'], params['font.size'], params['figure.dpi']]
+
+
+def show_figure(chart_id, data_version, render, size=None, cache=None, variant='full', caption=None):
+    """Render ``chart_id`` through the render cache and show it in Streamlit."""
+    cache = cache or get_render_cache()
+    image = cache.get_or_render(chart_id, data_version, render, theme=theme_key(), size=size, variant=variant)
+    st.image(image, caption=caption, width='stretch')
+
+
+def show_gallery(charts, columns=GALLERY_COLUMNS, cache=None):
+    """Thumbnail grid for ``charts``, a list of (chart id, data version, render, caption)."""
+    for start in range(0, len(charts), columns):
+        row = charts[start:start + columns]
+        for column, (chart_id, data_version, render, caption) in zip(st.columns(columns), row):
+            with column:
+                show_figure(chart_id, data_version, render, cache=cache, variant='thumbnail', caption=caption)
+
+
+def show_debug_panel(cache=None):
+    cache = cache or get_render_cache()
+    stats = cache.stats()
+    with st.sidebar.expander("Render cache"):
+        st.write(f"Hit rate: {stats['hit_rate']:.0%} ({stats['hits']} hits / {stats['misses']} misses)")
+        st.write(f"Mean latency: {stats['mean_hit_ms']:.1f} ms on hits, {stats['mean_miss_ms']:.1f} ms on misses")
+        st.write(f"{stats['entries']} entries, {stats['bytes'] / 1024:.0f} KB on disk, {stats['evictions']} evictions")
+        st.write(f"{stats['served_bytes'] / 1024:.0f} KB of images served")
@@ -0,0 +1,229 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+from data_access import data_version, frame_version, load_data
+from feature_pipeline import data_features, fit_pipeline
+from model_registry import ModelRegistry
+from sequence_dataset import SequenceDataset, keras_batches, window_rows
+from tidal_models import FINE_TUNE_EPOCHS, MODEL_DIR, RANDOM_STATE, KerasModel, seen_through, split_rows
+
+TARGET = 'MSL (ft)'
+# Rows of history per TCN sample, as in the notebook's create_sequences
+TIME_STEPS = 10
+
+MODEL_LABELS = {
+    'tcn': "TCN",
+    'tcn_lstm': "Hybrid (TCN+LSTM)",
+}
+MODEL_LIBRARIES = {'tcn': ['tensorflow'], 'tcn_lstm': ['tensorflow']}
+TCN_FEATURES = ['Highest', 'MHHW (ft)', 'MHW (ft)', 'MTL (ft)', 'MLW (ft)', 'MLLW (ft)', 'Lowest (ft)', 'Inf',
+                'Month', 'Day', 'Sin_Hour', 'Cos_Hour']
+TCN_LSTM_FEATURES = ['Highest', 'MHHW (ft)', 'MHW (ft)', 'MTL (ft)', 'MLW (ft)', 'MLLW (ft)', 'Lowest (ft)', 'Inf',
+                     'station_id', 'Month', 'Day', 'Sin_Hour', 'Cos_Hour']
+TCN_LSTM_SCALED = ['MHHW (ft)', 'MHW (ft)', 'MTL (ft)', 'MLW (ft)', 'MLLW (ft)', 'Lowest (ft)', 'Sin_Hour', 'Cos_Hour']
+
+
+class TCNModel(KerasModel):
+    """The tuned TCN: one causal dilated Conv1D block over the previous 10 standardized rows.
+
+    A row is predicted from the 10 rows before it of the same station, in
+    frame order; the first ``context_rows`` rows of each station get no
+    prediction (NaN). Windows are strided views from ``SequenceDataset``,
+    never copied as a whole.
+    """
+
+    name = 'tcn'
+    context_rows = TIME_STEPS
+
+    def __init__(self, pipeline):
+        super().__init__(pipeline)
+        self.scale_mean = None
+        self.scale_std = None
+
+    def values(self, frame, features=None):
+        features = self.pipeline.transform(frame) if features is None else features
+        return np.asarray(features)[:, self.pipeline.indices(TCN_FEATURES)]
+
+    def inputs(self, frame, features=None):
+        scaled = (self.values(frame, features) - self.scale_mean) / self.scale_std
+        return SequenceDataset(scaled, frame['station_id'].to_numpy(), TIME_STEPS)
+
+    def sample_rows(self, frame):
+        return np.sort(window_rows(frame['station_id'].to_numpy(), TIME_STEPS))
+
+    def fit(self, frame, target, train_rows, test_rows, features=None, epochs=50, batch_size=32, scaler_rows=None):
+        from tensorflow.keras.layers import Activation, BatchNormalization, Conv1D, Dense, Flatten, Input
+        from tensorflow.keras.models import Model
+        from tensorflow.keras.optimizers import Adam
+
+        # StandardScaler on every row before sequencing, as the notebook did, or on ``scaler_rows`` only
+        values = self.values(frame, features)
+        values = values if scaler_rows is None else values[scaler_rows]
+        self.scale_mean = values.mean(axis=0)
+        self.scale_std = np.where(values.std(axis=0) > 0, values.std(axis=0), 1.0)
+        dataset = self.inputs(frame, features)
+        train, test = dataset.samples(train_rows), dataset.samples(test_rows)
+        # Keras Tuner's best trial: 1 block, 128 filters, kernel 5, dilation 2, 64 dense units, lr 0.01
+        layer = Input(shape=(TIME_STEPS, len(TCN_FEATURES)))
+        x = Conv1D(filters=128, kernel_size=5, padding='causal', dilation_rate=2)(layer)
+        x = BatchNormalization()(x)
+        x = Activation('relu')(x)
+        x = Flatten()(x)
+        x = Dense(64, activation='relu')(x)
+        self.network = Model(layer, Dense(1, activation='linear')(x))
+        self.network.compile(optimizer=Adam(learning_rate=0.01), loss='mse', metrics=['mae'])
+        # Batches are gathered from the strided windows as Keras asks for them
+        self.history = self.network.fit(keras_batches(dataset, train, target, batch_size, seed=RANDOM_STATE),
+                                        epochs=epochs, verbose=0,
+                                        validation_data=keras_batches(dataset, test, target, batch_size, shuffle=False)).history
+        return self
+
+    def refresh(self, frame, target, train_rows, new_rows, features=None, epochs=FINE_TUNE_EPOCHS):
+        dataset = self.inputs(frame, features)
+        self.fine_tune(epochs, keras_batches(dataset, dataset.samples(train_rows), target, seed=RANDOM_STATE))
+        return self
+
+    def schema(self):
+        return [{'name': name, 'dtype': 'float32', 'history': TIME_STEPS} for name in TCN_FEATURES]
+
+    def predict(self, frame, features=None, batch_size=4096):
+        dataset = self.inputs(frame, features)
+        predictions = np.full(len(frame), np.nan)
+        predictions[dataset.rows] = self.predict_inputs(dataset, batch_size)
+        return predictions
+
+
+class TCNLSTMModel(KerasModel):
+    """TCN block feeding an LSTM, over the 13 features of one row read as a 13-step sequence."""
+
+    name = 'tcn_lstm'
+
+    def __init__(self, pipeline):
+        super().__init__(pipeline)
+        self.scale_mean = None
+        self.scale_std = None
+
+    def inputs(self, frame, features=None):
+        features = self.pipeline.transform(frame) if features is None else features
+        features = np.array(features[:, self.pipeline.indices(TCN_LSTM_FEATURES)])
+        scaled = [TCN_LSTM_FEATURES.index(column) for column in TCN_LSTM_SCALED]
+        features[:, scaled] = (features[:, scaled] - self.scale_mean) / self.scale_std
+        return features[:, :, None].astype(np.float32)
+
+    def fit(self, frame, target, train_rows, test_rows, features=None, epochs=50, batch_size=32, scaler_rows=None):
+        from tensorflow.keras.callbacks import EarlyStopping
+        from tensorflow.keras.layers import (LSTM, Activation, Add, BatchNormalization, Conv1D, Dense, Dropout,
+                                             Input)
+        from tensorflow.keras.models import Model
+        from tensorflow.keras.optimizers import Adam
+
+        features = self.pipeline.transform(frame) if features is None else features
+        values = np.asarray(features)[:, self.pipeline.indices(TCN_LSTM_SCALED)]
+        values = values if scaler_rows is None else values[scaler_rows]
+        self.scale_mean = values.mean(axis=0)
+        self.scale_std = np.where(values.std(axis=0) > 0, values.std(axis=0), 1.0)
+        inputs = self.inputs(frame, features)
+        # The notebook trained on inputs with N(0, 0.01) noise added for robustness
+        noisy = inputs[train_rows] + np.random.default_rng(RANDOM_STATE).normal(0, 0.01, inputs[train_rows].shape).astype(np.float32)
+
+        layer = Input(shape=inputs.shape[1:], name='features_input')
+        x = Conv1D(filters=64, kernel_size=3, dilation_rate=2, padding='causal')(layer)
+        x = BatchNormalization()(x)
+        x = Activation('relu')(x)
+        x = Dropout(0.3)(x)
+        x = Add()([x, Conv1D(filters=64, kernel_size=1, padding='same')(layer)])
+        x = LSTM(64, activation='tanh', return_sequences=False, dropout=0.3)(x)
+        x = Dense(64, activation='relu', kernel_regularizer='l2')(x)
+        x = Dropout(0.3)(x)
+        x = Dense(32, activation='relu', kernel_regularizer='l2')(x)
+        self.network = Model(layer, Dense(1, activation='linear', name='output')(x))
+        self.network.compile(optimizer=Adam(learning_rate=0.001), loss='mse', metrics=['mae'])
+        early_stopping = EarlyStopping(monitor='val_loss', patience=10, restore_best_weights=True)
+        self.history = self.network.fit(noisy, target[train_rows], epochs=epochs, batch_size=batch_size,
+                                        validation_data=(inputs[test_rows], target[test_rows]),
+                                        callbacks=[early_stopping], verbose=0).history
+        return self
+
+    def schema(self):
+        return [{'name': name, 'dtype': 'float32'} for name in TCN_LSTM_FEATURES]
+
+
+def _build(name, pipeline):
+    if name == 'tcn':
+        return TCNModel(pipeline)
+    if name == 'tcn_lstm':
+        return TCNLSTMModel(pipeline)
+    raise ValueError(f"Unknown model {name!r}")
+
+
+def train_model(name, frame, features=None):
+    """Fit one Mean Sea Level model with the notebook's preprocessing and 80/20 split of its samples."""
+    from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+
+    frame = frame.reset_index(drop=True)
+    pipeline = fit_pipeline(frame)
+    features = pipeline.transform(frame) if features is None else features
+    target = frame[TARGET].fillna(pipeline.mean(TARGET)).to_numpy(dtype=np.float64)
+    model = _build(name, pipeline)
+    # Sequence models have one sample per row with full history; the split is drawn over samples
+    samples = model.sample_rows(frame)
+    train_samples, test_samples = split_rows(len(samples))
+    train_rows, test_rows = samples[train_samples], samples[test_samples]
+
+    started, cpu_started = time.perf_counter(), time.process_time()
+    model.fit(frame, target, train_rows, test_rows, features)
+    seconds, cpu_seconds = time.perf_counter() - started, time.process_time() - cpu_started
+
+    predicted = model.predict(frame, features)[test_rows]
+    model.metrics = {
+        'mse': float(mean_squared_error(target[test_rows], predicted)),
+        'mae': float(mean_absolute_error(target[test_rows], predicted)),
+        'r2': float(r2_score(target[test_rows], predicted)),
+        'fit_seconds': seconds,
+        'fit_cpu_seconds': cpu_seconds,
+    }
+    model.test_keys = frame.loc[test_rows, ['station_id', 'Datetime']].reset_index(drop=True)
+    model.seen_through = seen_through(frame)
+    model.trained_at = pd.Timestamp.now(tz='UTC').isoformat()
+    return model
+
+
+def train_models(frame=None, names=None, model_dir=MODEL_DIR):
+    """Train and register the Mean Sea Level models; returns {name: version or error}."""
+    from evaluation_store import record
+
+    features = data_features(fit_pipeline(load_data())) if frame is None else None
+    version = data_version() if frame is None else frame_version(frame)
+    frame = load_data() if frame is None else frame
+
+    registry = ModelRegistry(model_dir)
+    results = {}
+    for name in names or list(MODEL_LABELS):
+        try:
+            model = train_model(name, frame, features)
+        except ImportError as error:
+            results[name] = f"skipped: {error}"
+            continue
+        manifest = registry.register(name, model, model.schema(), model.metrics, version, model.params())
+        record(name, manifest['version'], model, frame, TARGET, features, model_dir, version)
+        results[name] = f"version {manifest['version']}"
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Train and persist the Mean Sea Level models.")
+    parser.add_argument("models", nargs="*", help=f"models to train, any of {', '.join(MODEL_LABELS)} (default: all)")
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    args = parser.parse_args()
+    unknown = sorted(set(args.models) - set(MODEL_LABELS))
+    if unknown:
+        parser.error(f"unknown models: {', '.join(unknown)}")
+    # Train through the imported module so pickles reference sea_level_models.*, not __main__.*
+    import sea_level_models
+
+    for model_name, outcome in sea_level_models.train_models(names=args.models or None, model_dir=args.model_dir).items():
+        print(f"{model_name}: {outcome}")
@@ -1,6 +1,41 @@
 import streamlit as st
-import matplotlib.pyplot as plt
-from PIL import Image
+
+from data_access import data_version, load_data
+from decomposition import METHODS, decompose_stations, plot_decomposition
+from render_cache import show_figure, show_gallery
+from rolling_stats import load_rolling, plot_rolling
+
+# Commentary written for the five stations in the original analysis
+DECOMPOSITION_NOTES = {
+    1611400: "This decomposition shows a consistent seasonal cycle with annual peaks and troughs, while the trend demonstrates a gradual increase in water levels over time. Residuals highlight a major anomaly around 1990, possibly due to extreme weather or tidal events.",
+    1612340: "The seasonal component exhibits predictable periodic peaks, while the trend indicates a steady rise in water levels over recent decades. Residuals are relatively minor, suggesting the decomposition effectively captures the underlying variability in the data.",
+    1612480: "A consistent annual cycle is visible in the seasonal component, while the trend shows a gradual increase in water levels with slight fluctuations in recent years. The residuals reveal minimal anomalies, suggesting stable conditions over time.",
+    1617433: "The decomposition highlights strong seasonal peaks and a rising trend in water levels over time. Residuals are scattered, indicating some irregular variations, possibly linked to environmental or climatic factors.",
+    1619910: "The seasonal component shows regular cycles, while the trend indicates a steady upward movement in water levels. Residuals capture moderate anomalies, possibly reflecting unusual tidal or weather events impacting the station.",
+}
+
+# Written for the 12-month window shown in the original analysis
+ROLLING_NOTES = {
+    1611400: "The rolling mean reveals a slow and steady increase in water levels over time. Seasonal variations are visible but less pronounced, allowing the focus to shift to long-term trends.",
+    1612340: "This graph shows a gradual rise in water levels with short-term fluctuations smoothed out. Seasonal peaks and troughs are subdued, emphasizing consistent long-term growth.",
+    1612480: "The rolling average highlights an upward trend in water levels, with seasonal fluctuations dampened. The trend suggests consistent increases over the years.",
+    1617433: "The rolling mean smooths out short-term variability, clearly showing a steady rise in water levels. Seasonal effects are visible, though secondary to the overall trend.",
+    1619910: "This graph highlights a steady increase in water levels over time, with reduced short-term noise. The trend remains consistent, suggesting stable long-term changes.",
+}
+
+
+def station_section(label, key, expanded, expand_all=False):
+    """Container for one station's full-size charts, or None while its expander is collapsed.
+
+    Expanders rerun the page when toggled, so a collapsed station costs no
+    rendering and no image transfer beyond its thumbnail.
+    """
+    if expand_all:
+        st.write(f"**{label}**")
+        return st.container()
+    section = st.expander(label, expanded=expanded, key=key, on_change="rerun")
+    return section if section.open else None
+
 
 def display():
     st.title("Seasonal and Temporal Analysis for Water Levels")
@@ -28,50 +63,36 @@ This analysis aims to delve into the seasonal and temporal patterns observed in
     Below are the seasonal decomposition results for each station:
     """)
 
-    # Graph 1: Station 1611400
-    st.write("**Seasonal Decomposition for Station 1611400**")
-    image1 = Image.open("seasonald1611400.png")
-    st.image(image1, caption="Seasonal Decomposition for Station 1611400", use_column_width=True)
-    st.write("""
-    This decomposition shows a consistent seasonal cycle with annual peaks and troughs, while the trend demonstrates a gradual 
-    increase in water levels over time. Residuals highlight a major anomaly around 1990, possibly due to extreme weather or tidal events.
-    """)
+    # Components are computed live for any station and memoized per data version
+    data = load_data()
+    version = data_version()
+    stations = sorted(int(station_id) for station_id in data['station_id'].unique())
+    selected = st.multiselect("Stations", stations, default=[s for s in DECOMPOSITION_NOTES if s in stations], key="decomposition_stations")
+    method = st.radio("Method", METHODS, format_func=lambda name: "STL (Loess)" if name == "stl" else "Classical (moving average)", horizontal=True, key="decomposition_method")
+    period = int(st.number_input("Seasonal period (months)", min_value=2, max_value=60, value=12, key="decomposition_period"))
 
-    # Graph 2: Station 1612340
-    st.write("**Seasonal Decomposition for Station 1612340**")
-    image2 = Image.open("seasonald1612340.png")
-    st.image(image2, caption="Seasonal Decomposition for Station 1612340", use_column_width=True)
-    st.write("""
-    The seasonal component exhibits predictable periodic peaks, while the trend indicates a steady rise in water levels over recent decades.
-    Residuals are relatively minor, suggesting the decomposition effectively captures the underlying variability in the data.
-    """)
-
-    # Graph 3: Station 1612480
-    st.write("**Seasonal Decomposition for Station 1612480**")
-    image3 = Image.open("seasonald1612480.png")
-    st.image(image3, caption="Seasonal Decomposition for Station 1612480", use_column_width=True)
-    st.write("""
-    A consistent annual cycle is visible in the seasonal component, while the trend shows a gradual increase in water levels 
-    with slight fluctuations in recent years. The residuals reveal minimal anomalies, suggesting stable conditions over time.
-    """)
+    expand_all = st.checkbox("Expand every station", value=False, key="expand_all_stations")
 
-    # Graph 4: Station 1617433
-    st.write("**Seasonal Decomposition for Station 1617433**")
-    image4 = Image.open("seasonald1617433.png")
-    st.image(image4, caption="Seasonal Decomposition for Station 1617433", use_column_width=True)
-    st.write("""
-    The decomposition highlights strong seasonal peaks and a rising trend in water levels over time. Residuals are scattered, 
-    indicating some irregular variations, possibly linked to environmental or climatic factors.
-    """)
-
-    # Graph 5: Station 1619910
-    st.write("**Seasonal Decomposition for Station 1619910**")
-    image5 = Image.open("seasonald1619910.png")
-    st.image(image5, caption="Seasonal Decomposition for Station 1619910", use_column_width=True)
-    st.write("""
-    The seasonal component shows regular cycles, while the trend indicates a steady upward movement in water levels. 
-    Residuals capture moderate anomalies, possibly reflecting unusual tidal or weather events impacting the station.
-    """)
+    # Thumbnails for every station up front; full-size charts only for sections that are open
+    results = decompose_stations(data, selected, period=period, method=method)
+    if not expand_all:
+        show_gallery([
+            (f"decomposition-{station_id}-{method}-{period}", results[station_id][0],
+             lambda components=results[station_id][1], station_id=station_id: plot_decomposition(components, station_id), str(station_id))
+            for station_id in selected if station_id in results
+        ])
+    for index, station_id in enumerate(selected):
+        section = station_section(f"Seasonal Decomposition for Station {station_id}", f"decomposition_section_{station_id}", index == 0, expand_all)
+        if section is None:
+            continue
+        with section:
+            if station_id not in results:
+                st.write(f"Not enough history to decompose with a {period}-month period.")
+                continue
+            station_version, components = results[station_id]
+            show_figure(f"decomposition-{station_id}-{method}-{period}", station_version, lambda: plot_decomposition(components, station_id))
+            if station_id in DECOMPOSITION_NOTES:
+                st.write(DECOMPOSITION_NOTES[station_id])
 
     # Step 2: Rolling Statistics Graphs
     st.subheader("Step 2: Rolling Statistics")
@@ -79,50 +100,27 @@ This analysis aims to delve into the seasonal and temporal patterns observed in
 Rolling statistics were applied to the 'Highest' water levels using a 12-month sliding window to smooth short-term fluctuations and emphasize long-term trends. This technique effectively filters out seasonal noise and random variations, enabling a clearer view of gradual changes in water levels over time. By incorporating a full year into the rolling average, the analysis captures seasonal patterns while highlighting sustained increases or decreases across different stations. These insights provide a valuable foundation for long-term planning in flood management, infrastructure development, and water resource allocation.
     """)
 
-    # Graph 6: Rolling Mean for Station 1611400
-    st.write("**Rolling Mean for Station 1611400**")
-    image6 = Image.open("rolling_mean1611400.png")
-    st.image(image6, caption="Rolling Mean for Station 1611400", use_column_width=True)
-    st.write("""
-    The rolling mean reveals a slow and steady increase in water levels over time. Seasonal variations are visible but less 
-    pronounced, allowing the focus to shift to long-term trends.
-    """)
-
-    # Graph 7: Rolling Mean for Station 1612340
-    st.write("**Rolling Mean for Station 1612340**")
-    image7 = Image.open("rolling_mean1612340.png")
-    st.image(image7, caption="Rolling Mean for Station 1612340", use_column_width=True)
-    st.write("""
-    This graph shows a gradual rise in water levels with short-term fluctuations smoothed out. Seasonal peaks and troughs 
-    are subdued, emphasizing consistent long-term growth.
-    """)
-
-    # Graph 8: Rolling Mean for Station 1612480
-    st.write("**Rolling Mean for Station 1612480**")
-    image8 = Image.open("rolling_mean1612480.png")
-    st.image(image8, caption="Rolling Mean for Station 1612480", use_column_width=True)
-    st.write("""
-    The rolling average highlights an upward trend in water levels, with seasonal fluctuations dampened. 
-    The trend suggests consistent increases over the years.
-    """)
-
-    # Graph 9: Rolling Mean for Station 1617433
-    st.write("**Rolling Mean for Station 1617433**")
-    image9 = Image.open("rolling_mean1617433.png")
-    st.image(image9, caption="Rolling Mean for Station 1617433", use_column_width=True)
-    st.write("""
-    The rolling mean smooths out short-term variability, clearly showing a steady rise in water levels. Seasonal effects are visible, 
-    though secondary to the overall trend.
-    """)
-
-    # Graph 10: Rolling Mean for Station 1619910
-    st.write("**Rolling Mean for Station 1619910**")
-    image10 = Image.open("rolling_mean1619910.png")
-    st.image(image10, caption="Rolling Mean for Station 1619910", use_column_width=True)
-    st.write("""
-    This graph highlights a steady increase in water levels over time, with reduced short-term noise. 
-    The trend remains consistent, suggesting stable long-term changes.
-    """)
+    # Rolling windows for all stations come from one vectorized pass over the station x month matrix
+    window = st.slider("Rolling window (months)", min_value=2, max_value=120, value=12, key="rolling_window")
+    show_band = st.checkbox("Show rolling standard deviation", value=True, key="rolling_std")
+    show_envelope = st.checkbox("Show rolling min/max", value=False, key="rolling_envelope")
+    rolling = load_rolling(window)
+    charts = {
+        station_id: (f"rolling-{station_id}-{window}-{show_band}-{show_envelope}",
+                     lambda station_id=station_id: plot_rolling(rolling.station(station_id), station_id, window, show_band, show_envelope))
+        for station_id in selected
+    }
+    if not expand_all:
+        show_gallery([(chart_id, version, render, str(station_id)) for station_id, (chart_id, render) in charts.items()])
+    for index, station_id in enumerate(selected):
+        section = station_section(f"Rolling Mean for Station {station_id}", f"rolling_section_{station_id}", index == 0, expand_all)
+        if section is None:
+            continue
+        with section:
+            chart_id, render = charts[station_id]
+            show_figure(chart_id, version, render)
+            if window == 12 and station_id in ROLLING_NOTES:
+                st.write(ROLLING_NOTES[station_id])
 
     # Conclusion Section
     st.subheader("Conclusion")
@@ -0,0 +1,168 @@
+import time
+import tracemalloc
+
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+
+BATCH_SIZE = 32
+BENCHMARK_WINDOWS = [10, 50, 200]
+
+
+def station_order(station_ids):
+    """Row positions grouped by station, keeping each station's rows in their original (time) order."""
+    return np.argsort(np.asarray(station_ids), kind='stable')
+
+
+def window_rows(station_ids, time_steps):
+    """Positions of the rows that have ``time_steps`` earlier rows of the same station, in station order."""
+    order = station_order(station_ids)
+    ordered = np.asarray(station_ids)[order]
+    # A row is predictable when the row time_steps before it belongs to the same station
+    count = max(len(order) - time_steps, 0)
+    keep = ordered[time_steps:time_steps + count] == ordered[:count]
+    return order[time_steps:][keep]
+
+
+class SequenceDataset:
+    """(samples, time_steps, features) windows over one float32 copy of the rows, without materializing them.
+
+    Rows are copied once into a contiguous float32 buffer in which every
+    station occupies one contiguous segment in time order. ``windows`` is a
+    read-only strided view of that buffer: window ``s`` holds buffer rows
+    s..s+time_steps-1 and belongs to the row that follows it. Only windows
+    whose rows and target all fall inside one station are samples, so no
+    window ever crosses a station boundary. Memory is the buffer plus the
+    batch being gathered, whatever the window length.
+    """
+
+    def __init__(self, values, station_ids, time_steps):
+        self.time_steps = time_steps
+        order = station_order(station_ids)
+        self.buffer = np.ascontiguousarray(np.asarray(values)[order], dtype=np.float32)
+        rows, features = self.buffer.shape
+        step, width = self.buffer.strides
+        count = max(rows - time_steps, 0)
+        self.windows = as_strided(self.buffer, shape=(count, time_steps, features),
+                                  strides=(step, step, width), writeable=False)
+        ordered = np.asarray(station_ids)[order]
+        valid = ordered[time_steps:time_steps + count] == ordered[:count]
+        # Window starts in buffer order and the original positions of the rows they predict
+        self.starts = np.flatnonzero(valid)
+        self.rows = order[self.starts + time_steps]
+        self._sample_of_row = np.full(rows, -1, dtype=np.int64)
+        self._sample_of_row[self.rows] = np.arange(len(self.rows))
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __getitem__(self, index):
+        # Fancy indexing the strided view gathers just these windows into a new array
+        return self.windows[self.starts[index]]
+
+    @property
+    def nbytes(self):
+        return self.buffer.nbytes
+
+    def samples(self, rows):
+        """Sample indices predicting ``rows`` (original positions), in that order; rows without full history are dropped."""
+        samples = self._sample_of_row[np.asarray(rows)]
+        return samples[samples >= 0]
+
+    def batches(self, samples=None, targets=None, batch_size=BATCH_SIZE, shuffle=False, seed=None):
+        """Yield (windows, targets) batches over ``samples``; ``targets`` is indexed by original row position."""
+        samples = np.arange(len(self)) if samples is None else np.asarray(samples)
+        if shuffle:
+            samples = np.random.default_rng(seed).permutation(samples)
+        for start in range(0, len(samples), batch_size):
+            batch = samples[start:start + batch_size]
+            yield self[batch], None if targets is None else np.asarray(targets)[self.rows[batch]]
+
+
+def keras_batches(dataset, samples, targets, batch_size=BATCH_SIZE, shuffle=True, seed=None):
+    """A Keras ``Sequence`` over ``dataset``'s samples, gathering one batch at a time; reshuffled every epoch."""
+    from tensorflow.keras.utils import Sequence
+
+    # Converted once here, not on every batch
+    targets = np.asarray(targets, dtype=np.float32)
+
+    class Batches(Sequence):
+        def __init__(self):
+            super().__init__()
+            self.rng = np.random.default_rng(seed)
+            self.order = self.rng.permutation(samples) if shuffle else np.asarray(samples)
+
+        def __len__(self):
+            return -(-len(self.order) // batch_size)
+
+        def __getitem__(self, index):
+            batch = self.order[index * batch_size:(index + 1) * batch_size]
+            return dataset[batch], targets[dataset.rows[batch]]
+
+        def on_epoch_end(self):
+            if shuffle:
+                self.order = self.rng.permutation(self.order)
+
+    return Batches()
+
+
+def _copied_windows(values, time_steps):
+    # The notebooks' create_sequences: a list of slices stacked into one new array
+    return np.array([values[start:start + time_steps] for start in range(len(values) - time_steps)])
+
+
+def _traced(function):
+    tracemalloc.start()
+    started = time.perf_counter()
+    function()
+    seconds = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, peak / 2 ** 20
+
+
+def benchmark(windows=BENCHMARK_WINDOWS, stations=2, batch_size=256, seed=0):
+    """Peak traced memory and time to build the windows and pass over every batch once, copied vs strided.
+
+    Runs on a year of hourly synthetic rows per station with the TCN's
+    feature columns, so the row count is what longer look-backs meet in practice.
+    """
+    import pandas as pd
+
+    from feature_pipeline import fit_pipeline
+    from sea_level_models import TCN_FEATURES
+    from synthetic_data import SyntheticStations, fit_profiles
+
+    frame = SyntheticStations(fit_profiles(), stations, 'hourly', seed, '2020-01-01', '2020-12-31 23:00').frame()
+    pipeline = fit_pipeline(frame)
+    values = pipeline.transform(frame)[:, pipeline.indices(TCN_FEATURES)].astype(np.float32)
+    station_ids = frame['station_id'].to_numpy()
+
+    def copied(time_steps):
+        # Per station, so the copied windows are the same samples as the strided ones
+        parts = [_copied_windows(values[station_ids == station], time_steps) for station in np.unique(station_ids)]
+        for part in parts:
+            for start in range(0, len(part), batch_size):
+                part[start:start + batch_size].sum()
+
+    def strided(time_steps):
+        dataset = SequenceDataset(values, station_ids, time_steps)
+        for batch, _ in dataset.batches(batch_size=batch_size):
+            batch.sum()
+
+    rows = []
+    for time_steps in windows:
+        for method, function in [('copied', copied), ('strided', strided)]:
+            seconds, peak_mb = _traced(lambda: function(time_steps))
+            rows.append({'window': time_steps, 'method': method, 'rows': len(frame), 'seconds': seconds, 'peak_mb': peak_mb})
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compare peak memory of copied and strided sequence windows.")
+    parser.add_argument("--windows", type=int, nargs="+", default=BENCHMARK_WINDOWS)
+    parser.add_argument("--stations", type=int, default=2, help="synthetic hourly stations, one year each")
+    parser.add_argument("--batch-size", type=int, default=256)
+    args = parser.parse_args()
+    print(benchmark(args.windows, args.stations, args.batch_size).to_string(index=False, float_format=lambda value: f"{value:.3g}"))
@@ -0,0 +1,202 @@
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+FORECAST_CACHE_DIR = ".forecast_cache"
+# Months forecast past each station's last observation
+HORIZON = 24
+FORECAST_COLUMNS = ['ds', 'yhat', 'yhat_lower', 'yhat_upper']
+
+# Below this many stations to fit a process pool costs more than it saves
+MIN_PARALLEL_STATIONS = 2
+
+
+def station_history(frame, station_id, column='Highest'):
+    """(ds, y) rows of one station in time order, missing targets dropped as Prophet would."""
+    rows = frame.loc[frame['station_id'] == station_id, ['Datetime', column]].dropna()
+    return rows.rename(columns={'Datetime': 'ds', column: 'y'}).sort_values('ds', ignore_index=True)
+
+
+def history_version(history):
+    # Hash of timestamps and values: changes only when this station's data does
+    digest = hashlib.sha1(history['ds'].to_numpy(dtype='datetime64[us]').tobytes())
+    digest.update(np.ascontiguousarray(history['y'].to_numpy(dtype=np.float64)).tobytes())
+    return digest.hexdigest()[:16]
+
+
+def fit_station(history, horizon=HORIZON):
+    """Fit Prophet to one station and forecast ``horizon`` months past its history; returns (model, forecast)."""
+    import logging
+
+    from prophet import Prophet
+
+    # cmdstanpy logs every optimization at INFO
+    logging.getLogger('cmdstanpy').setLevel(logging.WARNING)
+    model = Prophet().fit(history)
+    future = model.make_future_dataframe(periods=horizon, freq='MS')
+    return model, model.predict(future)[FORECAST_COLUMNS]
+
+
+def _fit_job(station_id, history, horizon):
+    # Top-level so it can be pickled to worker processes; the model travels back as JSON
+    from prophet.serialize import model_to_json
+
+    started = time.perf_counter()
+    model, forecast = fit_station(history, horizon)
+    return station_id, model_to_json(model), forecast, time.perf_counter() - started
+
+
+class ForecastCache:
+    """Persistent store of fitted Prophet models and their forecasts per (station, data version, horizon).
+
+    Storing a station's new data version evicts its older ones, so the cache
+    holds at most one version per station however often the data changes.
+    """
+
+    def __init__(self, directory=FORECAST_CACHE_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, station_id, version, horizon):
+        return os.path.join(self.directory, f"{int(station_id)}-{version}-{int(horizon)}")
+
+    def get(self, station_id, version, horizon):
+        """(model JSON, forecast frame), or None when this station and version were never fitted."""
+        path = self.path(station_id, version, horizon)
+        if not (os.path.exists(f"{path}.json") and os.path.exists(f"{path}.parquet")):
+            return None
+        with open(f"{path}.json") as handle:
+            return handle.read(), pd.read_parquet(f"{path}.parquet")
+
+    def put(self, station_id, version, horizon, model_json, forecast):
+        path = self.path(station_id, version, horizon)
+        temporary = f"{path}.json.{os.getpid()}.tmp"
+        with open(temporary, 'w') as handle:
+            handle.write(model_json)
+        os.replace(temporary, f"{path}.json")
+        # The forecast goes last: get() only trusts entries whose parquet exists
+        temporary = f"{path}.parquet.{os.getpid()}.tmp"
+        forecast.to_parquet(temporary)
+        os.replace(temporary, f"{path}.parquet")
+        self.evict(station_id, version)
+
+    def evict(self, station_id, version):
+        """Remove the station's entries for any data version but ``version``; they can never be hit again."""
+        for name in os.listdir(self.directory):
+            stem, extension = os.path.splitext(name)
+            station, _, rest = stem.partition('-')
+            if extension in ('.json', '.parquet') and station == str(int(station_id)) and rest.split('-')[0] != version:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    pass
+
+
+def forecast_stations(frame, stations=None, column='Highest', horizon=HORIZON, cache=None, max_workers=None):
+    """Prophet forecasts for every station, refitting only stations whose rows changed.
+
+    Cache misses are fitted in parallel on a process pool, one station per
+    task. Returns {station_id: {'version', 'model_json', 'forecast', 'fit_seconds'}};
+    ``fit_seconds`` is None for stations served from the cache.
+    """
+    cache = cache or ForecastCache()
+    stations = sorted(frame['station_id'].unique()) if stations is None else stations
+    results, pending = {}, {}
+    for station_id in stations:
+        history = station_history(frame, station_id, column)
+        if len(history) < 2:
+            continue
+        version = history_version(history)
+        cached = cache.get(station_id, version, horizon)
+        if cached is None:
+            pending[station_id] = (version, history)
+        else:
+            results[station_id] = {'version': version, 'model_json': cached[0], 'forecast': cached[1], 'fit_seconds': None}
+
+    if len(pending) >= MIN_PARALLEL_STATIONS and max_workers != 1:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            jobs = [pool.submit(_fit_job, station_id, history, horizon) for station_id, (_, history) in pending.items()]
+            fitted = [job.result() for job in jobs]
+    else:
+        fitted = [_fit_job(station_id, history, horizon) for station_id, (_, history) in pending.items()]
+
+    for station_id, model_json, forecast, seconds in fitted:
+        version = pending[station_id][0]
+        cache.put(station_id, version, horizon, model_json, forecast)
+        results[station_id] = {'version': version, 'model_json': model_json, 'forecast': forecast, 'fit_seconds': seconds}
+    return results
+
+
+def station_models(results):
+    """Deserialized Prophet models from ``forecast_stations`` results, by station."""
+    from prophet.serialize import model_from_json
+
+    return {station_id: model_from_json(entry['model_json']) for station_id, entry in results.items()}
+
+
+def forecast_values(results, frame):
+    """Cached ``yhat`` for each row of ``frame`` by (station, Datetime); NaN where no forecast covers the row."""
+    forecasts = pd.concat([entry['forecast'][['ds', 'yhat']].assign(station_id=station_id)
+                           for station_id, entry in results.items()], ignore_index=True)
+    keys = frame[['station_id', 'Datetime']].rename(columns={'Datetime': 'ds'})
+    forecasts['station_id'] = forecasts['station_id'].astype(keys['station_id'].dtype)
+    merged = keys.merge(forecasts.drop_duplicates(['station_id', 'ds']), on=['station_id', 'ds'], how='left')
+    return merged['yhat'].to_numpy(dtype=np.float64)
+
+
+def scaling_benchmark(workers=(1, 2, 4), stations=20, seed=0, horizon=HORIZON):
+    """Wall time to fit a catalog of ``stations`` stations from scratch at each worker count.
+
+    The catalog is the real stations plus seeded synthetic ones; every run
+    uses an empty cache, so each fit is paid in full.
+    """
+    import tempfile
+
+    from data_access import load_data
+    from synthetic_data import SyntheticStations, fit_profiles
+
+    real = load_data()
+    extra = max(stations - real['station_id'].nunique(), 0)
+    frame = pd.concat([real, SyntheticStations(fit_profiles(real), extra, seed=seed).frame()], ignore_index=True) if extra else real
+    catalog = sorted(frame['station_id'].unique())[:stations]
+    rows = []
+    for count in workers:
+        with tempfile.TemporaryDirectory() as directory:
+            started = time.perf_counter()
+            results = forecast_stations(frame, catalog, horizon=horizon, cache=ForecastCache(directory), max_workers=count)
+            seconds = time.perf_counter() - started
+        rows.append({'workers': count, 'stations': len(results), 'seconds': seconds,
+                     'fit_seconds_total': sum(entry['fit_seconds'] for entry in results.values())})
+    table = pd.DataFrame(rows)
+    table['speedup'] = table['seconds'].iloc[0] / table['seconds']
+    table['efficiency'] = table['speedup'] / (table['workers'] / table['workers'].iloc[0])
+    return table
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Fit one Prophet model per station and cache the forecasts.")
+    parser.add_argument("--column", default='Highest')
+    parser.add_argument("--horizon", type=int, default=HORIZON, help="months to forecast past the data")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--benchmark", action="store_true", help="time a from-scratch fit of a larger catalog per worker count")
+    parser.add_argument("--stations", type=int, default=20, help="catalog size for --benchmark")
+    parser.add_argument("--benchmark-workers", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+
+    if args.benchmark:
+        print(scaling_benchmark(args.benchmark_workers, args.stations, horizon=args.horizon).to_string(index=False))
+    else:
+        from data_access import load_data
+
+        started = time.perf_counter()
+        done = forecast_stations(load_data(), column=args.column, horizon=args.horizon, max_workers=args.workers)
+        refitted = [station_id for station_id, entry in done.items() if entry['fit_seconds'] is not None]
+        print(json.dumps({'stations': len(done), 'refitted': [int(station_id) for station_id in refitted],
+                          'seconds': round(time.perf_counter() - started, 2)}))
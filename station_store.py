@@ -0,0 +1,154 @@
+import glob
+import os
+import re
+import sys
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.fs as pafs
+import pyarrow.parquet as pq
+
+from data_access import DATA_PATH, DATUM_COLUMNS, STORE_DIR, parse_station_csv
+
+LEGACY_CSV_PATTERN = "station *dataaset.csv"
+
+# Columns physically stored per station; station_id lives in the partition path
+STORE_SCHEMA = pa.schema(
+    [('Datetime', pa.timestamp('us'))]
+    + [(column, pa.float64()) for column in DATUM_COLUMNS]
+    + [('Inf', pa.int16())]
+)
+PARTITIONING = ds.partitioning(pa.schema([('station_id', pa.int64())]), flavor='hive')
+
+# Small row groups keep Datetime min/max statistics selective for range pushdown
+ROW_GROUP_SIZE = 64 * 1024
+
+
+def station_dir(station_id, store_dir=STORE_DIR):
+    return os.path.join(store_dir, f"station_id={int(station_id)}")
+
+
+def _part_files(station_id, store_dir):
+    return sorted(glob.glob(os.path.join(station_dir(station_id, store_dir), "part-*.parquet")))
+
+
+def write_station(frame, station_id, store_dir=STORE_DIR, overwrite=False):
+    """Write one station's rows as a new part file, sorted by Datetime.
+
+    With ``overwrite`` the station's existing parts are removed first,
+    otherwise the rows are appended as the next part.
+    """
+    directory = station_dir(station_id, store_dir)
+    os.makedirs(directory, exist_ok=True)
+    existing = _part_files(station_id, store_dir)
+    if overwrite:
+        for path in existing:
+            os.remove(path)
+        existing = []
+    if frame.empty:
+        return None
+
+    rows = frame.sort_values('Datetime')
+    table = pa.Table.from_pandas(rows[STORE_SCHEMA.names], schema=STORE_SCHEMA, preserve_index=False)
+    index = int(os.path.basename(existing[-1])[5:10]) + 1 if existing else 0
+    path = os.path.join(directory, f"part-{index:05d}.parquet")
+    pq.write_table(table, path, row_group_size=ROW_GROUP_SIZE, compression='zstd')
+    return path
+
+
+def legacy_station_id(path):
+    match = re.search(r"station\s*(\d+)", os.path.basename(path))
+    if match is None:
+        raise ValueError(f"Cannot infer a station id from {path!r}")
+    return int(match.group(1))
+
+
+def convert_csvs(paths, store_dir=STORE_DIR):
+    """Convert combined and legacy per-station CSVs into the station store.
+
+    Rows for the same station and timestamp are de-duplicated, later files
+    winning, so the legacy 1611400 export and the combined file can be merged.
+    """
+    frames = []
+    for path in paths:
+        if 'station_id' in pd.read_csv(path, nrows=0).columns:
+            frames.append(parse_station_csv(path))
+        else:
+            frames.append(parse_station_csv(path, station_id=legacy_station_id(path)))
+    combined = pd.concat(frames, ignore_index=True)
+    combined = combined.dropna(subset=['Datetime'])
+    combined = combined.drop_duplicates(subset=['station_id', 'Datetime'], keep='last')
+
+    written = {}
+    for station_id, rows in combined.groupby('station_id', sort=True):
+        write_station(rows, station_id, store_dir, overwrite=True)
+        written[int(station_id)] = len(rows)
+    return written
+
+
+def open_dataset(store_dir=STORE_DIR):
+    # Memory-mapped local filesystem: reads map the Parquet pages instead of copying them
+    filesystem = pafs.LocalFileSystem(use_mmap=True)
+    return ds.dataset(store_dir, format='parquet', partitioning=PARTITIONING, filesystem=filesystem)
+
+
+def _filter(stations=None, start=None, end=None):
+    expression = None
+    conditions = []
+    if stations is not None:
+        conditions.append(ds.field('station_id').isin([int(s) for s in stations]))
+    if start is not None:
+        conditions.append(ds.field('Datetime') >= pa.scalar(pd.Timestamp(start).to_pydatetime(), pa.timestamp('us')))
+    if end is not None:
+        conditions.append(ds.field('Datetime') <= pa.scalar(pd.Timestamp(end).to_pydatetime(), pa.timestamp('us')))
+    for condition in conditions:
+        expression = condition if expression is None else expression & condition
+    return expression
+
+
+def read_store(store_dir=STORE_DIR, columns=None, stations=None, start=None, end=None):
+    """Read a slice of the store.
+
+    Only the requested ``columns`` are decoded; ``stations`` prunes whole
+    partitions and ``start``/``end`` skip row groups via Parquet statistics.
+    """
+    dataset = open_dataset(store_dir)
+    table = dataset.to_table(columns=columns, filter=_filter(stations, start, end))
+    return table.to_pandas()
+
+
+def list_stations(store_dir=STORE_DIR):
+    if not os.path.isdir(store_dir):
+        return []
+    names = glob.glob(os.path.join(store_dir, "station_id=*"))
+    return sorted(int(os.path.basename(name).split('=', 1)[1]) for name in names)
+
+
+def last_timestamp(station_id, store_dir=STORE_DIR):
+    """Latest stored Datetime for a station, read from Parquet footers only."""
+    latest = None
+    for path in _part_files(station_id, store_dir):
+        metadata = pq.ParquetFile(path).metadata
+        column = metadata.schema.names.index('Datetime')
+        for group in range(metadata.num_row_groups):
+            statistics = metadata.row_group(group).column(column).statistics
+            if statistics is not None and statistics.has_min_max:
+                value = pd.Timestamp(statistics.max)
+                latest = value if latest is None or value > latest else latest
+    return latest
+
+
+def store_fingerprint(store_dir=STORE_DIR):
+    # Same idea as data_access.file_fingerprint, summed over every part file
+    paths = sorted(glob.glob(os.path.join(store_dir, "station_id=*", "part-*.parquet")))
+    stats = [os.stat(path) for path in paths]
+    return len(paths), max((s.st_mtime_ns for s in stats), default=0), int(np.sum([s.st_size for s in stats]))
+
+
+if __name__ == "__main__":
+    # python station_store.py [csv ...]  -- defaults to the combined file plus legacy exports
+    sources = sys.argv[1:] or sorted(glob.glob(LEGACY_CSV_PATTERN)) + [DATA_PATH]
+    for station_id, rows in convert_csvs(sources).items():
+        print(f"station {station_id}: {rows} rows")
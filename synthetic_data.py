@@ -0,0 +1,182 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from data_access import DATUM_COLUMNS, frame_from_store, load_data
+
+SYNTHETIC_STORE_DIR = "synthetic_store"
+# Real NOAA ids are 7 digits starting 1-8; synthetic ones never collide with them
+SYNTHETIC_ID_START = 9_000_000
+FREQUENCIES = {'monthly': 'MS', 'hourly': '1h', '6min': '6min'}
+CHUNK_ROWS = 500_000
+# Annual and semiannual cycles describe the monthly seasonal profile with 4 coefficients per column
+HARMONICS = 2
+SECONDS_PER_YEAR = 365.25 * 24 * 3600
+
+
+def _design(times, origin):
+    """Intercept, linear trend in years, and sin/cos terms of the annual harmonics."""
+    years = (np.asarray(times, dtype='datetime64[s]') - np.datetime64(origin, 's')).astype(np.float64) / SECONDS_PER_YEAR
+    columns = [np.ones_like(years), years]
+    for harmonic in range(1, HARMONICS + 1):
+        columns += [np.cos(2 * np.pi * harmonic * years), np.sin(2 * np.pi * harmonic * years)]
+    return np.column_stack(columns)
+
+
+class StationProfile:
+    """Generative statistics of one real station, learned from its monthly record.
+
+    Each datum column is a linear trend plus an annual and semiannual cycle;
+    the residuals keep their joint covariance through a square-root factor
+    (the datums move together, so Highest stays above MHHW and so on).
+    Missing values are drawn as whole-row patterns and Inf codes from their
+    observed frequencies.
+    """
+
+    def __init__(self, station_id, start, end, coefficients, noise_factor, patterns, pattern_weights, inf_values, inf_weights):
+        self.station_id = station_id
+        self.start, self.end = pd.Timestamp(start), pd.Timestamp(end)
+        self.coefficients = coefficients
+        self.noise_factor = noise_factor
+        self.patterns, self.pattern_weights = patterns, pattern_weights
+        self.inf_values, self.inf_weights = inf_values, inf_weights
+
+    @classmethod
+    def fit(cls, rows):
+        rows = rows.sort_values('Datetime')
+        start, end = rows['Datetime'].min(), rows['Datetime'].max()
+        design = _design(rows['Datetime'], start)
+        values = rows[DATUM_COLUMNS].to_numpy(dtype=np.float64)
+        observed = ~np.isnan(values)
+        coefficients = np.zeros((design.shape[1], len(DATUM_COLUMNS)))
+        residuals = np.full_like(values, np.nan)
+        for column in range(len(DATUM_COLUMNS)):
+            mask = observed[:, column]
+            coefficients[:, column] = np.linalg.lstsq(design[mask], values[mask, column], rcond=None)[0]
+            residuals[mask, column] = values[mask, column] - design[mask] @ coefficients[:, column]
+        complete = residuals[observed.all(axis=1)]
+        covariance = np.cov(complete, rowvar=False) if len(complete) > len(DATUM_COLUMNS) else np.diag(np.nanvar(residuals, axis=0))
+        # Clip tiny negative eigenvalues so the factor always exists
+        eigenvalues, eigenvectors = np.linalg.eigh(covariance)
+        noise_factor = eigenvectors * np.sqrt(np.clip(eigenvalues, 0, None))
+        patterns, counts = np.unique(~observed, axis=0, return_counts=True)
+        inf_values, inf_counts = np.unique(rows['Inf'].to_numpy(), return_counts=True)
+        return cls(int(rows['station_id'].iloc[0]), start, end, coefficients, noise_factor,
+                   patterns, counts / counts.sum(), inf_values, inf_counts / inf_counts.sum())
+
+    def sample(self, times, rng, offset=0.0, trend_scale=1.0, noise_scale=1.0):
+        """Rows for ``times``: Datetime, the datum columns and Inf, with missing values as in the source."""
+        coefficients = self.coefficients.copy()
+        coefficients[0] += offset
+        coefficients[1] *= trend_scale
+        values = _design(times, self.start) @ coefficients
+        values += noise_scale * rng.standard_normal((len(values), len(DATUM_COLUMNS))) @ self.noise_factor.T
+        missing = self.patterns[rng.choice(len(self.patterns), len(values), p=self.pattern_weights)]
+        values[missing] = np.nan
+        frame = pd.DataFrame(values, columns=DATUM_COLUMNS)
+        frame.insert(0, 'Datetime', pd.DatetimeIndex(times).as_unit('us'))
+        frame['Inf'] = rng.choice(self.inf_values, len(values), p=self.inf_weights).astype(np.int16)
+        return frame
+
+
+def fit_profiles(frame=None):
+    """One StationProfile per station in ``frame`` (the loaded data by default), in station order."""
+    frame = load_data() if frame is None else frame
+    return [StationProfile.fit(rows) for _, rows in frame.groupby('station_id', sort=True)]
+
+
+class SyntheticStations:
+    """A deterministic, streamed set of synthetic stations built from real station profiles.
+
+    Station ``i`` copies profile ``i % len(profiles)`` with its own datum
+    offset, trend and noise scale. Every chunk draws from a generator seeded
+    with (seed, station, chunk), so the output depends only on the seed and
+    settings (chunk_rows included), never on the order chunks are produced.
+    Only one chunk of one station is ever materialized.
+    """
+
+    def __init__(self, profiles, count, freq='monthly', seed=0, start=None, end=None, chunk_rows=CHUNK_ROWS):
+        if freq not in FREQUENCIES:
+            raise ValueError(f"Unknown frequency {freq!r}; expected one of {', '.join(FREQUENCIES)}")
+        self.profiles, self.count, self.freq, self.seed = profiles, count, freq, seed
+        self.start = None if start is None else pd.Timestamp(start)
+        self.end = None if end is None else pd.Timestamp(end)
+        self.chunk_rows = chunk_rows
+
+    def station(self, index):
+        """(station id, template profile, offset, trend scale, noise scale) of synthetic station ``index``."""
+        rng = np.random.default_rng([self.seed, index])
+        profile = self.profiles[index % len(self.profiles)]
+        return (SYNTHETIC_ID_START + index, profile, float(rng.normal(0, 0.25)),
+                float(rng.uniform(0.5, 1.5)), float(rng.uniform(0.8, 1.2)))
+
+    def _span(self, profile):
+        return (self.start or profile.start).floor('D'), self.end or profile.end
+
+    def times(self, profile, chunk):
+        """Timestamps of one chunk, computed arithmetically so the full index never exists."""
+        start, end = self._span(profile)
+        if self.freq == 'monthly':
+            return pd.date_range(start, end, freq='MS')[chunk * self.chunk_rows:(chunk + 1) * self.chunk_rows]
+        step = pd.Timedelta(FREQUENCIES[self.freq])
+        total = (end - start) // step + 1
+        first = chunk * self.chunk_rows
+        steps = np.arange(first, min(first + self.chunk_rows, total), dtype=np.int64)
+        return pd.DatetimeIndex(start + steps * step)
+
+    def chunks(self):
+        """Yield (station_id, rows) chunk by chunk, station after station."""
+        for index in range(self.count):
+            station_id, profile, offset, trend_scale, noise_scale = self.station(index)
+            chunk = 0
+            while True:
+                times = self.times(profile, chunk)
+                if len(times) == 0:
+                    break
+                rng = np.random.default_rng([self.seed, index, chunk])
+                rows = profile.sample(times, rng, offset, trend_scale, noise_scale)
+                rows['station_id'] = np.int64(station_id)
+                yield station_id, rows
+                chunk += 1
+
+    def write(self, store_dir=SYNTHETIC_STORE_DIR):
+        """Stream every chunk into a station store as its own part file; returns rows written per station."""
+        import station_store
+
+        written = {}
+        for station_id, rows in self.chunks():
+            # The first chunk replaces whatever an earlier run left for this station
+            station_store.write_station(rows, station_id, store_dir, overwrite=station_id not in written)
+            written[station_id] = written.get(station_id, 0) + len(rows)
+        return written
+
+    def frame(self):
+        """All rows at once, shaped like ``load_data()``; only for sizes that fit in memory."""
+        chunks = [rows for _, rows in self.chunks()]
+        return frame_from_store(pd.concat(chunks, ignore_index=True))
+
+
+if __name__ == "__main__":
+    import argparse
+    import resource
+    import time
+
+    parser = argparse.ArgumentParser(description="Write synthetic stations learned from the real data to a station store.")
+    parser.add_argument("count", type=int, help="number of synthetic stations")
+    parser.add_argument("--freq", choices=list(FREQUENCIES), default='monthly')
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--start", default=None, help="first timestamp (default: each template station's first)")
+    parser.add_argument("--end", default=None, help="last timestamp (default: each template station's last)")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--store-dir", default=SYNTHETIC_STORE_DIR)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    stations = SyntheticStations(fit_profiles(), args.count, args.freq, args.seed, args.start, args.end, args.chunk_rows)
+    written = stations.write(args.store_dir)
+    seconds = time.perf_counter() - started
+    total = sum(written.values())
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{len(written)} stations, {total:,} rows to {os.path.abspath(args.store_dir)} "
+          f"in {seconds:.1f} s ({total / seconds:,.0f} rows/s), peak RSS {peak:.0f} MB")
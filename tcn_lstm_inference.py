@@ -0,0 +1,295 @@
+import json
+import os
+import platform
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from model_registry import ModelRegistry
+from sea_level_models import TARGET, TCN_LSTM_FEATURES
+from tidal_models import MODEL_DIR
+
+INFERENCE_PATH = os.path.join("benchmarks", "tcn_lstm_inference.json")
+EXPORT_DIR = "exports"
+# 'graph' is the network traced once into a tf.function; the rest are TFLite flatbuffers
+RUNTIMES = ['graph', 'float32', 'float16', 'int8']
+# What the model server, the API and the forecast store run the TCN-LSTM on; 'keras' keeps Keras
+SERVING_RUNTIME = 'float32'
+RUNTIME_LABELS = {
+    'keras': "Keras predict, one call per station",
+    'keras_batched': "Keras, one batched call",
+    'graph': "Traced graph (float32)",
+    'float32': "TFLite float32",
+    'float16': "TFLite float16 weights",
+    'int8': "TFLite int8 weights",
+}
+STATIONS = 300
+REPEATS = 20
+SEED = 0
+
+
+def input_signature():
+    import tensorflow as tf
+
+    # One row's 13 features read as a 13-step sequence; only the batch dimension varies
+    return [tf.TensorSpec([None, len(TCN_LSTM_FEATURES), 1], tf.float32, name='features')]
+
+
+def trace(network):
+    """The network as a concrete function with a fixed input signature, for graph execution without Keras."""
+    import tensorflow as tf
+
+    @tf.function(input_signature=input_signature())
+    def forward(features):
+        return network(features, training=False)
+
+    return forward.get_concrete_function()
+
+
+def convert(network, precision):
+    """TFLite flatbuffer bytes for ``network``; float16 and int8 quantize the weights, inputs stay float32.
+
+    int8 is dynamic-range quantization: weights are stored as int8 and
+    activations quantized on the fly, so no calibration data is needed and
+    the caller's float32 inputs are unchanged.
+    """
+    import tensorflow as tf
+
+    if precision not in RUNTIMES[1:]:
+        raise ValueError(f"Unknown precision {precision!r}")
+    converter = tf.lite.TFLiteConverter.from_concrete_functions([trace(network)], network)
+    # The LSTM may lower to TensorList ops outside the builtin set; fall back to TF ops for those
+    converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS, tf.lite.OpsSet.SELECT_TF_OPS]
+    if precision != 'float32':
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if precision == 'float16':
+        converter.target_spec.supported_types = [tf.float16]
+    return converter.convert()
+
+
+class CompiledForecaster:
+    """A TFLite interpreter over an exported TCN-LSTM, reused across calls.
+
+    The interpreter is resized only when the batch size changes, so
+    repeated forecasts for the same station catalog run one ``invoke`` on
+    already-allocated tensors.
+    """
+
+    def __init__(self, flatbuffer, threads=None):
+        import tensorflow as tf
+
+        self.interpreter = tf.lite.Interpreter(model_content=flatbuffer, num_threads=threads or os.cpu_count())
+        self.input = self.interpreter.get_input_details()[0]['index']
+        self.output = self.interpreter.get_output_details()[0]['index']
+        self.batch_rows = None
+        # One interpreter serves every session's thread; its tensors are not safe to share mid-call
+        self.lock = threading.Lock()
+
+    def __call__(self, inputs):
+        inputs = np.ascontiguousarray(inputs, dtype=np.float32)
+        with self.lock:
+            if len(inputs) != self.batch_rows:
+                self.interpreter.resize_tensor_input(self.input, inputs.shape, strict=False)
+                self.interpreter.allocate_tensors()
+                self.batch_rows = len(inputs)
+            self.interpreter.set_tensor(self.input, inputs)
+            self.interpreter.invoke()
+            return self.interpreter.get_tensor(self.output).ravel().astype(np.float64)
+
+
+def export_path(registry, version, precision):
+    return os.path.join(registry.path('tcn_lstm', version), EXPORT_DIR, f"tcn_lstm-{precision}.tflite")
+
+
+def export(model, registry, version, precision):
+    """Flatbuffer of registered ``version`` at ``precision``, converted once and kept beside the artifact."""
+    path = export_path(registry, version, precision)
+    if os.path.exists(path):
+        with open(path, 'rb') as handle:
+            return handle.read()
+    flatbuffer = convert(model.network, precision)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    staging = f"{path}.{os.getpid()}.tmp"
+    with open(staging, 'wb') as handle:
+        handle.write(flatbuffer)
+    os.replace(staging, path)
+    return flatbuffer
+
+
+def forecaster(model, runtime, registry=None, version=None):
+    """A callable from (rows, 13, 1) float32 inputs to float64 predictions for ``runtime``."""
+    if runtime == 'keras':
+        return lambda inputs: np.concatenate([model.network.predict(inputs[row:row + 1], verbose=0).ravel()
+                                              for row in range(len(inputs))]).astype(np.float64)
+    if runtime == 'keras_batched':
+        return lambda inputs: model.network.predict(inputs, batch_size=len(inputs), verbose=0).ravel().astype(np.float64)
+    if runtime == 'graph':
+        forward = trace(model.network)
+        return lambda inputs: np.asarray(forward(inputs)).ravel().astype(np.float64)
+    if registry is None:
+        return CompiledForecaster(convert(model.network, runtime))
+    return CompiledForecaster(export(model, registry, version, runtime))
+
+
+def use_runtime(model, runtime, registry, version):
+    """Route ``model.predict`` through ``runtime`` (one of ``RUNTIMES``, or 'keras' to leave it on Keras).
+
+    The flatbuffer is the one exported beside the registered version,
+    converted on first use; every later load reads it from there.
+    """
+    model.compiled = None if runtime == 'keras' else forecaster(model, runtime, registry, version)
+    return model
+
+
+def latest_rows(frame):
+    """Position of each station's last row, in station order: the row every station forecast is made from."""
+    frame = frame.reset_index(drop=True)
+    return frame.groupby('station_id', sort=True)['Datetime'].idxmax().to_numpy()
+
+
+def forecast_stations(model, frame, runtime='float16', registry=None, version=None):
+    """One MSL prediction per station from its latest row, every station in a single batched call."""
+    frame = frame.reset_index(drop=True)
+    rows = latest_rows(frame)
+    inputs = model.inputs(frame.iloc[rows])
+    return pd.Series(forecaster(model, runtime, registry, version)(inputs), index=frame.loc[rows, 'station_id'], name=TARGET)
+
+
+def _catalog(frame, stations, seed):
+    from synthetic_data import SyntheticStations, fit_profiles
+
+    extra = max(stations - frame['station_id'].nunique(), 0)
+    if extra:
+        frame = pd.concat([frame, SyntheticStations(fit_profiles(frame), extra, seed=seed).frame()], ignore_index=True)
+    return frame[frame['station_id'].isin(sorted(frame['station_id'].unique())[:stations])].reset_index(drop=True)
+
+
+def _timed(function, inputs, repeats):
+    function(inputs)
+    seconds = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        function(inputs)
+        seconds.append(time.perf_counter() - started)
+    return float(np.median(seconds))
+
+
+def run(stations=STATIONS, runtimes=None, repeats=REPEATS, seed=SEED, model_dir=MODEL_DIR, path=INFERENCE_PATH):
+    """Accuracy and throughput of every runtime against Keras for the latest registered TCN-LSTM.
+
+    Accuracy is measured on the model's held-out rows of the real data:
+    each runtime's MSE and R² next to Keras', and the largest absolute
+    difference from the Keras prediction. Throughput is forecasts per
+    second for a catalog of ``stations`` stations (the real ones plus seeded
+    synthetic ones), each forecast from the station's latest row; the
+    per-station Keras loop is how the model was served before.
+    """
+    from sklearn.metrics import mean_squared_error, r2_score
+
+    from data_access import data_version, load_data
+    from model_refresh import held_out_rows
+
+    registry = ModelRegistry(model_dir)
+    manifest = registry.manifest('tcn_lstm')
+    model = registry.load('tcn_lstm', manifest['version'], mmap=False)
+    frame = load_data()
+    held_out = held_out_rows(model, frame)
+    actual = frame[TARGET].fillna(model.pipeline.mean(TARGET)).to_numpy(dtype=np.float64)[held_out]
+    accuracy_inputs = model.inputs(frame.iloc[held_out])
+    catalog = _catalog(frame, stations, seed)
+    station_inputs = model.inputs(catalog.iloc[latest_rows(catalog)])
+
+    rows = []
+    reference = None
+    for runtime in ['keras', 'keras_batched'] + list(runtimes or RUNTIMES):
+        row = {'runtime': runtime}
+        try:
+            function = forecaster(model, runtime, registry, manifest['version'])
+        except Exception as error:
+            rows.append({**row, 'status': f"failed: {error}"})
+            continue
+        # The per-station loop computes what the batched call does, one row at a time
+        predicted = (forecaster(model, 'keras_batched') if runtime == 'keras' else function)(accuracy_inputs)
+        reference = predicted if reference is None else reference
+        seconds = _timed(function, station_inputs, max(repeats // 10, 1) if runtime == 'keras' else repeats)
+        exported = export_path(registry, manifest['version'], runtime)
+        row.update({
+            'status': 'ok', 'stations': len(station_inputs), 'seconds': seconds,
+            'forecasts_per_second': len(station_inputs) / seconds,
+            'mse': float(mean_squared_error(actual, predicted)), 'r2': float(r2_score(actual, predicted)),
+            'max_abs_delta': float(np.max(np.abs(predicted - reference))),
+            'size_kb': os.path.getsize(exported) / 1024 if os.path.exists(exported) else None,
+        })
+        rows.append(row)
+        print(f"{runtime}: {row['forecasts_per_second']:.0f} forecasts/s", flush=True)
+
+    results = {
+        'created': pd.Timestamp.now(tz='UTC').isoformat(),
+        'data_version': data_version(),
+        'model_version': manifest['version'],
+        'seed': seed,
+        'host': {'platform': platform.platform(), 'python': platform.python_version(), 'cpus': os.cpu_count()},
+        'results': rows,
+    }
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    staging = f"{path}.{os.getpid()}.tmp"
+    with open(staging, 'w') as handle:
+        json.dump(results, handle, indent=2)
+    os.replace(staging, path)
+    return results
+
+
+def load_results(path=INFERENCE_PATH):
+    if not os.path.exists(path):
+        return None
+    with open(path) as handle:
+        return json.load(handle)
+
+
+def inference_table(results):
+    """One display row per runtime: throughput, speedup over the per-station Keras loop and accuracy."""
+    baseline = next((row for row in results['results'] if row['runtime'] == 'keras' and row['status'] == 'ok'), None)
+    rows = []
+    for row in results['results']:
+        entry = {'Runtime': RUNTIME_LABELS.get(row['runtime'], row['runtime'])}
+        if row['status'] != 'ok':
+            rows.append({**entry, 'Status': row['status']})
+            continue
+        entry.update({
+            'Status': 'ok', 'Forecasts/s': row['forecasts_per_second'],
+            'Speedup': row['forecasts_per_second'] / baseline['forecasts_per_second'] if baseline else np.nan,
+            'MSE': row['mse'], 'R² Score': row['r2'], 'Max |Δ| vs Keras (ft)': row['max_abs_delta'],
+            'Size (KB)': row['size_kb'],
+        })
+        rows.append(entry)
+    return pd.DataFrame(rows)
+
+
+def show_inference():
+    """Render the measured CPU inference comparison for the TCN-LSTM, or how to produce it."""
+    results = load_results()
+    if results is None:
+        st.info("No inference results yet. Run `python tcn_lstm_inference.py` to compare the exported runtimes with Keras.")
+        return
+    st.table(inference_table(results))
+    stations = next((row['stations'] for row in results['results'] if row['status'] == 'ok'), 0)
+    st.caption(f"Model version {results['model_version']}, {stations} stations per call, "
+               f"measured {results['created'][:19]} UTC on {results['host']['cpus']} CPU(s).")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Export the TCN-LSTM for CPU inference and compare it with Keras.")
+    parser.add_argument("--runtimes", nargs="+", choices=RUNTIMES, default=RUNTIMES)
+    parser.add_argument("--stations", type=int, default=STATIONS, help="stations forecast per batched call")
+    parser.add_argument("--repeats", type=int, default=REPEATS)
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    parser.add_argument("--output", default=INFERENCE_PATH)
+    args = parser.parse_args()
+    table = inference_table(run(args.stations, args.runtimes, args.repeats, args.seed, args.model_dir, args.output))
+    print(table.to_string(index=False, float_format=lambda value: f"{value:.4g}"))
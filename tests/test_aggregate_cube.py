@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+
+from aggregate_cube import AggregateCube
+from data_access import load_data
+
+
+def station_frame():
+    frame = load_data()
+    return frame[frame['station_id'] == frame['station_id'].iloc[0]].reset_index(drop=True)
+
+
+def test_refresh_appends_new_months():
+    frame = station_frame()
+    cube = AggregateCube.from_frame(frame.iloc[:-12]).refresh(frame)
+    pd.testing.assert_frame_equal(cube.cells, AggregateCube.from_frame(frame).cells, check_dtype=False)
+
+
+def test_refresh_follows_an_edited_old_value():
+    frame = station_frame()
+    cube = AggregateCube.from_frame(frame)
+    edited = frame.copy()
+    row = edited['Highest'].first_valid_index()
+    edited.loc[row, 'Highest'] = 99.0
+    key = tuple(edited.loc[row, ['station_id', 'Year', 'Month']])
+
+    refreshed = cube.refresh(edited)
+    stats = refreshed.cells.loc[key, 'Highest']
+    assert stats['count'] == 1
+    assert stats['sum'] == 99.0
+    assert stats['min'] == 99.0
+    assert stats['max'] == 99.0
+    assert np.isclose(refreshed.station_mean('Highest').iloc[0], edited['Highest'].mean())
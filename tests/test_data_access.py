@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import data_access
+
+ROWS = (
+    "Date,Highest,MHHW (ft),MHW (ft),MSL (ft),MTL (ft),MLW (ft),MLLW (ft),Lowest (ft),Time (GMT),Inf,station_id\n"
+    "2020/01/01,2.1,1.5,1.2,0.1,0.2,-0.9,-1.1,-1.6,00:00,0,1611400\n"
+    "2020/02/01,2.3,1.6,1.3,0.2,0.3,-0.8,-1.0,-1.5,00:00,0,1611400\n"
+)
+
+
+@pytest.fixture
+def source(tmp_path, monkeypatch):
+    path = tmp_path / "stations.csv"
+    path.write_text(ROWS)
+    parses = []
+    read_csv = pd.read_csv
+
+    def counting_read_csv(*args, **kwargs):
+        parses.append(args[0])
+        return read_csv(*args, **kwargs)
+
+    monkeypatch.setattr(pd, "read_csv", counting_read_csv)
+    monkeypatch.setattr(data_access, "file_hash", lambda path: "fixed")
+    data_access._load_cached.clear()
+    yield str(path), parses
+    data_access._load_cached.clear()
+
+
+def test_load_data_parses_once(source):
+    path, parses = source
+    first = data_access.load_data(path)
+    second = data_access.load_data(path)
+    assert len(parses) == 1
+    assert data_access.data_version(path) == "fixed"
+    assert len(parses) == 1
+    pd.testing.assert_frame_equal(first, second)
+
+
+def test_load_data_reparses_edited_file(source):
+    path, parses = source
+    data_access.load_data(path)
+    with open(path, "a") as handle:
+        handle.write("2020/03/01,2.2,1.5,1.2,0.1,0.2,-0.9,-1.1,-1.6,00:00,0,1611400\n")
+    assert len(data_access.load_data(path)) == 3
+    assert len(parses) == 2
+
+
+def test_callers_cannot_change_the_shared_frame(source):
+    path, parses = source
+    frame = data_access.load_data(path)
+    frame['extra'] = 1
+    frame.loc[0, 'Highest'] = np.nan
+    frame['MSL (ft)'] *= 10
+    again = data_access.load_data(path)
+    assert 'extra' not in again
+    assert again.loc[0, 'Highest'] == 2.1
+    assert again['MSL (ft)'].tolist() == [0.1, 0.2]
+    assert len(parses) == 1
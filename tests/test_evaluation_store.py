@@ -0,0 +1,22 @@
+import numpy as np
+
+from evaluation_store import quantile, summarize
+
+
+def test_summary_of_no_scored_rows_has_no_metrics():
+    summary = summarize(np.empty(0), np.empty(0), {'loss': [0.3, 0.2]})
+    assert summary['rows'] == 0
+    assert summary['metrics'] == {'mse': None, 'mae': None, 'r2': None, 'bias': None}
+    assert 'residual_histogram' not in summary and summary['history']['epochs'] == 2
+
+
+def test_summary_metrics_and_sketch():
+    actual = np.array([1.0, 2.0, 3.0, 4.0])
+    predicted = actual - 0.5
+    summary = summarize(actual, predicted)
+    assert summary['rows'] == 4
+    assert summary['metrics']['mse'] == 0.25 and summary['metrics']['bias'] == 0.5
+    assert summary['metrics']['r2'] == 1 - 1.0 / 5.0
+    assert quantile(summary, 0.5) == 0.5
+    # A constant target explains no variance, so there is no R² to report
+    assert summarize(np.ones(3), np.zeros(3))['metrics']['r2'] is None
@@ -0,0 +1,67 @@
+import pytest
+
+import station_store
+from ingestion import LocalDirectorySource, StationSource, ingest_catalog, ingest_station
+
+STATION = 1611400
+SAMPLE = "station 1611400dataaset.csv"
+
+
+@pytest.fixture
+def source_dir(tmp_path):
+    directory = tmp_path / "csv"
+    directory.mkdir()
+    lines = open(SAMPLE).read().splitlines(keepends=True)
+    # Hold the last year back so a later run has new months to append
+    (directory / SAMPLE).write_text("".join(lines[:-12]))
+    return directory, lines
+
+
+def stored(store_dir):
+    return station_store.read_store(str(store_dir), stations=[STATION])
+
+
+def test_source_interface_is_abstract():
+    with pytest.raises(TypeError):
+        StationSource()
+
+
+def test_ingest_station_from_a_directory(source_dir, tmp_path):
+    directory, lines = source_dir
+    result = ingest_station(LocalDirectorySource(str(directory)), STATION, str(tmp_path / "store"))
+    assert result['status'] == 'appended'
+    assert result['rows'] == len(lines) - 13
+    assert len(stored(tmp_path / "store")) == len(lines) - 13
+
+
+def test_rerun_adds_no_rows(source_dir, tmp_path):
+    directory, lines = source_dir
+    source, store_dir = LocalDirectorySource(str(directory)), str(tmp_path / "store")
+    ingest_station(source, STATION, store_dir)
+    again = ingest_station(source, STATION, store_dir)
+    assert again['status'] == 'up-to-date'
+    rows = stored(store_dir)
+    assert len(rows) == len(lines) - 13
+    assert not rows['Datetime'].duplicated().any()
+
+
+def test_only_new_rows_land(source_dir, tmp_path):
+    directory, lines = source_dir
+    source, store_dir = LocalDirectorySource(str(directory)), str(tmp_path / "store")
+    ingest_station(source, STATION, store_dir)
+    before = stored(store_dir)
+    (directory / SAMPLE).write_text("".join(lines))
+    result = ingest_station(source, STATION, store_dir)
+    assert result['status'] == 'appended'
+    assert result['rows'] == 12
+    assert result['since'] == before['Datetime'].max()
+    after = stored(store_dir)
+    assert len(after) == len(lines) - 1
+    assert not after['Datetime'].duplicated().any()
+
+
+def test_ingest_catalog_reports_every_station(source_dir, tmp_path):
+    directory, _ = source_dir
+    summary = ingest_catalog(LocalDirectorySource(str(directory)), [STATION, 9999999], str(tmp_path / "store"),
+                             max_workers=2)
+    assert summary.set_index('station_id')['status'].to_dict() == {STATION: 'appended', 9999999: 'not-found'}
@@ -0,0 +1,84 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+from prediction_api import MicroBatcher, Overloaded, PredictionService, RequestError, parse_request
+
+
+class EchoEngine:
+    """Answers each (station, month) request with itself and records the batches it was called with."""
+
+    def __init__(self):
+        self.server = SimpleNamespace(models={'echo': None}, unavailable={}, runtimes={})
+        self.calls = []
+
+    def predict(self, requests):
+        self.calls.append(len(requests))
+        return [{'station_id': station_id, 'date': f"{month:%Y-%m}"} for station_id, month in requests]
+
+
+def test_parse_request_reads_station_and_month():
+    assert parse_request({'station_id': '1611400', 'date': '2025-03-17'}) == (1611400, pd.Timestamp('2025-03-01'))
+
+
+@pytest.mark.parametrize('item', [
+    None, {'station_id': 1611400}, {'station_id': 1611400, 'date': None}, {'station_id': 1611400, 'date': 5},
+    {'station_id': 1611400, 'date': 'not a date'}, {'station_id': 1611400, 'date': ''}, {'station_id': 'x', 'date': '2025-03'},
+])
+def test_parse_request_rejects_bad_items_with_400(item):
+    with pytest.raises(RequestError) as raised:
+        parse_request(item)
+    assert raised.value.status == 400
+
+
+def test_micro_batcher_coalesces_concurrent_requests():
+    async def scenario():
+        engine = EchoEngine()
+        batcher = MicroBatcher(engine, max_batch=8, max_wait=0.05)
+        worker = asyncio.create_task(batcher.run())
+        requests = [(station_id, pd.Timestamp('2025-01-01')) for station_id in range(20)]
+        results = await asyncio.gather(*(batcher.submit(request) for request in requests))
+        worker.cancel()
+        return engine, batcher, results
+
+    engine, batcher, results = asyncio.run(scenario())
+    assert [result['station_id'] for result in results] == list(range(20))
+    assert engine.calls == [8, 8, 4]
+    assert batcher.metrics()['batches'] == 3
+
+
+def test_micro_batcher_refuses_beyond_queue_capacity():
+    async def scenario():
+        batcher = MicroBatcher(EchoEngine(), max_queue=2)
+        submissions = [asyncio.ensure_future(batcher.submit((1, pd.Timestamp('2025-01-01')))) for _ in range(3)]
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded):
+            await submissions[2]
+        for submission in submissions[:2]:
+            submission.cancel()
+        return batcher
+
+    assert asyncio.run(scenario()).rejected == 1
+
+
+@pytest.mark.parametrize('path, status', [('/predict/highest', 400), ('/nowhere', 404)])
+def test_error_replies_honour_connection_close(path, status):
+    async def scenario():
+        service = PredictionService({'highest': EchoEngine()})
+        server = await asyncio.start_server(service.handle, '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        body = json.dumps({'station_id': 1611400, 'date': None}).encode()
+        writer.write(f"POST {path} HTTP/1.1\r\nConnection: close\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+        await writer.drain()
+        reply = await asyncio.wait_for(reader.read(), 5)
+        writer.close()
+        server.close()
+        return reply
+
+    head = asyncio.run(scenario()).split(b'\r\n\r\n', 1)[0].decode()
+    assert head.startswith(f"HTTP/1.1 {status}")
+    assert "Connection: close" in head
@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from rolling_stats import STATISTICS, RollingStats, rolling_stats
+
+
+def sample(stations=4, months=60, seed=0):
+    rng = np.random.default_rng(seed)
+    values = rng.normal(2.5, 0.3, (stations, months))
+    values[rng.random(values.shape) < 0.1] = np.nan
+    return values, np.arange(stations), pd.date_range('2000-01-01', periods=months, freq='MS')
+
+
+@pytest.mark.parametrize('window, min_periods', [(1, 1), (12, 1), (12, 6), (70, 3)])
+def test_matches_pandas_rolling(window, min_periods):
+    values, _, _ = sample()
+    computed = rolling_stats(values, window, min_periods)
+    for row, series in enumerate(values):
+        rolling = pd.Series(series).rolling(window, min_periods=min_periods)
+        for name in STATISTICS:
+            np.testing.assert_allclose(computed[name][row], getattr(rolling, name)().to_numpy(), rtol=1e-9, atol=1e-12)
+
+
+def test_append_matches_a_full_pass():
+    values, stations, calendar = sample()
+    engine = RollingStats(values[:, :-3], stations, calendar[:-3], 12).append(values[:, -3:], calendar[-3:])
+    full = RollingStats(values, stations, calendar, 12)
+    for name in STATISTICS:
+        np.testing.assert_allclose(engine.stats[name], full.stats[name], rtol=1e-9, atol=1e-12)
+
+
+def test_refresh_extends_new_months_and_rebuilds_edits():
+    values, stations, calendar = sample()
+    engine = RollingStats(values[:, :-3], stations, calendar[:-3], 12)
+    extended = engine.refresh(values, stations, calendar)
+    assert engine.values.shape[1] == len(calendar) - 3
+    np.testing.assert_allclose(extended.stats['mean'], RollingStats(values, stations, calendar, 12).stats['mean'])
+
+    edited = values.copy()
+    edited[0, 5] = 99.0
+    rebuilt = extended.refresh(edited, stations, calendar)
+    assert rebuilt.stats['max'][0, 5] == 99.0
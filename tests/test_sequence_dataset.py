@@ -0,0 +1,37 @@
+import numpy as np
+
+from sequence_dataset import SequenceDataset, _copied_windows, window_rows
+
+TIME_STEPS = 4
+
+
+def interleaved_rows(seed=0):
+    # Three stations of different lengths, rows interleaved as in a frame sorted by date
+    rng = np.random.default_rng(seed)
+    station_ids = rng.permutation(np.repeat([7, 3, 5], [12, 3, 9]))
+    values = rng.normal(size=(len(station_ids), 2))
+    return values, station_ids
+
+
+def test_windows_match_per_station_copies():
+    values, station_ids = interleaved_rows()
+    dataset = SequenceDataset(values, station_ids, TIME_STEPS)
+    for station in np.unique(station_ids):
+        positions = np.flatnonzero(station_ids == station)
+        # The copy is a flat empty array for a station shorter than the window
+        expected = _copied_windows(values[positions], TIME_STEPS).astype(np.float32).reshape(-1, TIME_STEPS, 2)
+        samples = dataset.samples(positions)
+        np.testing.assert_array_equal(dataset.rows[samples], positions[TIME_STEPS:])
+        np.testing.assert_array_equal(dataset[samples], expected)
+
+
+def test_no_window_crosses_a_station():
+    _, station_ids = interleaved_rows(1)
+    dataset = SequenceDataset(np.arange(len(station_ids))[:, None], station_ids, TIME_STEPS)
+    for sample in range(len(dataset)):
+        window_positions = dataset[sample][:, 0].astype(np.int64)
+        assert (station_ids[window_positions] == station_ids[dataset.rows[sample]]).all()
+        assert (window_positions < dataset.rows[sample]).all()
+    # The station with fewer rows than the window has no samples at all
+    assert not np.isin(dataset.rows, np.flatnonzero(station_ids == 3)).any()
+    np.testing.assert_array_equal(np.sort(dataset.rows), np.sort(window_rows(station_ids, TIME_STEPS)))
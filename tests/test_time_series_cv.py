@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+
+from time_series_cv import time_splits
+
+
+def _frame(lengths):
+    return pd.DataFrame([{'station_id': station, 'Datetime': date}
+                         for station, length in lengths.items()
+                         for date in pd.date_range('2000-01-01', periods=length, freq='MS')])
+
+
+def test_short_stations_fill_only_the_latest_folds():
+    frame = _frame({1: 200, 2: 60, 3: 20})
+    splits = time_splits(frame, folds=5, test_size=24)
+    stations = frame['station_id'].to_numpy()
+
+    # 60 rows fit two 24-row test windows after at least one training row; 20 rows fit none
+    tested = [set(stations[test]) for _, test in splits]
+    assert tested == [{1}, {1}, {1}, {1, 2}, {1, 2}]
+    for train, test in splits:
+        for station in set(stations[test]):
+            rows_train, rows_test = train[stations[train] == station], test[stations[test] == station]
+            assert len(rows_train) and len(rows_test) == 24
+            assert frame['Datetime'].iloc[rows_train].max() < frame['Datetime'].iloc[rows_test].min()
+
+
+def test_stations_too_short_for_any_fold_leave_every_fold_empty():
+    splits = time_splits(_frame({1: 20}), folds=3, test_size=24)
+    assert all(len(train) == 0 and len(test) == 0 for train, test in splits)
+    assert all(test.dtype == np.int64 for _, test in splits)
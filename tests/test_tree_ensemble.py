@@ -0,0 +1,24 @@
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+
+from tree_ensemble import NATIVE_ROWS, PackedEnsemble, pack
+
+
+def test_large_batches_go_to_the_native_estimator():
+    rng = np.random.default_rng(0)
+    X, y = rng.normal(size=(3000, 5)), rng.normal(size=3000)
+    forest = RandomForestRegressor(n_estimators=10, max_depth=6, random_state=0).fit(X, y)
+    loads = []
+
+    def native():
+        loads.append(forest)
+        return forest
+
+    engine = PackedEnsemble(*pack(forest), native=native)
+
+    small, large = X[:NATIVE_ROWS['mean']], X[:NATIVE_ROWS['mean'] + 1]
+    np.testing.assert_allclose(engine.predict(small), forest.predict(small))
+    assert loads == []
+    np.testing.assert_allclose(engine.predict(large), forest.predict(large))
+    engine.predict(large)
+    assert loads == [forest]
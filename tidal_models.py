@@ -0,0 +1,439 @@
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from data_access import data_version, frame_version, load_data
+from feature_pipeline import data_features, fit_pipeline
+from model_registry import REGISTRY_DIR, ModelRegistry
+
+MODEL_DIR = REGISTRY_DIR
+TARGET = 'Highest'
+TEST_SIZE = 0.2
+RANDOM_STATE = 42
+
+# Incremental refresh: trees the forest swaps in, boosting rounds added, fine-tuning epochs
+REFRESH_TREES = 10
+REFRESH_ROUNDS = 20
+FINE_TUNE_EPOCHS = 5
+
+MODEL_LABELS = {
+    'decision_tree': "Decision Tree",
+    'random_forest': "Random Forest",
+    'prophet_xgboost': "Prophet + XGBoost",
+    'lstm': "LSTM",
+}
+# Optional libraries a model needs beyond requirements.txt; without them it is skipped
+MODEL_LIBRARIES = {'prophet_xgboost': ['prophet'], 'lstm': ['tensorflow']}
+
+# Feature lists as built in the modelling notebooks, in the same column order
+TREE_FEATURES = ['MHHW (ft)', 'MHW (ft)', 'MSL (ft)', 'MTL (ft)', 'MLW (ft)', 'MLLW (ft)', 'Lowest (ft)', 'Inf', 'Year', 'Month', 'Day', 'Hour']
+LSTM_FEATURES = ['MHHW (ft)', 'MHW (ft)', 'MSL (ft)', 'MTL (ft)', 'MLW (ft)', 'MLLW (ft)', 'Lowest (ft)', 'Inf', 'Month', 'Day', 'Hour', 'Sin_Hour', 'Cos_Hour']
+LSTM_SCALED = ['MHHW (ft)', 'MHW (ft)', 'MSL (ft)', 'MTL (ft)', 'MLW (ft)', 'MLLW (ft)', 'Sin_Hour', 'Cos_Hour']
+
+
+def seen_through(frame):
+    """Last timestamp of every station in ``frame``; later rows are new to a model trained on it."""
+    return {int(station_id): stamp for station_id, stamp in frame.groupby('station_id')['Datetime'].max().items()}
+
+
+def refit_leaves(tree, X, y, X_new):
+    """Reset the leaves of a fitted sklearn regression tree that ``X_new`` reaches to the mean of ``y`` there.
+
+    The splits are kept; only the leaves the new rows land in change, to the
+    mean target of every row of ``X`` (which includes the new rows) in them.
+    """
+    leaves = tree.apply(X)
+    affected = np.unique(tree.apply(X_new))
+    sums = np.bincount(leaves, weights=y, minlength=tree.tree_.node_count)
+    counts = np.bincount(leaves, minlength=tree.tree_.node_count)
+    # tree_.value is a view of the tree's own buffer, so this edits the fitted tree
+    tree.tree_.value[affected, 0, 0] = sums[affected] / counts[affected]
+
+
+class TidalModel:
+    """A fitted model for the Highest tidal level plus the feature pipeline it was trained with.
+
+    ``predict`` takes rows shaped like ``load_data()`` and returns one
+    prediction per row, so callers never repeat the notebook preprocessing.
+    Callers that already hold ``pipeline.transform(frame)`` pass it as
+    ``features`` and the transform is not repeated.
+    """
+
+    name = None
+    drop_first = True
+    # Tree ensembles the registry stores as memory-mappable node arrays
+    packed_attributes = ()
+    # Rows before the first one predicted that ``predict`` needs as history (sequence models)
+    context_rows = 0
+
+    def __init__(self, pipeline):
+        self.pipeline = pipeline
+        self.seen_through = {}
+        self.metrics = {}
+        self.test_keys = None
+        self.trained_at = None
+
+    def matrix(self, frame, columns, features=None):
+        features = self.pipeline.transform(frame) if features is None else features
+        return np.asarray(features)[:, self.pipeline.indices(self.feature_names(columns))]
+
+    def feature_names(self, columns):
+        return list(columns) + self.pipeline.dummy_columns(self.drop_first)
+
+    def schema(self):
+        """Input columns the fitted model expects, in order, for the registry manifest."""
+        raise NotImplementedError
+
+    def params(self):
+        return {}
+
+    def refresh(self, frame, target, train_rows, new_rows, features=None):
+        """Update the fitted model in place for ``new_rows``, training on ``train_rows`` (which include them)."""
+        raise NotImplementedError
+
+    def sample_rows(self, frame):
+        """Positions of the rows of ``frame`` this model can predict (all of them unless it needs history)."""
+        return np.arange(len(frame))
+
+    def predict(self, frame, features=None):
+        raise NotImplementedError
+
+
+class TreeModel(TidalModel):
+    """Decision Tree or Random Forest on the tabular features with drop-first station dummies."""
+
+    packed_attributes = ('estimator',)
+
+    def __init__(self, name, estimator, pipeline):
+        super().__init__(pipeline)
+        self.name = name
+        self.estimator = estimator
+
+    def fit(self, frame, target, features=None):
+        self.estimator.fit(self.matrix(frame, TREE_FEATURES, features), target)
+        return self
+
+    def schema(self):
+        return [{'name': name, 'dtype': 'float64'} for name in self.feature_names(TREE_FEATURES)]
+
+    def params(self):
+        return self.estimator.get_params()
+
+    def refresh(self, frame, target, train_rows, new_rows, features=None):
+        X = self.matrix(frame, TREE_FEATURES, features)
+        if not hasattr(self.estimator, 'estimators_'):
+            refit_leaves(self.estimator, X[train_rows], target[train_rows], X[new_rows])
+            return self
+        # The forest grows REFRESH_TREES trees on the current rows and retires its oldest as many, keeping its size
+        size = len(self.estimator.estimators_)
+        self.estimator.set_params(warm_start=True, n_estimators=size + REFRESH_TREES)
+        self.estimator.fit(X[train_rows], target[train_rows])
+        self.estimator.estimators_ = self.estimator.estimators_[REFRESH_TREES:]
+        self.estimator.set_params(warm_start=False, n_estimators=size)
+        return self
+
+    def predict(self, frame, features=None):
+        return self.estimator.predict(self.matrix(frame, TREE_FEATURES, features))
+
+
+class ProphetXGBoostModel(TidalModel):
+    """One Prophet baseline per station on (ds, Highest) with XGBoost fitted to their residuals.
+
+    The notebook fitted a single Prophet to all stations' rows interleaved on
+    the same timestamps; here each station gets its own, fitted in parallel
+    through ``station_forecasts`` and reused from its forecast cache while the
+    station's rows are unchanged.
+    """
+
+    name = 'prophet_xgboost'
+    packed_attributes = ('booster',)
+
+    def __init__(self, pipeline):
+        super().__init__(pipeline)
+        self.prophet = {}
+        self.booster = None
+
+    def baseline(self, frame):
+        stamps, station_ids = frame['Datetime'].to_numpy(), frame['station_id'].to_numpy()
+        values = np.full(len(frame), np.nan)
+        for station_id, prophet in self.prophet.items():
+            rows = station_ids == station_id
+            if rows.any():
+                values[rows] = prophet.predict(pd.DataFrame({'ds': stamps[rows]}))['yhat'].to_numpy()
+        unseen = np.isnan(values)
+        if unseen.any():
+            # A station without its own model gets the mean of every station's baseline
+            future = pd.DataFrame({'ds': stamps[unseen]})
+            values[unseen] = np.mean([prophet.predict(future)['yhat'].to_numpy() for prophet in self.prophet.values()], axis=0)
+        return values
+
+    def fit_baselines(self, frame, target, max_workers=None):
+        """Fit (or reuse from the forecast cache) every station's Prophet and return in-sample yhat per row."""
+        from station_forecasts import forecast_stations, forecast_values, station_models
+
+        results = forecast_stations(frame[['station_id', 'Datetime']].assign(y=target), column='y', max_workers=max_workers)
+        self.prophet = station_models(results)
+        # In-sample yhat comes straight from the cached forecasts
+        baseline = forecast_values(results, frame)
+        if np.isnan(baseline).any():
+            baseline = np.where(np.isnan(baseline), self.baseline(frame), baseline)
+        return baseline
+
+    def fit(self, frame, target, train_rows, features=None, max_workers=None):
+        from xgboost import XGBRegressor
+
+        # As in the notebook, Prophet sees the whole series and XGBoost only the training rows
+        residuals = target - self.fit_baselines(frame, target, max_workers)
+        self.booster = XGBRegressor(colsample_bytree=0.6, learning_rate=0.1, max_depth=3, min_child_weight=1,
+                                    n_estimators=200, subsample=0.6, random_state=RANDOM_STATE)
+        self.booster.fit(self.matrix(frame, TREE_FEATURES, features)[train_rows], residuals[train_rows])
+        return self
+
+    def schema(self):
+        return [{'name': 'ds', 'dtype': 'datetime64'}] + [{'name': name, 'dtype': 'float64'} for name in self.feature_names(TREE_FEATURES)]
+
+    def params(self):
+        return {'xgboost': self.booster.get_params()}
+
+    def refresh(self, frame, target, train_rows, new_rows, features=None):
+        from xgboost import XGBRegressor
+
+        # Only stations whose rows changed are refitted; the booster continues from its last round
+        residuals = target - self.fit_baselines(frame, target)
+        booster = XGBRegressor(**{**self.booster.get_params(), 'n_estimators': REFRESH_ROUNDS})
+        booster.fit(self.matrix(frame, TREE_FEATURES, features)[train_rows], residuals[train_rows],
+                    xgb_model=self.booster.get_booster())
+        booster.set_params(n_estimators=self.booster.get_params()['n_estimators'] + REFRESH_ROUNDS)
+        self.booster = booster
+        return self
+
+    def predict(self, frame, features=None):
+        return self.baseline(frame) + self.booster.predict(self.matrix(frame, TREE_FEATURES, features))
+
+    def __getstate__(self):
+        from prophet.serialize import model_to_json
+
+        state = dict(self.__dict__)
+        state['prophet'] = {station_id: model_to_json(prophet) for station_id, prophet in self.prophet.items()}
+        return state
+
+    def __setstate__(self, state):
+        from prophet.serialize import model_from_json
+
+        state['prophet'] = {station_id: model_from_json(prophet) for station_id, prophet in state['prophet'].items()}
+        self.__dict__.update(state)
+
+
+class KerasModel(TidalModel):
+    """Base for Keras networks: batched direct calls for prediction and pickling through ``.keras`` bytes."""
+
+    def __init__(self, pipeline):
+        super().__init__(pipeline)
+        self.network = None
+        self.history = {}
+        # Set by the serving side to run the network through an exported runtime instead of Keras
+        self.compiled = None
+
+    def inputs(self, frame, features=None):
+        raise NotImplementedError
+
+    def params(self):
+        return {'layers': [layer.get_config() for layer in self.network.layers], 'epochs': len(self.history.get('loss', []))}
+
+    def predict_inputs(self, inputs, batch_size=4096):
+        compiled = getattr(self, 'compiled', None)
+        if compiled is not None:
+            return compiled(inputs)
+        # Calling the model directly skips Keras' per-predict() setup, which dominates small batches
+        batches = [self.network(inputs[start:start + batch_size], training=False).numpy()
+                   for start in range(0, len(inputs), batch_size)]
+        return np.concatenate(batches).ravel() if batches else np.empty(0)
+
+    def predict(self, frame, features=None, batch_size=4096):
+        return self.predict_inputs(self.inputs(frame, features), batch_size)
+
+    def fine_tune(self, epochs, *data):
+        # Continues from the registered weights and optimizer state; the input scalers stay as fitted
+        history = self.network.fit(*data, epochs=epochs, verbose=0).history
+        for key, values in history.items():
+            self.history.setdefault(key, []).extend(values)
+
+    def refresh(self, frame, target, train_rows, new_rows, features=None, epochs=FINE_TUNE_EPOCHS):
+        inputs = self.inputs(frame, features)
+        self.fine_tune(epochs, inputs[train_rows], target[train_rows])
+        return self
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state['compiled'] = None
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "network.keras")
+            self.network.save(path)
+            with open(path, 'rb') as handle:
+                state['network'] = handle.read()
+        return state
+
+    def __setstate__(self, state):
+        from tensorflow.keras.models import load_model
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "network.keras")
+            with open(path, 'wb') as handle:
+                handle.write(state['network'])
+            state['network'] = load_model(path)
+        self.__dict__.update(state)
+
+
+class LSTMModel(KerasModel):
+    """LSTM(64)-Dropout-Dense(32)-Dense(1) over single-timestep rows with min-max scaled datums."""
+
+    name = 'lstm'
+    drop_first = False
+
+    def __init__(self, pipeline):
+        super().__init__(pipeline)
+        self.scale_min = None
+        self.scale_range = None
+
+    def inputs(self, frame, features=None):
+        features = self.matrix(frame, LSTM_FEATURES, features)
+        scaled = [LSTM_FEATURES.index(column) for column in LSTM_SCALED]
+        features[:, scaled] = (features[:, scaled] - self.scale_min) / self.scale_range
+        return features[:, None, :].astype(np.float32)
+
+    def fit(self, frame, target, train_rows, test_rows, features=None, epochs=50, batch_size=32, scaler_rows=None):
+        from tensorflow.keras.layers import LSTM, Dense, Dropout, Input
+        from tensorflow.keras.models import Sequential
+        from tensorflow.keras.optimizers import Adam
+
+        # The notebook fit MinMaxScaler on every row before splitting; keep that for comparable scores unless
+        # ``scaler_rows`` narrows it, as cross-validation does so no test month shapes the scaling
+        features = self.pipeline.transform(frame) if features is None else features
+        values = np.asarray(features)[:, self.pipeline.indices(LSTM_SCALED)]
+        values = values if scaler_rows is None else values[scaler_rows]
+        self.scale_min = values.min(axis=0)
+        self.scale_range = np.where(values.max(axis=0) > self.scale_min, values.max(axis=0) - self.scale_min, 1.0)
+        inputs = self.inputs(frame, features)
+        self.network = Sequential([
+            Input(shape=inputs.shape[1:]),
+            LSTM(64, activation='tanh'),
+            Dropout(0.2),
+            Dense(32, activation='relu'),
+            Dense(1),
+        ])
+        self.network.compile(optimizer=Adam(learning_rate=0.001), loss='mse', metrics=['mae'])
+        self.history = self.network.fit(inputs[train_rows], target[train_rows], epochs=epochs, batch_size=batch_size,
+                                        validation_data=(inputs[test_rows], target[test_rows]), verbose=0).history
+        return self
+
+    def schema(self):
+        return [{'name': name, 'dtype': 'float32'} for name in self.feature_names(LSTM_FEATURES)]
+
+
+def split_rows(n):
+    """Train/test row positions exactly as train_test_split(X, y, test_size=0.2, random_state=42) drew them."""
+    from sklearn.model_selection import train_test_split
+
+    return train_test_split(np.arange(n), test_size=TEST_SIZE, random_state=RANDOM_STATE)
+
+
+def _build(name, pipeline):
+    from sklearn.ensemble import RandomForestRegressor
+    from sklearn.tree import DecisionTreeRegressor
+
+    if name == 'decision_tree':
+        return TreeModel(name, DecisionTreeRegressor(max_depth=5, min_samples_leaf=5, min_samples_split=2, random_state=RANDOM_STATE), pipeline)
+    if name == 'random_forest':
+        return TreeModel(name, RandomForestRegressor(n_estimators=200, max_depth=10, min_samples_leaf=1, min_samples_split=2,
+                                                     random_state=RANDOM_STATE, n_jobs=-1), pipeline)
+    if name == 'prophet_xgboost':
+        return ProphetXGBoostModel(pipeline)
+    if name == 'lstm':
+        return LSTMModel(pipeline)
+    raise ValueError(f"Unknown model {name!r}")
+
+
+def train_model(name, frame, features=None):
+    """Fit one model on ``frame`` with the notebook's preprocessing, split and hyperparameters.
+
+    ``features`` may be the pipeline matrix of ``frame`` when the caller already has it.
+    """
+    from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+
+    frame = frame.reset_index(drop=True)
+    pipeline = fit_pipeline(frame)
+    features = pipeline.transform(frame) if features is None else features
+    # The notebooks imputed the target along with the features before splitting
+    target = frame[TARGET].fillna(pipeline.mean(TARGET)).to_numpy(dtype=np.float64)
+    train_rows, test_rows = split_rows(len(frame))
+
+    model = _build(name, pipeline)
+    started, cpu_started = time.perf_counter(), time.process_time()
+    if name in ('decision_tree', 'random_forest'):
+        model.fit(frame.iloc[train_rows], target[train_rows], features[train_rows])
+    elif name == 'prophet_xgboost':
+        model.fit(frame, target, train_rows, features)
+    else:
+        model.fit(frame, target, train_rows, test_rows, features)
+    seconds, cpu_seconds = time.perf_counter() - started, time.process_time() - cpu_started
+
+    predicted = model.predict(frame.iloc[test_rows], features[test_rows])
+    model.metrics = {
+        'mse': float(mean_squared_error(target[test_rows], predicted)),
+        'mae': float(mean_absolute_error(target[test_rows], predicted)),
+        'r2': float(r2_score(target[test_rows], predicted)),
+        'fit_seconds': seconds,
+        'fit_cpu_seconds': cpu_seconds,
+    }
+    model.test_keys = frame.loc[test_rows, ['station_id', 'Datetime']].reset_index(drop=True)
+    model.seen_through = seen_through(frame)
+    model.trained_at = pd.Timestamp.now(tz='UTC').isoformat()
+    return model
+
+
+def train_models(frame=None, names=None, model_dir=MODEL_DIR):
+    """Train and register each model whose dependencies are installed; returns {name: version or error}."""
+    from evaluation_store import record
+
+    # The loaded data's features are transformed once per data version and shared by every model
+    features = data_features(fit_pipeline(load_data())) if frame is None else None
+    # Registered against the data actually trained on, which need not be the default source
+    version = data_version() if frame is None else frame_version(frame)
+    frame = load_data() if frame is None else frame
+
+    registry = ModelRegistry(model_dir)
+    results = {}
+    for name in names or list(MODEL_LABELS):
+        try:
+            model = train_model(name, frame, features)
+        except ImportError as error:
+            results[name] = f"skipped: {error}"
+            continue
+        manifest = registry.register(name, model, model.schema(), model.metrics, version, model.params())
+        record(name, manifest['version'], model, frame, TARGET, features, model_dir, version)
+        results[name] = f"version {manifest['version']}"
+    return results
+
+
+def load_model(name, model_dir=MODEL_DIR, version=None, mmap=True):
+    return ModelRegistry(model_dir).load(name, version, mmap)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Train and persist the Highest tidal level models.")
+    parser.add_argument("models", nargs="*", help=f"models to train, any of {', '.join(MODEL_LABELS)} (default: all)")
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    args = parser.parse_args()
+    unknown = sorted(set(args.models) - set(MODEL_LABELS))
+    if unknown:
+        parser.error(f"unknown models: {', '.join(unknown)}")
+    # Train through the imported module so pickles reference tidal_models.*, not __main__.*
+    import tidal_models
+
+    for model_name, outcome in tidal_models.train_models(names=args.models or None, model_dir=args.model_dir).items():
+        print(f"{model_name}: {outcome}")
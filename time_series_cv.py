@@ -0,0 +1,307 @@
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from model_common import SHARED, SharedArrays, attach_shared, model_labels, model_module
+from render_cache import show_figure
+
+CV_PATH = os.path.join("evaluations", "time_series_cv.json")
+METHODS = ['expanding', 'sliding']
+FOLDS = 5
+# Rows are months: each fold tests the next two years of every station
+TEST_SIZE = 24
+# Training window of the sliding method, ten years per station
+TRAIN_SIZE = 120
+GAP = 0
+
+
+def station_folds(rows, folds=FOLDS, test_size=TEST_SIZE, gap=GAP):
+    """Folds a station with ``rows`` rows can fill: each tests ``test_size`` rows after at least one training row."""
+    return np.clip((np.asarray(rows) - gap - 1) // test_size, 0, folds)
+
+
+def time_splits(frame, method='expanding', folds=FOLDS, test_size=TEST_SIZE, train_size=TRAIN_SIZE, gap=GAP):
+    """(train, test) row positions of ``frame`` per fold, split in time within each station.
+
+    Every station is cut as TimeSeriesSplit(test_size=...) would cut its own
+    time-ordered rows and fold k unions the stations' k-th splits, so each
+    fold tests the next ``test_size`` months of every station on strictly
+    earlier rows. ``expanding`` trains on all earlier rows, ``sliding`` on
+    the last ``train_size``; ``gap`` rows between the two are left out. A
+    station too short for every fold takes part in only the latest folds it
+    can fill, and one too short for any (see ``station_folds``) in none.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown split method {method!r}; expected one of {', '.join(METHODS)}")
+    trains, tests = [[] for _ in range(folds)], [[] for _ in range(folds)]
+    order = frame.sort_values(['station_id', 'Datetime'], kind='stable')
+    for _, rows in order.groupby('station_id', sort=True):
+        positions = frame.index.get_indexer(rows.index)
+        count = int(station_folds(len(positions), folds, test_size, gap))
+        for fold in range(folds - count, folds):
+            test_start = len(positions) - (folds - fold) * test_size
+            train_end = test_start - gap
+            train_start = max(train_end - train_size, 0) if method == 'sliding' else 0
+            trains[fold].append(positions[train_start:train_end])
+            tests[fold].append(positions[test_start:test_start + test_size])
+    empty = np.empty(0, dtype=np.int64)
+    return [(np.sort(np.concatenate(train)) if train else empty, np.sort(np.concatenate(test)) if test else empty)
+            for train, test in zip(trains, tests)]
+
+
+def fold_features(features, missing, means):
+    """The pipeline matrix with the imputed cells refilled from one fold's training means.
+
+    Calendar columns and station dummies do not depend on which rows were
+    seen, so they are computed once for all folds; only the mean imputation
+    is refitted per fold.
+    """
+    features = np.array(features)
+    values = features[:, :missing.shape[1]]
+    values[missing] = np.broadcast_to(means, missing.shape)[missing]
+    return features
+
+
+# Frame and per-worker views of the shared arrays, set by _load
+_FRAME = {}
+
+
+def _load(frame, spec):
+    attach_shared(spec)
+    _FRAME['frame'] = frame
+    _FRAME['shared'] = SHARED
+
+
+def _fit_fold(name, fold, train, test, single_thread):
+    # Top-level so it can be pickled to worker processes; only row positions travel
+    from feature_pipeline import NUMERIC_COLUMNS, FeaturePipeline
+
+    frame, shared = _FRAME['frame'], _FRAME['shared']
+    features, missing = shared['features'][1], shared['missing'][1]
+    module = model_module(name)
+    observed = frame[module.TARGET].to_numpy(dtype=np.float64)
+
+    training = frame.iloc[train]
+    means = training[NUMERIC_COLUMNS].astype(np.float64).mean()
+    pipeline = FeaturePipeline(means, shared['stations'][1])
+    matrix = fold_features(features, missing, means[NUMERIC_COLUMNS].to_numpy())
+    # Training targets are imputed like the notebooks did; test rows are scored only where observed
+    target = np.where(np.isnan(observed), means[module.TARGET], observed)
+    model = module._build(name, pipeline)
+    estimator = getattr(model, 'estimator', None)
+    if single_thread and estimator is not None and 'n_jobs' in estimator.get_params():
+        estimator.set_params(n_jobs=1)
+
+    started = time.perf_counter()
+    try:
+        if name in ('decision_tree', 'random_forest'):
+            model.fit(training, target[train], matrix[train])
+            predicted = model.predict(frame.iloc[test], matrix[test])
+        elif name == 'prophet_xgboost':
+            # Prophet sees the training window only, unlike the notebook's fit on every row; folds are the parallel unit
+            model.fit(training, target[train], np.arange(len(train)), matrix[train], max_workers=1)
+            predicted = model.predict(frame.iloc[test], matrix[test])
+        else:
+            # Early stopping watches the latest tenth of the training window and the scalers see only
+            # the training window, so no test month leaks into the fit
+            cutoff = training['Datetime'].quantile(0.9)
+            late = (frame['Datetime'].to_numpy()[train] >= cutoff)
+            model.fit(frame, target, train[~late], train[late], matrix, scaler_rows=train)
+            predicted = model.predict(frame, matrix)[test]
+    except ImportError as error:
+        return {'model': name, 'fold': fold, 'status': f"skipped: {error}"}
+    return {'model': name, 'fold': fold, 'status': 'ok', 'fit_seconds': time.perf_counter() - started,
+            'predicted': np.asarray(predicted, dtype=np.float64)}
+
+
+def fold_metrics(frame, target, test, predicted):
+    """MSE, MAE and R² over all test rows and per station, skipping missing targets and predictions."""
+    actual = frame[target].to_numpy(dtype=np.float64)[test]
+    stations = frame['station_id'].to_numpy()[test]
+    scored = ~np.isnan(actual) & ~np.isnan(predicted)
+    rows = []
+    for station in ['all'] + sorted(np.unique(stations).tolist()):
+        mask = scored & ((stations == station) if station != 'all' else True)
+        error = actual[mask] - predicted[mask]
+        total = np.sum((actual[mask] - actual[mask].mean()) ** 2) if mask.any() else 0.0
+        rows.append({
+            'station': str(station), 'rows': int(mask.sum()),
+            'mse': float(np.mean(error ** 2)) if mask.any() else np.nan,
+            'mae': float(np.mean(np.abs(error))) if mask.any() else np.nan,
+            'r2': float(1 - np.sum(error ** 2) / total) if total > 0 else np.nan,
+        })
+    return rows
+
+
+def cross_validate(names, frame=None, method='expanding', folds=FOLDS, test_size=TEST_SIZE, train_size=TRAIN_SIZE,
+                   gap=GAP, max_workers=None):
+    """Per-fold and per-station metrics of each model under time-ordered splits.
+
+    The feature pipeline is transformed once; folds only refit its
+    imputation means on their training rows. Every (model, fold) fit runs in
+    a worker process that maps the shared matrix instead of receiving a copy.
+    """
+    from data_access import load_data
+    from feature_pipeline import NUMERIC_COLUMNS, data_features, fit_pipeline
+
+    loaded = frame is None
+    frame = (load_data() if loaded else frame).reset_index(drop=True)
+    pipeline = fit_pipeline(frame)
+    features = data_features(pipeline) if loaded else pipeline.transform(frame)
+    missing = frame[NUMERIC_COLUMNS].isna().to_numpy()
+    splits = time_splits(frame, method, folds, test_size, train_size, gap)
+    max_workers = max_workers or os.cpu_count() or 1
+
+    # Folds no station is long enough to fill are left out
+    tasks = [(name, fold, train, test) for name in names for fold, (train, test) in enumerate(splits) if len(test)]
+    with SharedArrays({'features': features, 'missing': missing, 'stations': pipeline.stations}) as shared, \
+            ProcessPoolExecutor(max_workers, initializer=_load, initargs=(frame, shared.spec)) as pool:
+        futures = [pool.submit(_fit_fold, name, fold, train, test, max_workers > 1) for name, fold, train, test in tasks]
+        outcomes = [future.result() for future in futures]
+
+    rows = []
+    for (name, fold, train, test), outcome in zip(tasks, outcomes):
+        dates = frame['Datetime']
+        row = {'model': name, 'method': method, 'fold': fold, 'status': outcome['status'],
+               'train_rows': len(train), 'train_start': str(dates.iloc[train].min().date()),
+               'test_start': str(dates.iloc[test].min().date()), 'test_end': str(dates.iloc[test].max().date())}
+        if outcome['status'] != 'ok':
+            rows.append({**row, 'station': 'all'})
+            continue
+        for metrics in fold_metrics(frame, model_module(name).TARGET, test, outcome['predicted']):
+            rows.append({**row, 'fit_seconds': outcome['fit_seconds'], **metrics})
+    sizes = frame.groupby('station_id').size()
+    for station, size in sizes[station_folds(sizes.to_numpy(), folds, test_size, gap) == 0].items():
+        rows += [{'model': name, 'method': method, 'station': str(station),
+                  'status': f"skipped: {size} rows, too few for a {test_size}-month test window"} for name in names]
+    return pd.DataFrame(rows)
+
+
+def run(names=None, methods=METHODS, folds=FOLDS, test_size=TEST_SIZE, train_size=TRAIN_SIZE, gap=GAP,
+        max_workers=None, path=CV_PATH):
+    """Cross-validate every model with each split method and write the results to ``path``."""
+    from data_access import data_version
+
+    names = names or list(model_labels())
+    tables = []
+    for method in methods:
+        started = time.perf_counter()
+        tables.append(cross_validate(names, None, method, folds, test_size, train_size, gap, max_workers))
+        print(f"{method}: {len(names)} models x {folds} folds in {time.perf_counter() - started:.1f} s", flush=True)
+    results = {
+        'created': pd.Timestamp.now(tz='UTC').isoformat(),
+        'data_version': data_version(),
+        'settings': {'folds': folds, 'test_size': test_size, 'train_size': train_size, 'gap': gap},
+        # NaN metrics (a station with no scored rows) are stored as null
+        'results': json.loads(pd.concat(tables, ignore_index=True).to_json(orient='records')),
+    }
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    staging = f"{path}.{os.getpid()}.tmp"
+    with open(staging, 'w') as handle:
+        json.dump(results, handle, indent=2)
+    os.replace(staging, path)
+    return results
+
+
+def load_results(path=CV_PATH):
+    if not os.path.exists(path):
+        return None
+    with open(path) as handle:
+        return json.load(handle)
+
+
+def summary_table(results, models):
+    """Mean and spread over folds of each model's all-station metrics, one row per (model, method)."""
+    labels = model_labels()
+    table = pd.DataFrame(results['results'])
+    table = table[table['model'].isin(models) & (table['station'] == 'all') & (table['status'] == 'ok')]
+    rows = []
+    for (name, method), part in table.groupby(['model', 'method'], sort=False):
+        rows.append({
+            'Model': labels.get(name, name), 'Split': method, 'Folds': len(part),
+            'MSE': part['mse'].mean(), 'MSE std': part['mse'].std(), 'MAE': part['mae'].mean(),
+            'R² Score': part['r2'].mean(), 'R² std': part['r2'].std(),
+        })
+    return pd.DataFrame(rows)
+
+
+def station_table(results, models, method='expanding'):
+    """Mean MSE over folds per station, one column per model."""
+    labels = model_labels()
+    table = pd.DataFrame(results['results'])
+    table = table[table['model'].isin(models) & (table['method'] == method) & (table['station'] != 'all')
+                  & (table['status'] == 'ok')]
+    if table.empty:
+        return pd.DataFrame()
+    pivot = table.pivot_table(index='station', columns='model', values='mse', aggfunc='mean')
+    return pivot.rename(columns=labels).rename_axis(index="Station", columns=None)
+
+
+def plot_folds(results, models, method='expanding'):
+    """All-station MSE of every fold in time order, one line per model."""
+    labels = model_labels()
+    table = pd.DataFrame(results['results'])
+    table = table[(table['method'] == method) & (table['station'] == 'all') & (table['status'] == 'ok')]
+    fig, ax = plt.subplots(figsize=(8, 5))
+    for name in models:
+        part = table[table['model'] == name].sort_values('fold')
+        if not part.empty:
+            ax.plot(part['test_start'], part['mse'], marker='o', label=labels[name])
+    ax.set_title(f"Test MSE per Fold ({method} window)")
+    ax.set_xlabel("Test window start")
+    ax.set_ylabel("MSE")
+    ax.tick_params(axis='x', rotation=45)
+    if ax.get_lines():
+        ax.legend()
+    fig.tight_layout()
+    return fig
+
+
+def show_cv(models, chart_id):
+    """Render the time-ordered cross-validation tables and fold chart for ``models``, or how to produce them."""
+    results = load_results()
+    if results is None:
+        st.info("No time-ordered evaluation yet. Run `python time_series_cv.py` to cross-validate the models by date.")
+        return
+    summary = summary_table(results, models)
+    if summary.empty:
+        st.info("The stored evaluation does not cover these models.")
+        return
+    st.table(summary)
+    settings = results['settings']
+    st.caption(f"{settings['folds']} folds of {settings['test_size']} months per station; evaluated {results['created'][:19]} UTC.")
+    st.table(station_table(results, models))
+    skipped = sorted({row['station'] for row in results['results']
+                      if row['station'] != 'all' and row['status'] != 'ok' and row['model'] in models})
+    if skipped:
+        st.caption(f"Too short for a test window, left out: station {', '.join(skipped)}.")
+    show_figure(chart_id, results['created'], lambda: plot_folds(results, models))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Cross-validate the models on time-ordered, per-station splits.")
+    parser.add_argument("models", nargs="*", help="models to evaluate (default: all six)")
+    parser.add_argument("--methods", nargs="+", choices=METHODS, default=METHODS)
+    parser.add_argument("--folds", type=int, default=FOLDS)
+    parser.add_argument("--test-size", type=int, default=TEST_SIZE, help="test months per station and fold")
+    parser.add_argument("--train-size", type=int, default=TRAIN_SIZE, help="training months per station (sliding)")
+    parser.add_argument("--gap", type=int, default=GAP, help="months left out between training and test")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--output", default=CV_PATH)
+    args = parser.parse_args()
+    unknown = sorted(set(args.models) - set(model_labels()))
+    if unknown:
+        parser.error(f"unknown models: {', '.join(unknown)}")
+
+    outcome = run(args.models or None, args.methods, args.folds, args.test_size, args.train_size, args.gap,
+                  args.workers, args.output)
+    print(summary_table(outcome, args.models or list(model_labels())).to_string(index=False))
+    print(f"Wrote {args.output}")
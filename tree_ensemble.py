@@ -0,0 +1,218 @@
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+# One .npy file per array so each can be memory-mapped on its own
+ARRAY_NAMES = ['feature', 'threshold', 'children', 'default_left', 'value', 'roots']
+META_NAME = "ensemble.json"
+# Batch size above which the library's own predict beats the packed descent, by aggregate, measured with
+# benchmark() on the tidal features: a sklearn tree or forest catches up near 1k rows, XGBoost's
+# 200 shallow trees at about 50
+NATIVE_ROWS = {'mean': 1024, 'sum': 48}
+
+
+def _float32_at_most(threshold):
+    """Largest float32 not above each float64 threshold: for float32 x, x <= t exactly when x <= this."""
+    narrowed = threshold.astype(np.float32)
+    return np.where(narrowed > threshold, np.nextafter(narrowed, np.float32(-np.inf)), narrowed)
+
+
+def _finish(trees, depth, comparison, aggregate, base=0.0):
+    """Concatenate per-tree node arrays into one ensemble with global child indices.
+
+    ``trees`` holds (feature, threshold, left, right, default_left, value) per
+    tree with leaves marked by left < 0. Leaves point to themselves, so a fixed
+    number of descent steps (the deepest tree's depth) lands every row on a
+    leaf without per-tree bookkeeping.
+    """
+    offsets = np.cumsum([0] + [len(tree[0]) for tree in trees])
+    parts = {name: [] for name in ARRAY_NAMES[:-1]}
+    for offset, (feature, threshold, left, right, default_left, value) in zip(offsets, trees):
+        leaf = np.asarray(left) < 0
+        own = np.arange(len(leaf)) + offset
+        parts['feature'].append(np.where(leaf, 0, feature).astype(np.int32))
+        parts['threshold'].append(np.where(leaf, np.inf, threshold).astype(np.float32))
+        # children[2 * node + went_right] is the next node: one gather per level instead of two
+        parts['children'].append(np.column_stack([np.where(leaf, own, np.asarray(left) + offset),
+                                                  np.where(leaf, own, np.asarray(right) + offset)]).astype(np.int32).ravel())
+        parts['default_left'].append(np.asarray(default_left, dtype=bool))
+        parts['value'].append(np.asarray(value, dtype=np.float64))
+    arrays = {name: np.concatenate(values) for name, values in parts.items()}
+    arrays['roots'] = offsets[:-1].astype(np.int32)
+    meta = {'depth': int(depth), 'comparison': comparison, 'aggregate': aggregate, 'base': float(base)}
+    return arrays, meta
+
+
+def pack_sklearn(estimator):
+    """Node arrays of a fitted DecisionTreeRegressor or RandomForestRegressor (x <= threshold goes left)."""
+    trees = []
+    for item in getattr(estimator, 'estimators_', [estimator]):
+        tree = item.tree_
+        default_left = getattr(tree, 'missing_go_to_left', np.zeros(tree.node_count, dtype=bool))
+        trees.append((tree.feature, tree.threshold, tree.children_left, tree.children_right,
+                      default_left, tree.value[:, 0, 0]))
+    depth = max(item.tree_.max_depth for item in getattr(estimator, 'estimators_', [estimator]))
+    # sklearn compares float32 features against float64 thresholds; narrowing this way keeps every decision
+    trees = [(feature, _float32_at_most(threshold), *rest) for feature, threshold, *rest in trees]
+    return _finish(trees, depth, comparison='le', aggregate='mean')
+
+
+def pack_xgboost(model):
+    """Node arrays of a fitted XGBRegressor or Booster (x < split goes left, missing follows default_left)."""
+    booster = model.get_booster() if hasattr(model, 'get_booster') else model
+    learner = json.loads(booster.save_raw('json'))['learner']
+    base = float(learner['learner_model_param']['base_score'].strip('[]'))
+    trees, depth = [], 0
+    for tree in learner['gradient_booster']['model']['trees']:
+        left = np.asarray(tree['left_children'])
+        parents = np.asarray(tree['parents'])
+        # Parents always precede their children, so one forward pass gives every node's depth
+        levels = np.zeros(len(left), dtype=np.int64)
+        for node in range(1, len(left)):
+            levels[node] = levels[parents[node]] + 1
+        depth = max(depth, int(levels.max()))
+        conditions = np.asarray(tree['split_conditions'], dtype=np.float32)
+        # Leaf values are stored in split_conditions
+        trees.append((tree['split_indices'], conditions, left, tree['right_children'],
+                      tree['default_left'], np.where(left < 0, conditions, 0.0)))
+    return _finish(trees, depth, comparison='lt', aggregate='sum', base=base)
+
+
+def pack(estimator):
+    if hasattr(estimator, 'get_booster') or type(estimator).__name__ == 'Booster':
+        return pack_xgboost(estimator)
+    if hasattr(estimator, 'tree_') or hasattr(estimator, 'estimators_'):
+        return pack_sklearn(estimator)
+    raise TypeError(f"Cannot pack {type(estimator).__name__}")
+
+
+def packable(estimator):
+    return estimator is not None and (hasattr(estimator, 'get_booster') or hasattr(estimator, 'tree_')
+                                      or hasattr(estimator, 'estimators_'))
+
+
+class PackedEnsemble:
+    """Batch prediction over contiguous node arrays, one vectorized step per tree level.
+
+    All rows descend all trees at once: each level gathers the split feature
+    and threshold of every (row, tree) node, compares, and gathers the next
+    node. sklearn forests average the leaves; XGBoost sums them on top of
+    the base score. Results match the reference ``predict`` to float tolerance.
+    The descent wins on small batches only; given ``native``, a loader of the
+    library estimator, batches above ``NATIVE_ROWS`` go to that estimator,
+    loaded on the first such batch.
+    """
+
+    def __init__(self, arrays, meta, native=None):
+        self.arrays = arrays
+        self.meta = meta
+        self.native = native
+        self.estimator = None
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_estimator(cls, estimator):
+        return cls(*pack(estimator))
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        for name, values in self.arrays.items():
+            np.save(os.path.join(directory, f"{name}.npy"), np.ascontiguousarray(values))
+        with open(os.path.join(directory, META_NAME), 'w') as handle:
+            json.dump(self.meta, handle)
+
+    @classmethod
+    def load(cls, directory, mmap=True, native=None):
+        # Read-only maps share one page-cache copy between every process that opens them
+        arrays = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode='r' if mmap else None)
+                  for name in ARRAY_NAMES}
+        with open(os.path.join(directory, META_NAME)) as handle:
+            return cls(arrays, json.load(handle), native)
+
+    def native_estimator(self):
+        with self.lock:
+            if self.estimator is None:
+                self.estimator = self.native()
+            return self.estimator
+
+    @property
+    def nbytes(self):
+        return sum(values.nbytes for values in self.arrays.values())
+
+    def predict(self, X, chunk_rows=4096):
+        if self.native is not None and len(X) > NATIVE_ROWS[self.meta['aggregate']]:
+            return np.asarray(self.native_estimator().predict(X), dtype=np.float64)
+        X = np.asarray(X, dtype=np.float32)
+        feature, threshold = self.arrays['feature'], self.arrays['threshold']
+        children, default_left, value = self.arrays['children'], self.arrays['default_left'], self.arrays['value']
+        roots = np.asarray(self.arrays['roots'])
+        strict = self.meta['comparison'] == 'lt'
+        has_missing = bool(np.isnan(X).any())
+        output = np.empty(len(X))
+        for start in range(0, len(X), chunk_rows):
+            # Feature-major rows and tree-major nodes: each tree's gathers stay inside its own few KB of nodes
+            rows = np.ascontiguousarray(X[start:start + chunk_rows].T).ravel()
+            count = min(chunk_rows, len(X) - start)
+            columns = np.arange(count, dtype=np.int32)
+            nodes = np.repeat(roots[:, None], count, axis=1)
+            for _ in range(self.meta['depth']):
+                values = rows[feature[nodes] * np.int32(count) + columns]
+                went_right = values >= threshold[nodes] if strict else values > threshold[nodes]
+                if has_missing:
+                    went_right = np.where(np.isnan(values), ~default_left[nodes], went_right)
+                nodes = children[2 * nodes + went_right]
+            leaves = value[nodes]
+            output[start:start + count] = leaves.mean(axis=0) if self.meta['aggregate'] == 'mean' else leaves.sum(axis=0)
+        return output + self.meta['base']
+
+
+def _latency(predict, X, repeats):
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        predict(X)
+        timings.append(time.perf_counter() - started)
+    return 1000 * float(np.median(timings))
+
+
+def benchmark(batch_sizes=(1, 10_000), repeats=20, seed=0):
+    """Median latency of PackedEnsemble against sklearn / xgboost ``predict`` on the tidal features.
+
+    The forest is trained exactly as ``tidal_models`` trains it; the booster
+    uses the residual corrector's hyperparameters (fitted to the forest's
+    output, since Prophet may not be installed). Batches are resampled from
+    the real rows.
+    """
+    import pandas as pd
+    from xgboost import XGBRegressor
+
+    from data_access import load_data
+    from tidal_models import RANDOM_STATE, TREE_FEATURES, train_model
+
+    forest = train_model('random_forest', load_data())
+    X = forest.matrix(load_data(), TREE_FEATURES)
+    booster = XGBRegressor(colsample_bytree=0.6, learning_rate=0.1, max_depth=3, min_child_weight=1,
+                           n_estimators=200, subsample=0.6, random_state=RANDOM_STATE)
+    references = {'random_forest': forest.estimator, 'xgboost': booster.fit(X, forest.estimator.predict(X))}
+    rng = np.random.default_rng(seed)
+    rows = []
+    for name, reference in references.items():
+        engine = PackedEnsemble.from_estimator(reference)
+        for size in batch_sizes:
+            batch = X[rng.integers(0, len(X), size)]
+            rows.append({
+                'model': name, 'rows': size,
+                'reference_ms': _latency(reference.predict, batch, repeats),
+                'packed_ms': _latency(engine.predict, batch, repeats),
+                'max_abs_diff': float(np.max(np.abs(reference.predict(batch) - engine.predict(batch)))),
+            })
+    table = pd.DataFrame(rows)
+    table['speedup'] = table['reference_ms'] / table['packed_ms']
+    return table
+
+
+if __name__ == "__main__":
+    print(benchmark().to_string(index=False, float_format=lambda value: f"{value:.4g}"))